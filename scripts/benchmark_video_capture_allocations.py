@@ -0,0 +1,140 @@
+"""
+Measures how many frames the Video Capture Device capture method allocates per second,
+with and without reusing frame buffers.
+
+Usage: python ./scripts/benchmark_video_capture_allocations.py [video file] [frame count]
+
+Without a video file, a 1080p MJPG video is generated in a temporary directory.
+A file stands in for the device so that results are reproducible.
+Both paths read a frame, then copy out the capture region like `get_frame` does:
+- "allocating" is how frames were read before: `read()` and `cvtColor` into new frames every time.
+- "reused" goes through the capture method's `FrameBufferPool` and `OutputFramePool`.
+"""
+
+import os
+import sys
+import tempfile
+import weakref
+from collections.abc import Callable
+from time import perf_counter
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from capture_method.VideoCaptureDeviceCaptureMethod import FrameBufferPool, OutputFramePool  # noqa: E402
+
+DEFAULT_FRAME_COUNT = 600
+GENERATED_VIDEO_SIZE = (1920, 1080)
+GENERATED_VIDEO_FRAMES = 120
+CAPTURE_REGION = (slice(100, 1000), slice(200, 1800))
+"""Rows and columns of the frame to copy out, like a capture region"""
+
+
+class AllocationCounter:
+    """Counts frames that weren't returned before, which had to be allocated."""
+
+    def __init__(self):
+        self.count = 0
+        self.__seen: dict[int, weakref.ref[MatLike]] = {}
+
+    def observe(self, frame: MatLike):
+        seen = self.__seen.get(id(frame))
+        if seen is None or seen() is not frame:
+            self.count += 1
+            self.__seen[id(frame)] = weakref.ref(frame)
+
+
+def generate_video(path: str):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*"MJPG"), 60, GENERATED_VIDEO_SIZE)
+    gradient = np.linspace(0, 255, GENERATED_VIDEO_SIZE[0], dtype=np.uint8)
+    for index in range(GENERATED_VIDEO_FRAMES):
+        frame = np.empty((GENERATED_VIDEO_SIZE[1], GENERATED_VIDEO_SIZE[0], 3), dtype=np.uint8)
+        frame[:] = np.roll(gradient, index * 8)[np.newaxis, :, np.newaxis]
+        cv2.putText(frame, str(index), (100, 500), cv2.FONT_HERSHEY_SIMPLEX, 10, (255, 255, 255), 20)
+        writer.write(frame)
+    writer.release()
+
+
+def open_video(path: str):
+    video = cv2.VideoCapture(path)
+    if not video.isOpened():
+        raise OSError(f"Couldn't open {path!r}")
+    return video
+
+
+def read_allocating(video: cv2.VideoCapture, counter: AllocationCounter):
+    result, image = video.read()
+    if not result:
+        return False
+    counter.observe(image)
+    copied_frame = cv2.cvtColor(image[CAPTURE_REGION], cv2.COLOR_BGR2BGRA)
+    counter.observe(copied_frame)
+    return True
+
+
+def create_reused_reader():
+    frame_pool = FrameBufferPool()
+    copied_frames = OutputFramePool()
+    last_copied_index: int | None = None
+
+    def read_reused(video: cv2.VideoCapture, counter: AllocationCounter):
+        nonlocal last_copied_index
+        buffer_index, buffer = frame_pool.acquire_free()
+        result, image = video.read(buffer)
+        if not result:
+            frame_pool.release(buffer_index)
+            return False
+        counter.observe(image)
+        frame_pool.publish(buffer_index, image)
+        published_frame = frame_pool.acquire_published()
+        if published_frame is None:
+            return False
+        published_index, published_image = published_frame
+        copied_index, copied_frame = copied_frames.copy(published_image[CAPTURE_REGION])
+        frame_pool.release(published_index)
+        # Like a consumer holding on to the previous frame until it gets the next one
+        if last_copied_index is not None:
+            copied_frames.release(last_copied_index)
+        last_copied_index = copied_index
+        counter.observe(copied_frame)
+        return True
+
+    return read_reused
+
+
+def benchmark(name: str, path: str, frame_count: int, read: Callable[[cv2.VideoCapture, AllocationCounter], bool]):
+    video = open_video(path)
+    counter = AllocationCounter()
+    frames = 0
+    start_time = perf_counter()
+    while frames < frame_count:
+        if not read(video, counter):
+            # Loop the video
+            video.release()
+            video = open_video(path)
+            continue
+        frames += 1
+    duration = perf_counter() - start_time
+    video.release()
+    print(
+        f"{name:>10}: {frames / duration:7.1f} frames/s, "
+        + f"{counter.count / frames:5.2f} allocations/frame, "
+        + f"{counter.count / duration:7.1f} allocations/s ({counter.count} total)",
+    )
+
+
+def main():
+    frame_count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_FRAME_COUNT  # noqa: PLR2004
+    with tempfile.TemporaryDirectory() as directory:
+        path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(directory, "benchmark.avi")
+        if len(sys.argv) <= 1:
+            generate_video(path)
+        benchmark("allocating", path, frame_count, read_allocating)
+        benchmark("reused", path, frame_count, create_reused_reader())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from typing import TYPE_CHECKING
 from PySide6 import QtCore
 
 import error_messages
+import profiler
+import tracing
 import user_profile
 
 if TYPE_CHECKING:
@@ -24,23 +26,38 @@ class AutoControlledThread(QtCore.QThread):
                 break
             except EOFError:
                 continue
-            match line:
-                # This is for use in a Development environment
-                case "kill":
-                    self._autosplit_ref.closeEvent()
-                    break
-                case "start":
-                    self._autosplit_ref.start_auto_splitter()
-                case "split" | "skip":
-                    self._autosplit_ref.skip_split_signal.emit()
-                case "undo":
-                    self._autosplit_ref.undo_split_signal.emit()
-                case "reset":
-                    self._autosplit_ref.reset_signal.emit()
-                # TODO: Not yet implemented in AutoSplit Integration
-                # case 'pause':
-                #     self.pause_signal.emit()
-                case line:
-                    if line.startswith("settings"):
-                        # Allow for any split character between "settings" and the path
-                        user_profile.load_settings(self._autosplit_ref, line[9:])
+            if not handle_command(self._autosplit_ref, line):
+                break
+
+
+def handle_command(autosplit: "AutoSplit", line: str):
+    """
+    Handle a command line received from stdin or the socket integration.
+
+    @return: False if AutoSplit is closing and no more commands should be read
+    """
+    match line:
+        # This is for use in a Development environment
+        case "kill":
+            autosplit.closeEvent()
+            return False
+        case "start":
+            autosplit.start_auto_splitter()
+        case "split" | "skip":
+            autosplit.skip_split_signal.emit()
+        case "undo":
+            autosplit.undo_split_signal.emit()
+        case "reset":
+            autosplit.reset_signal.emit()
+        # TODO: Not yet implemented in AutoSplit Integration
+        # case 'pause':
+        #     self.pause_signal.emit()
+        case line:
+            if line.startswith("settings"):
+                # Allow for any split character between "settings" and the path
+                user_profile.load_settings(autosplit, line[9:])
+            elif line.startswith("trace"):
+                tracing.save_trace(autosplit, line[6:])
+            elif line.startswith("profile "):
+                profiler.handle_command(autosplit, line[8:])
+    return True
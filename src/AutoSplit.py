@@ -3,13 +3,16 @@ import os
 import signal
 import sys
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-from time import time
+from time import perf_counter, time
 from types import FunctionType
 from typing import NoReturn
+from weakref import WeakKeyDictionary
 
 import certifi
 import cv2
+import numpy as np
 from cv2.typing import MatLike
 from psutil import process_iter
 from PySide6 import QtCore, QtGui
@@ -18,13 +21,22 @@ from PySide6.QtWidgets import QApplication, QFileDialog, QLabel, QMainWindow, QM
 from typing_extensions import override
 from win32comext.shell import shell as shell32
 
+import AutoSplitHeadless
 import error_messages
+import metrics
+import profiler
+import tracing
 import user_profile
-from AutoControlledThread import AutoControlledThread
-from AutoSplitImage import START_KEYWORD, AutoSplitImage, ImageType
+from AutoControlledThread import AutoControlledThread, handle_command
+from AutoSplitHeadless import HEADLESS_ARGUMENT
+from AutoSplitImage import START_KEYWORD, AutoSplitImage, ImageType, get_comparison_request
 from capture_method import CaptureMethodBase, CaptureMethodEnum
+from CaptureRecovery import CaptureRecovery
+from DriftTracker import DriftTracker
+from FrameBus import CaptureRequest, Frame, FrameBus
 from gen import about, design, settings, update_checker
-from hotkeys import HOTKEYS, after_setting_hotkey, send_command
+from hotkeys import HOTKEYS, after_setting_hotkey, send_command, wait_for_queued_commands
+from IntegrationServer import IntegrationServer
 from menu_bar import (
     about_qt,
     about_qt_for_python,
@@ -33,24 +45,38 @@ from menu_bar import (
     open_about,
     open_settings,
     open_update_checker,
+    save_trace,
+    toggle_profiler,
     view_help,
 )
+from MetricsServer import MetricsServer
 from region_selection import align_region, select_region, select_window, validate_before_parsing
-from split_parser import BELOW_FLAG, DUMMY_FLAG, PAUSE_FLAG, parse_and_validate_images
+from split_parser import DUMMY_FLAG, parse_and_validate_images
+from SplitEngine import SplitEngine
+from StallWatchdog import StallWatchdog
 from user_profile import DEFAULT_PROFILE
 from utils import (
     AUTOSPLIT_VERSION,
     BGRA_CHANNEL_COUNT,
     FROZEN,
     ONE_SECOND,
+    CropBox,
     auto_split_directory,
     decimal,
-    flatten,
     is_valid_image,
     open_file,
+    union_of_crop_boxes,
 )
 
 CHECK_FPS_ITERATIONS = 10
+MAX_BLOCKING_WAIT = 1 / 60
+"""Maximum time in seconds to block the GUI thread at once while waiting for a new frame"""
+
+ui_update_duration = metrics.Histogram(
+    "autosplit_ui_update_duration_seconds",
+    "Time to update the UI, by what was updated. The run's includes processing the window's events",
+    "part",
+)
 
 # Needed when compiled, along with the custom hook-requests PyInstaller hook
 os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
@@ -69,6 +95,7 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
     undo_split_signal = QtCore.Signal()
     pause_signal = QtCore.Signal()
     screenshot_signal = QtCore.Signal()
+    toggle_profiler_signal = QtCore.Signal()
     after_setting_hotkey_signal = QtCore.Signal()
     update_checker_widget_signal = QtCore.Signal(str, bool)
     load_start_image_signal = QtCore.Signal(bool, bool)
@@ -76,10 +103,9 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
     show_error_signal = QtCore.Signal(FunctionType)
 
     # Timers
-    timer_live_image = QtCore.QTimer()
-    timer_live_image.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
-    timer_start_image = QtCore.QTimer()
-    timer_start_image.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+    timer_frame_bus = QtCore.QTimer()
+    """Ticks the frame bus when not running. While running, the auto splitter loop ticks it instead."""
+    timer_frame_bus.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
 
     # Widgets
     AboutWidget: about.Ui_AboutAutoSplitWidget | None = None
@@ -94,29 +120,50 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
         self.hwnd = 0
         """Window Handle used for Capture Region"""
         self.last_saved_settings = deepcopy(DEFAULT_PROFILE)
-        self.similarity = 0.0
-        self.split_image_number = 0
-        self.split_images_and_loop_number: list[tuple[AutoSplitImage, int]] = []
-        self.split_groups: list[list[int]] = []
         self.capture_method = CaptureMethodBase(self)
-        self.is_running = False
+        self.capture_recovery = CaptureRecovery(self)
 
         self.last_successfully_loaded_settings_file_path = ""
         """Path of the settings file to default to. `None` until we try to load once."""
 
-        # Automatic timer start
-        self.highest_similarity = 0.0
-        self.reset_highest_similarity = 0.0
-
         # Ensure all other attributes are defined
-        self.waiting_for_split_delay = False
-        self.split_below_threshold = False
-        self.run_start_time = 0.0
+        self.should_update_preview = True
+        """Whether the UI should be refreshed for the current comparison. Updated by `__compare_frame`"""
+        self.split_image_pixmaps: WeakKeyDictionary[AutoSplitImage, QtGui.QPixmap] = WeakKeyDictionary()
+        """Split images never change once loaded, so they only need to be rendered once"""
         self.start_image: AutoSplitImage | None = None
         self.reset_image: AutoSplitImage | None = None
         self.split_images: list[AutoSplitImage] = []
         self.split_image: AutoSplitImage | None = None
         self.update_auto_control: AutoControlledThread | None = None
+        self.integration_server = IntegrationServer(self, lambda line: handle_command(self, line))
+        """Optional socket endpoint, alongside stdin. Listens once a profile sets `integration_port`."""
+        self.metrics_server = MetricsServer(self)
+        """Optional HTTP metrics endpoint. Listens once a profile sets `metrics_port`."""
+        self.comparison_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Comparison")
+        """Compares the split image while the reset image is compared on the main thread"""
+        self.split_engine = SplitEngine(DEFAULT_PROFILE)
+        """Replaced every time the images are loaded"""
+        self.frame_bus = FrameBus(self.__capture, lambda: self.settings_dict["fps_limit"])
+        """Shares a single capture per tick between the live preview and the SplitEngine"""
+        self.__preview_subscription = self.frame_bus.subscribe(
+            self.__update_live_image_details,
+            self.__get_preview_request,
+            lambda: self.settings_dict["preview_fps_limit"],
+        )
+        # The SplitEngine already only compares each image at its own check rate
+        self.frame_bus.subscribe(self.__compare_frame, self.__get_comparison_request)
+        self.drift_tracker = DriftTracker(self, self.__shift_capture_region)
+        self.frame_bus.subscribe(
+            self.drift_tracker.on_frame,
+            self.drift_tracker.get_request,
+            self.drift_tracker.get_rate,
+        )
+        self.__is_screenshot_requested = False
+        """Screenshots are taken on the next tick, from the capture shared with the preview and comparisons"""
+        self.frame_bus.subscribe(self.__save_screenshot, self.__get_screenshot_request)
+        self.stall_watchdog = StallWatchdog(self.frame_bus)
+        """Logs every thread's stack when frames stop being processed. Enabled by `stall_watchdog_frames`."""
 
         # Setup global error handling
         def _show_error_signal_slot(error_message_box: Callable[..., object]):
@@ -163,6 +210,8 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
         self.action_save_profile.triggered.connect(lambda: user_profile.save_settings(self))
         self.action_save_profile_as.triggered.connect(lambda: user_profile.save_settings_as(self))
         self.action_load_profile.triggered.connect(lambda: user_profile.load_settings(self))
+        self.action_save_trace.triggered.connect(lambda: save_trace(self))
+        self.action_toggle_profiler.triggered.connect(lambda: toggle_profiler(self))
 
         # Connecting button clicks to functions
         self.split_image_folder_button.clicked.connect(self.__browse)
@@ -203,13 +252,11 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
         self.undo_split_signal.connect(self.undo_split)
         self.pause_signal.connect(self.pause)
         self.screenshot_signal.connect(self.__take_screenshot)
+        self.toggle_profiler_signal.connect(lambda: profiler.toggle(self))
 
-        # live image checkbox
-        self.timer_live_image.timeout.connect(lambda: self.__update_live_image_details(None, True))
-        self.timer_live_image.start(int(ONE_SECOND / self.settings_dict["fps_limit"]))
-
-        # Automatic timer start
-        self.timer_start_image.timeout.connect(self.__start_image_function)
+        # Live image and automatic timer start
+        self.timer_frame_bus.timeout.connect(lambda: self.frame_bus.tick(time()))
+        self.timer_frame_bus.start(int(ONE_SECOND / self.settings_dict["fps_limit"]))
 
         self.show()
 
@@ -227,6 +274,10 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
         if self.action_check_for_updates_on_open.isChecked():
             check_for_updates(self, check_on_open=True)
 
+    @property
+    def is_running(self):
+        return self.split_engine.is_running
+
     # FUNCTIONS
 
     def __browse(self):
@@ -244,14 +295,23 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
             self.split_image_folder_input.setText(f"{new_split_image_directory}/")
             self.load_start_image_signal.emit(False, True)
 
-    def __update_live_image_details(self, capture: MatLike | None, called_from_timer: bool = False):
-        # HACK: Since this is also called in __get_capture_for_comparison,
-        # we don't need to update anything if the app is running
-        if called_from_timer:
-            if self.is_running or self.start_image:
-                return
-            capture = self.capture_method.get_frame()
+    def __get_preview_request(self, _timestamp: float):
+        if not self.settings_dict["live_capture_region"]:
+            return None
+        # Always show the same part of the capture region as the one compared, so it can be shared
+        split_engine = self.split_engine
+        images = (
+            [split_engine.split_image, split_engine.reset_image]
+            if split_engine.is_running
+            else [split_engine.start_image]
+        )
+        return CaptureRequest(
+            (self.live_image.width(), self.live_image.height()),
+            union_of_crop_boxes(image.crop_box for image in images if image),
+        )
 
+    def __update_live_image_details(self, frame: Frame):
+        start_time = perf_counter()
         # Update title from target window or Capture Device name
         capture_region_window_label = (
             self.settings_dict["capture_device_name"]
@@ -265,11 +325,14 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
             self.live_image.clear()
         # Set live image in UI
         else:
-            set_preview_image(self.live_image, capture)
+            with tracing.span("update preview"):
+                set_preview_image(self.live_image, frame.image)
+        ui_update_duration.labels("preview").observe(perf_counter() - start_time)
 
     def __load_start_image(self, started_by_button: bool = False, wait_for_delay: bool = True):
         """Not thread safe (if triggered by LiveSplit for example). Use `load_start_image_signal.emit` instead."""
-        self.timer_start_image.stop()
+        # Stop comparing the previous Start Image
+        self.split_engine = SplitEngine(self.settings_dict)
         self.current_image_file_label.setText("-")
         self.start_image_status_value_label.setText("not found")
         set_preview_image(self.current_split_image, None)
@@ -284,7 +347,13 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
             QApplication.processEvents()
             return
 
-        self.split_image_number = 0
+        self.split_engine = SplitEngine(
+            self.settings_dict,
+            self.start_image,
+            self.reset_image,
+            self.split_images,
+            self.comparison_pool,
+        )
 
         if not wait_for_delay and self.start_image.get_pause_time(self) > 0:
             self.start_image_status_value_label.setText("paused")
@@ -294,68 +363,53 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
             self.start_image_status_value_label.setText("ready")
             self.__update_split_image(self.start_image)
 
-        self.highest_similarity = 0.0
-        self.reset_highest_similarity = 0.0
-        self.split_below_threshold = False
-        self.timer_start_image.start(int(ONE_SECOND / self.settings_dict["fps_limit"]))
-
         QApplication.processEvents()
 
+    def __get_comparison_request(self, timestamp: float):
+        images = self.split_engine.get_images_to_compare(timestamp)
+        return get_comparison_request(images) if images else None
+
+    def __compare_frame(self, frame: Frame):
+        self.should_update_preview = self.__preview_subscription.last_frame_time == frame.timestamp
+        split_engine = self.split_engine
+        # Settings can be changed while running
+        split_engine.settings_dict = self.settings_dict
+        was_running = split_engine.is_running
+        for event in split_engine.feed([frame.image], [frame.timestamp], frame.crop_box):
+            send_command(self, event.command, event.timestamp)
+        # While running, the auto splitter loop takes care of the UI
+        if not was_running and split_engine.start_image:
+            self.__start_image_function()
+
     def __start_image_function(self):
-        if not self.start_image:
+        start_image = self.split_engine.start_image
+        if start_image is None:
+            return
+        if self.split_engine.is_running:
+            self.start_image_status_value_label.setText("started")
+            # Start the run once the current tick is over, as the auto splitter loop ticks the frame bus itself
+            QtCore.QTimer.singleShot(0, self.start_auto_splitter_signal.emit)
             return
 
-        self.start_image_status_value_label.setText("ready")
-        self.__update_split_image(self.start_image)
-
-        capture = self.__get_capture_for_comparison()
-        start_image_threshold = self.start_image.get_similarity_threshold(self)
-        start_image_similarity = self.start_image.compare_with_capture(self, capture)
-
-        # If the similarity becomes higher than highest similarity, set it as such.
-        if start_image_similarity > self.highest_similarity:
-            self.highest_similarity = start_image_similarity
-
-        self.table_current_image_live_label.setText(decimal(start_image_similarity))
-        self.table_current_image_highest_label.setText(decimal(self.highest_similarity))
-        self.table_current_image_threshold_label.setText(decimal(start_image_threshold))
-
-        # If the {b} flag is set, let similarity go above threshold first, then split on similarity below threshold
-        # Otherwise just split when similarity goes above threshold
-        # TODO: Abstract with similar check in split image
-        below_flag = self.start_image.check_flag(BELOW_FLAG)
+        frame_interval_ms = int(ONE_SECOND / self.settings_dict["fps_limit"])
 
-        # Negative means belove threshold, positive means above
-        similarity_diff = start_image_similarity - start_image_threshold
-        if below_flag and not self.split_below_threshold and similarity_diff >= 0:
-            self.split_below_threshold = True
+        # Delay Start Image if needed
+        if self.split_engine.delayed_command_time is not None:
+            delay_time_left = self.split_engine.delayed_command_time - time()
+            self.start_image_status_value_label.setText("delaying start...")
+            self.current_split_image.setText(f"Delayed Before Starting:\n {seconds_remaining_text(delay_time_left)}")
+            # Don't wait for the next tick to start. Doesn't need to be shorter than 0.1s as we only show 1 decimal
+            self.timer_frame_bus.setInterval(max(0, min(100, frame_interval_ms, int(delay_time_left * ONE_SECOND))))
             return
-        if (
-            (below_flag and self.split_below_threshold and similarity_diff < 0 and is_valid_image(capture))  # noqa: PLR0916 # See above TODO
-            or (not below_flag and similarity_diff >= 0)
-        ):
-            self.timer_start_image.stop()
-            self.split_below_threshold = False
-
-            if not self.start_image.check_flag(DUMMY_FLAG):
-                # Delay Start Image if needed
-                if self.start_image.get_delay_time(self) > 0:
-                    self.start_image_status_value_label.setText("delaying start...")
-                    delay_start_time = time()
-                    start_delay = self.start_image.get_delay_time(self) / ONE_SECOND
-                    time_delta = 0.0
-                    while time_delta < start_delay:
-                        delay_time_left = start_delay - time_delta
-                        self.current_split_image.setText(
-                            f"Delayed Before Starting:\n {seconds_remaining_text(delay_time_left)}",
-                        )
-                        # Wait 0.1s. Doesn't need to be shorter as we only show 1 decimal
-                        QTest.qWait(100)
-                        time_delta = time() - delay_start_time
-                send_command(self, "start")
 
-            self.start_image_status_value_label.setText("started")
-            self.start_auto_splitter()
+        self.timer_frame_bus.setInterval(frame_interval_ms)
+        self.start_image_status_value_label.setText("ready")
+        self.__update_split_image(start_image)
+
+        if self.should_update_preview and self.split_engine.similarity is not None:
+            self.table_current_image_live_label.setText(decimal(self.split_engine.similarity))
+            self.table_current_image_highest_label.setText(decimal(self.split_engine.highest_similarity))
+        self.table_current_image_threshold_label.setText(decimal(start_image.get_similarity_threshold(self)))
 
     # update x, y, width, height when spinbox values are changed
     def __update_x(self):
@@ -370,9 +424,27 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
     def __update_height(self):
         self.settings_dict["capture_region"]["height"] = self.height_spinbox.value()
 
+    def __shift_capture_region(self, offset_x: int, offset_y: int):
+        """Follow the captured window's content when drift tracking finds that it moved."""
+        self.x_spinbox.setValue(self.settings_dict["capture_region"]["x"] + offset_x)
+        self.y_spinbox.setValue(self.settings_dict["capture_region"]["y"] + offset_y)
+
     def __take_screenshot(self):
         if not validate_before_parsing(self, check_empty_directory=False):
             return
+        self.__is_screenshot_requested = True
+
+    def __get_screenshot_request(self, _timestamp: float):
+        if not self.__is_screenshot_requested:
+            return None
+        # Screenshots are used as split images, they need the whole capture region at full resolution
+        selection = self.settings_dict["capture_region"]
+        return CaptureRequest((selection["width"], selection["height"]))
+
+    def __save_screenshot(self, frame: Frame):
+        if not self.__is_screenshot_requested:
+            return
+        self.__is_screenshot_requested = False
 
         # Check if file exists and rename it if it does.
         # Below starts the file_name_number at #001 up to #999. After that it will go to 1000,
@@ -387,11 +459,14 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
                 break
             screenshot_index += 1
 
-        # Grab screenshot of capture region
-        capture = self.capture_method.get_frame()
+        capture = frame.image
         if not is_valid_image(capture):
             error_messages.region()
             return
+        # Another subscriber may have needed a bigger capture this tick
+        selection = self.settings_dict["capture_region"]
+        if capture.shape[1::-1] != (selection["width"], selection["height"]):
+            capture = cv2.resize(capture, (selection["width"], selection["height"]), interpolation=cv2.INTER_AREA)
 
         # Save and open image
         cv2.imwrite(screenshot_path, capture)
@@ -417,8 +492,9 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
         for image in images:
             count = 0
             while count < CHECK_FPS_ITERATIONS:
-                new_capture = self.__get_capture_for_comparison()
-                _ = image.compare_with_capture(self, new_capture)
+                capture_request = get_comparison_request([image])
+                new_capture = self.__capture(*capture_request)
+                _ = image.compare_with_capture(self, new_capture, capture_request.crop_box)
                 # TODO: If an old image is always returned, this becomes an infinite loop
                 if new_capture is not last_capture:
                     count += 1
@@ -429,56 +505,30 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
         fps = int((CHECK_FPS_ITERATIONS * len(images)) / (t1 - t0))
         self.fps_value_label.setText(str(fps))
 
-    def __is_current_split_out_of_range(self):
-        return (
-            self.split_image_number < 0
-            or self.split_image_number > len(self.split_images_and_loop_number) - 1
-        )
-
     def undo_split(self, navigate_image_only: bool = False):
         """Undo Split" and "Prev. Img." buttons connect to here."""
-        # Can't undo until timer is started
+        # Can't undo until timer is started, while a split is delayed
         # or Undoing past the first image
         if (
-            not self.is_running
-            or "Delayed Split" in self.current_split_image.text()
-            or (not self.undo_split_button.isEnabled() and not self.is_auto_controlled)
-            or self.__is_current_split_out_of_range()
+            (not self.undo_split_button.isEnabled() and not self.is_auto_controlled)
+            or not self.split_engine.undo_split(navigate_image_only)
         ):
             return
 
-        if not navigate_image_only:
-            for i, group in enumerate(self.split_groups):
-                if i > 0 and self.split_image_number in group:
-                    self.split_image_number = self.split_groups[i - 1][-1]
-                    break
-        else:
-            self.split_image_number -= 1
-
         self.__update_split_image()
         if not navigate_image_only:
             send_command(self, "undo")
 
     def skip_split(self, navigate_image_only: bool = False):
         """Skip Split" and "Next Img." buttons connect to here."""
-        # Can't skip or split until timer is started
+        # Can't skip or split until timer is started, while a split is delayed
         # or Splitting/skipping when there are no images left
         if (
-            not self.is_running
-            or "Delayed Split" in self.current_split_image.text()
-            or not (self.skip_split_button.isEnabled() or self.is_auto_controlled or navigate_image_only)
-            or self.__is_current_split_out_of_range()
+            not (self.skip_split_button.isEnabled() or self.is_auto_controlled or navigate_image_only)
+            or not self.split_engine.skip_split(navigate_image_only)
         ):
             return
 
-        if not navigate_image_only:
-            for group in self.split_groups:
-                if self.split_image_number in group:
-                    self.split_image_number = group[-1] + 1
-                    break
-        else:
-            self.split_image_number += 1
-
         self.__update_split_image()
         if not navigate_image_only:
             send_command(self, "skip")
@@ -489,10 +539,10 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
 
     def reset(self):
         """
-        When the reset button or hotkey is pressed, it will set `is_running` to False,
+        When the reset button or hotkey is pressed, it will stop the SplitEngine's run,
         which will trigger in the __auto_splitter function, if running, to abort and change GUI.
         """
-        self.is_running = False
+        self.split_engine.reset()
 
     # Functions for the hotkeys to return to the main thread from signals and start their corresponding functions
     def start_auto_splitter(self):
@@ -509,232 +559,152 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
 
         self.start_auto_splitter_signal.emit()
 
-    def __check_for_reset_state_update_ui(self):
-        """Check if AutoSplit is started, if not then update the GUI."""
-        if not self.is_running:
-            self.gui_changes_on_reset(True)
-            return True
-        return False
-
-    def __auto_splitter(self):  # noqa: PLR0912,PLR0915
+    def __auto_splitter(self):
         if not self.settings_dict["split_hotkey"] and not self.is_auto_controlled:
             self.gui_changes_on_reset(True)
             error_messages.split_hotkey()
             return
 
-        # Set start time before parsing the images as it's a heavy operation that will cause delays
-        self.run_start_time = time()
+        # Unless the Start Image already started the run
+        if not self.split_engine.is_running:
+            # Set start time before parsing the images as it's a heavy operation that will cause delays
+            run_start_time = time()
 
-        if not (validate_before_parsing(self) and parse_and_validate_images(self)):
-            # `safe_to_reload_start_image: bool = False` because __load_start_image also does this check,
-            # we don't want to double a Start/Reset Image error message
-            self.gui_changes_on_reset(False)
-            return
-
-        # Construct a list of images + loop count tuples.
-        self.split_images_and_loop_number = list(
-            flatten(
-                ((split_image, i + 1) for i in range(split_image.loops))
-                for split_image
-                in self.split_images
-            ),
-        )
-
-        # Construct groups of splits
-        self.split_groups = []
-        dummy_splits_array: list[bool] = []
-        number_of_split_images = len(self.split_images_and_loop_number)
-        current_group: list[int] = []
-        self.split_groups.append(current_group)
-        for i, image in enumerate(self.split_images_and_loop_number):
-            current_group.append(i)
-            dummy = image[0].check_flag(DUMMY_FLAG)
-            dummy_splits_array.append(dummy)
-            if not dummy and i < number_of_split_images - 1:
-                current_group = []
-                self.split_groups.append(current_group)
-
-        self.is_running = True
-        self.gui_changes_on_start()
-
-        # Start pause time
-        if self.start_image:
-            self.__pause_loop(self.start_image.get_pause_time(self), "None (Paused).")
-
-        # Initialize a few attributes
-        self.split_image_number = 0
-        self.waiting_for_split_delay = False
-        self.split_below_threshold = False
-        split_time = 0
-
-        # First loop: stays in this loop until all of the split images have been split
-        while self.split_image_number < number_of_split_images:
-            # Check if we are not waiting for the split delay to send the key press
-            if self.waiting_for_split_delay:
-                time_millis = int(round(time() * ONE_SECOND))
-                if time_millis < split_time:
-                    QApplication.processEvents()
-                    continue
-
-            self.__update_split_image()
-
-            # Type checking
-            if not self.split_image:
+            if not (validate_before_parsing(self) and parse_and_validate_images(self)):
+                # `safe_to_reload_start_image: bool = False` because __load_start_image also does this check,
+                # we don't want to double a Start/Reset Image error message
+                self.gui_changes_on_reset(False)
                 return
 
-            # Second loop: stays in this loop until similarity threshold is met
-            if self.__similarity_threshold_loop(number_of_split_images, dummy_splits_array):
-                return
+            self.split_engine = SplitEngine(
+                self.settings_dict,
+                self.start_image,
+                self.reset_image,
+                self.split_images,
+                self.comparison_pool,
+            )
+            self.split_engine.start(run_start_time)
 
-            # We need to make sure that this isn't a dummy split before sending the key press.
-            if not self.split_image.check_flag(DUMMY_FLAG):
-                # If it's a delayed split, check if the delay has passed
-                # Otherwise calculate the split time for the key press
-                split_delay = self.split_image.get_delay_time(self) / ONE_SECOND
-                if split_delay > 0 and not self.waiting_for_split_delay:
-                    split_time = round(time() + split_delay * ONE_SECOND)
-                    self.waiting_for_split_delay = True
-                    buttons_to_disable = [
-                        self.next_image_button,
-                        self.previous_image_button,
-                        self.undo_split_button,
-                        self.skip_split_button,
-                    ]
-                    for button in buttons_to_disable:
-                        button.setEnabled(False)
-                    self.current_image_file_label.clear()
-
-                    # check for reset while delayed and display a counter of the remaining split delay time
-                    if self.__pause_loop(split_delay, "Delayed Split:"):
-                        return
-
-                    for button in buttons_to_disable:
-                        button.setEnabled(True)
-
-                self.waiting_for_split_delay = False
-
-                # if {p} flag hit pause key, otherwise hit split hotkey
-                send_command(self, "pause" if self.split_image.check_flag(PAUSE_FLAG) else "split")
-
-            # if loop check box is checked and its the last split, go to first split.
-            # else go to the next split image.
-            if self.settings_dict["loop_splits"] and self.split_image_number == number_of_split_images - 1:
-                self.split_image_number = 0
-            else:
-                self.split_image_number += 1
+        self.gui_changes_on_start()
 
-            # If its not the last split image, pause for the amount set by the user
-            # A pause loop to check if the user presses skip split, undo split, or reset here.
-            # Also updates the current split image text, counting down the time until the next split image
-            if self.__pause_loop(self.split_image.get_pause_time(self), "None (Paused)."):
-                return
+        split_engine = self.split_engine
+        dummy_splits_array = [image.check_flag(DUMMY_FLAG) for image, _ in split_engine.split_images_and_loop_number]
+        shown_split_image_number: int | None = None
+        was_waiting = True
+        loop_start_time = time()
+        # Stays in this loop until all of the split images have been split, or until reset
+        while split_engine.is_running:
+            comparison_start_time = time()
+            self.frame_bus.tick(comparison_start_time)
+            if not split_engine.is_running:
+                break
 
-        # loop breaks to here when the last image splits
-        self.is_running = False
+            # Show the split image again after a pause or delay, or once it changed
+            is_waiting = (
+                split_engine.delayed_command_time is not None
+                or split_engine.is_paused(comparison_start_time)
+            )
+            if not is_waiting and (was_waiting or split_engine.split_image_number != shown_split_image_number):
+                self.__update_split_image()
+                shown_split_image_number = split_engine.split_image_number
+            was_waiting = is_waiting
+
+            ui_update_start_time = perf_counter()
+            with tracing.span("update run UI"):
+                self.__update_run_ui(comparison_start_time, dummy_splits_array)
+            with tracing.span("processEvents"):
+                QApplication.processEvents()
+            ui_update_duration.labels("run").observe(perf_counter() - ui_update_start_time)
+            self.__wait_for_next_comparison(loop_start_time, comparison_start_time)
+
+        # loop breaks to here when the last image splits, or on reset
         self.gui_changes_on_reset(True)
 
-    def __similarity_threshold_loop(self, number_of_split_images: int, dummy_splits_array: list[bool]):
-        """
-        Wait until the similarity threshold is met.
-
-        Returns True if the loop was interrupted by a reset.
-        """
-        # Type checking
-        if not self.split_image:
-            return False
-
-        start = time()
-        while True:
-            capture = self.__get_capture_for_comparison()
-
-            if self.__reset_if_should(capture):
-                return True
-
-            similarity = self.split_image.compare_with_capture(self, capture)
-
+    def __update_run_ui(self, timestamp: float, dummy_splits_array: list[bool]):
+        split_engine = self.split_engine
+        number_of_split_images = len(dummy_splits_array)
+        buttons_to_disable_while_delayed = [
+            self.next_image_button,
+            self.previous_image_button,
+            self.undo_split_button,
+            self.skip_split_button,
+        ]
+
+        # Display a counter of the remaining split delay or pause time
+        delayed_command_time = split_engine.delayed_command_time
+        if delayed_command_time is not None:
+            for button in buttons_to_disable_while_delayed:
+                button.setEnabled(False)
+            self.current_image_file_label.clear()
+            self.current_split_image.setText(f"Delayed Split: {seconds_remaining_text(delayed_command_time - time())}")
+        elif split_engine.is_paused(timestamp):
+            self.current_split_image.setText(
+                f"None (Paused). {seconds_remaining_text(split_engine.pause_end_time - time())}",
+            )
+        elif self.should_update_preview:
             # Show live similarity
-            self.table_current_image_live_label.setText(decimal(similarity))
-
-            # if the similarity becomes higher than highest similarity, set it as such.
-            if similarity > self.highest_similarity:
-                self.highest_similarity = similarity
-
+            if split_engine.similarity is not None:
+                self.table_current_image_live_label.setText(decimal(split_engine.similarity))
             # show live highest similarity if the checkbox is checked
-            self.table_current_image_highest_label.setText(decimal(self.highest_similarity))
+            self.table_current_image_highest_label.setText(decimal(split_engine.highest_similarity))
 
+        if delayed_command_time is None and self.should_update_preview:
             # If its the last split image and last loop number, disable the next image button
             # If its the first split image, disable the undo split and previous image buttons
-            self.next_image_button.setEnabled(self.split_image_number != number_of_split_images - 1)
-            self.previous_image_button.setEnabled(self.split_image_number != 0)
+            self.next_image_button.setEnabled(split_engine.split_image_number != number_of_split_images - 1)
+            self.previous_image_button.setEnabled(split_engine.split_image_number != 0)
             if not self.is_auto_controlled:
                 # If its the last non-dummy split image and last loop number, disable the skip split button
-                self.skip_split_button.setEnabled(dummy_splits_array[self.split_image_number :].count(False) > 1)
-                self.undo_split_button.setEnabled(self.split_image_number != 0)
-            QApplication.processEvents()
+                remaining_dummy_flags = dummy_splits_array[split_engine.split_image_number :]
+                self.skip_split_button.setEnabled(remaining_dummy_flags.count(False) > 1)
+                self.undo_split_button.setEnabled(split_engine.split_image_number != 0)
 
-            # Limit the number of time the comparison runs to reduce cpu usage
-            frame_interval = 1 / self.settings_dict["fps_limit"]
-            # Use a time delta to have a consistant check interval
-            wait_delta_ms = int((frame_interval - (time() - start) % frame_interval) * ONE_SECOND)
-
-            below_flag = self.split_image.check_flag(BELOW_FLAG)
-            # if the b flag is set, let similarity go above threshold first,
-            # then split on similarity below threshold.
-            # if no b flag, just split when similarity goes above threshold.
-            # TODO: Abstract with similar check in Start Image
-            if not self.waiting_for_split_delay:
-                if similarity >= self.split_image.get_similarity_threshold(self):
-                    if not below_flag:
-                        break
-                    if not self.split_below_threshold:
-                        self.split_below_threshold = True
-                        QTest.qWait(wait_delta_ms)
-                        continue
-
-                elif below_flag and self.split_below_threshold and is_valid_image(capture):
-                    self.split_below_threshold = False
-                    break
-
-            QTest.qWait(wait_delta_ms)
-
-        return False
-
-    def __pause_loop(self, stop_time: float, message: str):
-        """
-        Wait for a certain time and show the timer to the user.
-        Can be stopped early if the current split goes past the one when the loop started.
+        if not split_engine.reset_image:
+            self.table_reset_image_live_label.setText("N/A")
+            self.table_reset_image_threshold_label.setText("N/A")
+            self.table_reset_image_highest_label.setText("N/A")
+        elif not self.settings_dict["enable_auto_reset"]:
+            self.table_reset_image_live_label.setText("disabled")
+        else:
+            self.table_reset_image_threshold_label.setText(
+                decimal(split_engine.reset_image.get_similarity_threshold(self)),
+            )
+            if split_engine.is_reset_image_paused(timestamp):
+                self.table_reset_image_live_label.setText("paused")
+            elif self.should_update_preview and split_engine.reset_similarity is not None:
+                self.table_reset_image_highest_label.setText(decimal(split_engine.reset_highest_similarity))
+                self.table_reset_image_live_label.setText(decimal(split_engine.reset_similarity))
 
-        Returns True if the loop was interrupted by a reset.
+    def __wait_for_next_comparison(self, loop_start_time: float, comparison_start_time: float):
         """
-        if stop_time <= 0:
-            return False
-        start_time = time()
-        # Set a "pause" split image number.
-        # This is done so that it can detect if user hit split/undo split while paused/delayed.
-        pause_split_image_number = self.split_image_number
-        while True:
-            # Calculate similarity for Reset Image
-            if self.__reset_if_should(self.__get_capture_for_comparison()):
-                return True
-
-            time_delta = time() - start_time
-            if (
-                # Check for end of the pause/delay
-                time_delta >= stop_time
-                # Check for skip split / next image:
-                or self.split_image_number > pause_split_image_number
-                # Check for undo split / previous image:
-                or self.split_image_number < pause_split_image_number
-            ):
-                break
+        Limit the number of time the comparison runs to reduce cpu usage.
 
-            self.current_split_image.setText(f"{message} {seconds_remaining_text(stop_time - time_delta)}")
+        If the capture method can notify of new frames, wake up as soon as one is available
+        instead of waiting for the next fixed tick. The fps limit is still respected.
+        """
+        frame_interval = 1 / self.settings_dict["fps_limit"]
+        # Don't send a delayed command up to a frame late
+        delayed_command_time = self.split_engine.delayed_command_time
+        if delayed_command_time is not None and delayed_command_time - time() < frame_interval:
+            QTest.qWait(max(0, int((delayed_command_time - time()) * ONE_SECOND)))
+            return
+        if not self.capture_method.notifies_new_frames:
+            # Use a time delta to have a consistant check interval
+            QTest.qWait(int((frame_interval - (time() - loop_start_time) % frame_interval) * ONE_SECOND))
+            return
 
-            QTest.qWait(1)
-        return False
+        throttle_ms = int((frame_interval - (time() - comparison_start_time)) * ONE_SECOND)
+        if throttle_ms > 0:
+            QTest.qWait(throttle_ms)
+        # Don't wait more than a frame interval for a new frame, the reset image and UI still need to be updated
+        wait_until = time() + frame_interval
+        while not self.capture_method.wait_for_new_frame(min(wait_until - time(), MAX_BLOCKING_WAIT)):
+            QApplication.processEvents()
+            if time() >= wait_until:
+                break
 
     def gui_changes_on_start(self):
-        self.timer_start_image.stop()
+        self.timer_frame_bus.stop()
         self.start_auto_splitter_button.setText("Running...")
         self.split_image_folder_button.setEnabled(False)
         self.reload_start_image_button.setEnabled(False)
@@ -783,13 +753,14 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
             self.undo_split_button.setEnabled(False)
             self.skip_split_button.setEnabled(False)
 
+        self.timer_frame_bus.start(int(ONE_SECOND / self.settings_dict["fps_limit"]))
         QApplication.processEvents()
         if safe_to_reload_start_image:
             self.load_start_image_signal.emit(False, False)
 
-    def __get_capture_for_comparison(self):
-        """Grab capture region and resize for comparison."""
-        capture = self.capture_method.get_frame()
+    def __capture(self, size: tuple[int, int], crop_box: CropBox):
+        """Grab the `crop_box` part of the capture region, already resized to `size`."""
+        capture = self.capture_method.capture(size, crop_box)
 
         # This most likely means we lost capture
         # (ie the captured window was closed, crashed, lost capture device, etc.)
@@ -802,63 +773,30 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
                 if self.settings_dict["capture_method"] == CaptureMethodEnum.BITBLT:
                     message += "\n(captured window may be incompatible with BitBlt)"
                 self.live_image.setText(message)
-                recovered = self.capture_method.recover_window(self.settings_dict["captured_window_title"])
-                if recovered:
-                    capture = self.capture_method.get_frame()
-
-        self.__update_live_image_details(capture)
+                if self.capture_recovery.try_recover():
+                    capture = self.capture_method.capture(size, crop_box)
+        if is_valid_image(capture):
+            self.capture_recovery.capture_succeeded()
         return capture
 
-    def __reset_if_should(self, capture: MatLike | None):
-        """Checks if we should reset, resets if it's the case, and returns the result."""
-        if self.reset_image:
-            if self.settings_dict["enable_auto_reset"]:
-                similarity = self.reset_image.compare_with_capture(self, capture)
-                threshold = self.reset_image.get_similarity_threshold(self)
-
-                pause_times = [self.reset_image.get_pause_time(self)]
-                if self.start_image:
-                    pause_times.append(self.start_image.get_pause_time(self))
-                paused = time() - self.run_start_time <= max(pause_times)
-                if paused:
-                    should_reset = False
-                    self.table_reset_image_live_label.setText("paused")
-                else:
-                    should_reset = similarity >= threshold
-                    if similarity > self.reset_highest_similarity:
-                        self.reset_highest_similarity = similarity
-                    self.table_reset_image_highest_label.setText(decimal(self.reset_highest_similarity))
-                    self.table_reset_image_live_label.setText(decimal(similarity))
-
-                self.table_reset_image_threshold_label.setText(decimal(threshold))
-
-                if should_reset:
-                    send_command(self, "reset")
-                    self.reset()
-            else:
-                self.table_reset_image_live_label.setText("disabled")
-        else:
-            self.table_reset_image_live_label.setText("N/A")
-            self.table_reset_image_threshold_label.setText("N/A")
-            self.table_reset_image_highest_label.setText("N/A")
-
-        return self.__check_for_reset_state_update_ui()
-
     def __update_split_image(self, specific_image: AutoSplitImage | None = None):
-        # Start image is expected to be out of range (index 0 of 0-length array)
-        if not specific_image or specific_image.image_type != ImageType.START:
-            # need to reset highest_similarity and split_below_threshold each time an image updates.
-            self.highest_similarity = 0.0
-            self.split_below_threshold = False
-            # Splitting/skipping when there are no images left or Undoing past the first image
-            if self.__is_current_split_out_of_range():
-                self.reset()
-                return
-
         # Get split image
-        self.split_image = specific_image or self.split_images_and_loop_number[0 + self.split_image_number][0]
+        # Start image is expected to be out of range (index 0 of 0-length array)
+        split_image = specific_image or self.split_engine.split_image
+        # Splitting/skipping when there are no images left or Undoing past the first image
+        if not split_image:
+            return
+        self.split_image = split_image
         if is_valid_image(self.split_image.byte_array):
-            set_preview_image(self.current_split_image, self.split_image.byte_array)
+            pixmap = self.split_image_pixmaps.get(self.split_image)
+            if pixmap is None:
+                pixmap = render_preview_pixmap(
+                    self.split_image.byte_array,
+                    self.current_split_image.size(),
+                    self.split_image.mask,
+                )
+                self.split_image_pixmaps[self.split_image] = pixmap
+            self.current_split_image.setPixmap(pixmap)
 
         self.current_image_file_label.setText(self.split_image.filename)
         self.table_current_image_threshold_label.setText(decimal(self.split_image.get_similarity_threshold(self)))
@@ -867,7 +805,7 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
         if specific_image and specific_image.image_type == ImageType.START:
             self.image_loop_value_label.setText("N/A")
         else:
-            loop_tuple = self.split_images_and_loop_number[self.split_image_number]
+            loop_tuple = self.split_engine.split_images_and_loop_number[self.split_engine.split_image_number]
             self.image_loop_value_label.setText(f"{loop_tuple[1]}/{loop_tuple[0].loops}")
 
     @override
@@ -879,6 +817,10 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
                 # self.update_auto_control.terminate() hangs in PySide6
                 self.update_auto_control.quit()
             self.capture_method.close()
+            self.comparison_pool.shutdown(wait=False, cancel_futures=True)
+            wait_for_queued_commands()
+            self.integration_server.close()
+            self.metrics_server.close()
             if event is not None:
                 event.accept()
             if self.is_auto_controlled:
@@ -917,35 +859,46 @@ class AutoSplit(QMainWindow, design.Ui_MainWindow):
         event.ignore()
 
 
+def render_preview_pixmap(image: MatLike, size: QtCore.QSize, mask: MatLike | None = None):
+    """
+    Downscale the image directly to `size` before handing it to Qt,
+    so that the rendering cost doesn't grow with the image's resolution.
+    """
+    dsize = (size.width(), size.height())
+    if image.shape[1::-1] != dsize:
+        image = cv2.resize(image, dsize, interpolation=cv2.INTER_AREA)
+        if is_valid_image(mask):
+            mask = cv2.resize(mask, dsize, interpolation=cv2.INTER_NEAREST)
+    # Show the masked out parts of the image as transparent
+    if is_valid_image(mask):
+        image = cv2.merge((*cv2.split(image), mask))
+    height, width, channels = image.shape
+
+    if channels == BGRA_CHANNEL_COUNT:
+        image_format = QtGui.QImage.Format.Format_RGBA8888
+        capture = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+    else:
+        image_format = QtGui.QImage.Format.Format_BGR888
+        capture = np.ascontiguousarray(image)
+
+    qimage = QtGui.QImage(
+        capture.data,  # pyright: ignore[reportGeneralTypeIssues] # https://bugreports.qt.io/browse/PYSIDE-2476
+        width,
+        height,
+        width * channels,
+        image_format,
+    )
+    # Copies the image data, so `capture` doesn't need to outlive it
+    return QtGui.QPixmap.fromImage(qimage)
+
+
 def set_preview_image(qlabel: QLabel, image: MatLike | None):
     if not is_valid_image(image):
         # Clear current pixmap if no image. But don't clear text
         if not qlabel.text():
             qlabel.clear()
     else:
-        height, width, channels = image.shape
-
-        if channels == BGRA_CHANNEL_COUNT:
-            image_format = QtGui.QImage.Format.Format_RGBA8888
-            capture = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
-        else:
-            image_format = QtGui.QImage.Format.Format_BGR888
-            capture = image
-
-        qimage = QtGui.QImage(
-            capture.data,  # pyright: ignore[reportGeneralTypeIssues] # https://bugreports.qt.io/browse/PYSIDE-2476
-            width,
-            height,
-            width * channels,
-            image_format,
-        )
-        qlabel.setPixmap(
-            QtGui.QPixmap(qimage).scaled(
-                qlabel.size(),
-                QtCore.Qt.AspectRatioMode.IgnoreAspectRatio,
-                QtCore.Qt.TransformationMode.SmoothTransformation,
-            ),
-        )
+        qlabel.setPixmap(render_preview_pixmap(image, qlabel.size()))
 
 
 def seconds_remaining_text(seconds: float):
@@ -966,6 +919,10 @@ def is_already_open():
 
 
 def main():
+    # Headless mode doesn't create a QApplication at all
+    if HEADLESS_ARGUMENT in sys.argv:
+        AutoSplitHeadless.main(next(iter(sys.argv[sys.argv.index(HEADLESS_ARGUMENT) + 1 :]), ""))
+
     # Best to call setStyle before the QApplication constructor
     # https://doc.qt.io/qt-6/qapplication.html#setStyle-1
     QApplication.setStyle("fusion")
@@ -0,0 +1,272 @@
+"""
+Runs the auto splitter from a profile, without any widget.
+
+Started with `AutoSplit --headless <profile.toml>`. It behaves as if `--auto-controlled`:
+the version and process ID are the first two lines sent to stdout, then commands are sent to stdout
+and the same commands as the AutoSplit Integration are read from stdin.
+"""
+
+import os
+import sys
+from collections.abc import Callable
+from queue import Empty, SimpleQueue
+from threading import Thread
+from time import time
+from typing import cast
+
+import toml
+
+import error_messages
+import profiler
+import tracing
+from AutoSplitImage import get_comparison_request
+from capture_method import CAPTURE_METHODS, CaptureMethodBase, CaptureMethodEnum
+from CaptureRecovery import CaptureRecovery
+from DriftTracker import DriftTracker
+from FrameBus import Frame, FrameBus
+from hotkeys import send_command, wait_for_queued_commands
+from IntegrationServer import IntegrationServer
+from MetricsServer import MetricsServer
+from region_selection import validate_before_parsing
+from split_parser import load_images
+from SplitEngine import SplitEngine
+from StallWatchdog import StallWatchdog
+from user_profile import UserProfileDict, read_settings_file
+from utils import AUTOSPLIT_VERSION, CropBox, get_window_bounds, is_valid_hwnd, is_valid_image
+
+HEADLESS_ARGUMENT = "--headless"
+IDLE_WAIT = 0.1
+"""How long to wait for a command, in seconds, when there's nothing to compare"""
+
+
+class DirectSignal:
+    """Stands in for `AutoSplit.show_error_signal`. There is no GUI thread to send the error message to."""
+
+    @staticmethod
+    def emit(error_message_box: Callable[..., object]):
+        error_message_box()
+
+
+class AutoSplitHeadless:
+    # Always communicates with stdin/stdout
+    is_auto_controlled = True
+    show_error_signal = DirectSignal()
+
+    settings_dict: UserProfileDict
+    hwnd = 0
+    capture_method: CaptureMethodBase
+    split_engine: SplitEngine
+
+    def __init__(self, settings_dict: UserProfileDict):
+        self.settings_dict = settings_dict
+        tracing.configure(settings_dict["trace_buffer_size"])
+        self.split_engine = SplitEngine(settings_dict)
+        self.capture_method = self.__create_capture_method()
+        self.capture_recovery = CaptureRecovery(self)
+        self.frame_bus = FrameBus(self.__capture, self.__get_tick_rate)
+        self.frame_bus.subscribe(self.__compare_frame, self.__get_comparison_request)
+        self.drift_tracker = DriftTracker(self, self.__shift_capture_region)
+        self.frame_bus.subscribe(
+            self.drift_tracker.on_frame,
+            self.drift_tracker.get_request,
+            self.drift_tracker.get_rate,
+        )
+        self.stall_watchdog = StallWatchdog(self.frame_bus)
+        self.__commands: SimpleQueue[str] = SimpleQueue()
+        self.__should_exit = False
+        self.integration_server = IntegrationServer(self, self.__commands.put)
+        self.metrics_server = MetricsServer(self)
+
+    @property
+    def is_running(self):
+        return self.split_engine.is_running
+
+    def __create_capture_method(self):
+        capture_method = CAPTURE_METHODS.get(cast(CaptureMethodEnum, self.settings_dict["capture_method"]))(self)
+        if self.settings_dict["capture_method"] != CaptureMethodEnum.VIDEO_CAPTURE_DEVICE:
+            capture_method.recover_window(self.settings_dict["captured_window_title"])
+        return capture_method
+
+    def __read_commands(self):
+        while True:
+            try:
+                line = input()
+            except RuntimeError:
+                error_messages.stdin_lost()
+                break
+            except EOFError:
+                # Nothing will be sent anymore, keep auto splitting on our own
+                break
+            self.__commands.put(line)
+
+    def run(self):
+        # Send version and process ID to stdout
+        # THIS HAS TO BE THE FIRST TWO LINES SENT
+        print(f"{AUTOSPLIT_VERSION}\n{os.getpid()}", flush=True)
+        Thread(target=self.__read_commands, daemon=True).start()
+        self.integration_server.listen(self.settings_dict["integration_port"])
+        self.metrics_server.listen(self.settings_dict["metrics_port"])
+        self.stall_watchdog.configure(self.settings_dict["stall_watchdog_frames"])
+
+        self.__load_split_engine()
+        try:
+            while not self.__should_exit:
+                comparison_start_time = time()
+                self.frame_bus.tick(comparison_start_time)
+                self.__wait_for_next_comparison(comparison_start_time)
+        finally:
+            self.capture_method.close()
+            wait_for_queued_commands()
+            self.integration_server.close()
+            self.metrics_server.close()
+
+    def __is_comparing(self):
+        return bool(self.is_running or self.split_engine.start_image)
+
+    def __get_tick_rate(self):
+        return self.settings_dict["fps_limit"] if self.__is_comparing() else 1 / IDLE_WAIT
+
+    def __get_comparison_request(self, timestamp: float):
+        images = self.split_engine.get_images_to_compare(timestamp)
+        return get_comparison_request(images) if images else None
+
+    def __compare_frame(self, frame: Frame):
+        was_running = self.is_running
+        for event in self.split_engine.feed([frame.image], [frame.timestamp], frame.crop_box):
+            send_command(self, event.command, event.timestamp)
+        # Reload the images for the next run once this one is over
+        if was_running and not self.is_running:
+            self.__load_split_engine()
+
+    def __wait_for_next_comparison(self, comparison_start_time: float):
+        """
+        Handle commands until the next comparison.
+        If the capture method can notify of new frames, the comparison happens as soon as one is available.
+        The fps limit is still respected, unless a delayed command is due before.
+        """
+        is_comparing = self.__is_comparing()
+        frame_interval = 1 / self.__get_tick_rate()
+        wait_until = comparison_start_time + frame_interval
+        if self.split_engine.delayed_command_time is not None:
+            wait_until = min(wait_until, self.split_engine.delayed_command_time)
+        while not self.__should_exit:
+            try:
+                command = self.__commands.get(timeout=max(wait_until - time(), 0))
+            except Empty:
+                break
+            self.__handle_command(command)
+        if is_comparing and self.capture_method.notifies_new_frames and self.split_engine.delayed_command_time is None:
+            self.capture_method.wait_for_new_frame(frame_interval)
+
+    def __handle_command(self, line: str):
+        was_running = self.is_running
+        match line:
+            case "kill":
+                self.__should_exit = True
+            case "start":
+                self.start_auto_splitter()
+            case "split" | "skip":
+                if self.split_engine.skip_split():
+                    send_command(self, "skip")
+            case "undo":
+                if self.split_engine.undo_split():
+                    send_command(self, "undo")
+            case "reset":
+                self.split_engine.reset()
+            case line:
+                if line.startswith("settings"):
+                    # Allow for any split character between "settings" and the path
+                    self.load_settings(line[9:])
+                elif line.startswith("trace"):
+                    tracing.save_trace(self, line[6:])
+                elif line.startswith("profile"):
+                    profiler.handle_command(self, line[8:])
+        # Reload the images for the next run if this one was reset
+        if was_running and not self.is_running:
+            self.__load_split_engine()
+
+    def load_settings(self, settings_file_path: str):
+        try:
+            self.settings_dict = read_settings_file(settings_file_path)
+        except (FileNotFoundError, MemoryError, TypeError, toml.TomlDecodeError):
+            error_messages.invalid_settings()
+            return
+        self.split_engine.settings_dict = self.settings_dict
+        self.capture_method.close()
+        self.capture_method = self.__create_capture_method()
+        self.integration_server.listen(self.settings_dict["integration_port"])
+        self.metrics_server.listen(self.settings_dict["metrics_port"])
+        tracing.configure(self.settings_dict["trace_buffer_size"])
+        self.stall_watchdog.configure(self.settings_dict["stall_watchdog_frames"])
+        if not self.is_running:
+            self.__load_split_engine()
+
+    def __load_split_engine(self):
+        """Load the images into a new SplitEngine, ready to compare the Start Image."""
+        self.split_engine = SplitEngine(self.settings_dict)
+        if not validate_before_parsing(self):
+            return False
+        start_image, reset_image, split_images, error_message = load_images(self.settings_dict, True)
+        if error_message:
+            error_message()
+            return False
+        self.split_engine = SplitEngine(self.settings_dict, start_image, reset_image, split_images)
+        return True
+
+    def start_auto_splitter(self):
+        if self.is_running:
+            return
+        # Set start time before parsing the images as it's a heavy operation that will cause delays
+        run_start_time = time()
+        if self.__load_split_engine():
+            self.split_engine.start(run_start_time)
+
+    def __shift_capture_region(self, offset_x: int, offset_y: int):
+        """
+        Follow the captured window's content when drift tracking finds that it moved.
+        The capture region is kept within the captured window, or every following capture would be out of bounds.
+        """
+        capture_region = self.settings_dict["capture_region"]
+        max_x = max_y = sys.maxsize
+        if is_valid_hwnd(self.hwnd):
+            _, __, window_width, window_height = get_window_bounds(self.hwnd)
+            max_x = max(window_width - capture_region["width"], 0)
+            max_y = max(window_height - capture_region["height"], 0)
+        capture_region["x"] = min(max(capture_region["x"] + offset_x, 0), max_x)
+        capture_region["y"] = min(max(capture_region["y"] + offset_y, 0), max_y)
+
+    def __capture(self, size: tuple[int, int], crop_box: CropBox):
+        capture = self.capture_method.capture(size, crop_box)
+
+        # This most likely means we lost capture
+        # (ie the captured window was closed, crashed, lost capture device, etc.)
+        # Try to recover by using the window name
+        if (
+            not is_valid_image(capture)
+            and self.settings_dict["capture_method"] != CaptureMethodEnum.VIDEO_CAPTURE_DEVICE
+            and self.capture_recovery.try_recover()
+        ):
+            capture = self.capture_method.capture(size, crop_box)
+        if is_valid_image(capture):
+            self.capture_recovery.capture_succeeded()
+        return capture
+
+
+def main(settings_file_path: str):
+    try:
+        settings_dict = read_settings_file(settings_file_path)
+    except (FileNotFoundError, MemoryError, TypeError, toml.TomlDecodeError):
+        error_messages.invalid_settings()
+        sys.exit(1)
+
+    try:
+        AutoSplitHeadless(settings_dict).run()
+    except KeyboardInterrupt:
+        pass
+    except Exception as exception:  # noqa: BLE001 # We really want to catch everything here
+        error_messages.handle_top_level_exceptions(exception)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[-1])
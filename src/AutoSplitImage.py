@@ -1,6 +1,8 @@
 import os
+from collections.abc import Iterable
 from enum import IntEnum, auto
 from math import sqrt
+from time import perf_counter
 from typing import TYPE_CHECKING
 
 import cv2
@@ -8,11 +10,34 @@ import numpy as np
 from cv2.typing import MatLike
 
 import error_messages
-from compare import check_if_image_has_transparency, get_comparison_method_by_index
-from utils import BGR_CHANNEL_COUNT, MAXBYTE, ColorChannel, ImageShape, is_valid_image
+import metrics
+import tracing
+from compare import (
+    CompiledMask,
+    IncrementalHistogram,
+    PixelSample,
+    check_if_image_has_transparency,
+    compare_histograms,
+    compare_l2_norm,
+    compare_l2_norm_approximate,
+    get_comparison_method_by_index,
+)
+from FrameBus import CaptureRequest, merge_capture_requests
+from utils import (
+    BGRA_CHANNEL_COUNT,
+    FULL_CROP_BOX,
+    MAXBYTE,
+    ColorChannel,
+    CropBox,
+    ImageShape,
+    crop_to_box,
+    is_valid_image,
+    relative_crop_box,
+)
 
 if TYPE_CHECKING:
     from AutoSplit import AutoSplit
+    from SplitEngine import SplitEngine
 
 
 # Resize to these width and height so that FPS performance increases
@@ -25,6 +50,12 @@ MASK_UPPER_BOUND = np.array([MAXBYTE, MAXBYTE, MAXBYTE, MAXBYTE], dtype="uint8")
 START_KEYWORD = "start_auto_splitter"
 RESET_KEYWORD = "reset"
 
+comparison_duration = metrics.Histogram(
+    "autosplit_comparison_duration_seconds",
+    "Time to compare an image with a frame",
+    "comparison_method",
+)
+
 
 class ImageType(IntEnum):
     SPLIT = auto()
@@ -40,6 +71,12 @@ class AutoSplitImage:
     image_type: ImageType
     byte_array: MatLike | None = None
     mask: MatLike | None = None
+    compiled_mask: CompiledMask | None = None
+    pixel_sample: PixelSample | None = None
+    """Used when approximate comparisons are enabled"""
+    incremental_histogram: IncrementalHistogram | None = None
+    crop_box: CropBox = FULL_CROP_BOX
+    """Bounding box of the image's opaque parts. Only that part of the capture region needs to be compared."""
     # This value is internal, check for mask instead
     _has_transparency = False
     # These values should be overriden by some Defaults if None. Use getters instead
@@ -47,8 +84,9 @@ class AutoSplitImage:
     __comparison_method: int | None = None
     __pause_time: float | None = None
     __similarity_threshold: float | None = None
+    __check_rate: float | None = None
 
-    def get_delay_time(self, default: "AutoSplit | int"):
+    def get_delay_time(self, default: "AutoSplit | SplitEngine | int"):
         """Get image's delay time or fallback to the default value from spinbox."""
         if self.__delay_time is not None:
             return self.__delay_time
@@ -56,7 +94,7 @@ class AutoSplitImage:
             return default
         return default.settings_dict["default_delay_time"]
 
-    def __get_comparison_method_index(self, default: "AutoSplit | int"):
+    def __get_comparison_method_index(self, default: "AutoSplit | SplitEngine | int"):
         """Get image's comparison or fallback to the default value from combobox."""
         if self.__comparison_method is not None:
             return self.__comparison_method
@@ -64,7 +102,7 @@ class AutoSplitImage:
             return default
         return default.settings_dict["default_comparison_method"]
 
-    def get_pause_time(self, default: "AutoSplit | float"):
+    def get_pause_time(self, default: "AutoSplit | SplitEngine | float"):
         """Get image's pause time or fallback to the default value from spinbox."""
         if self.__pause_time is not None:
             return self.__pause_time
@@ -72,7 +110,7 @@ class AutoSplitImage:
             return default
         return default.settings_dict["default_pause_time"]
 
-    def get_similarity_threshold(self, default: "AutoSplit | float"):
+    def get_similarity_threshold(self, default: "AutoSplit | SplitEngine | float"):
         """Get image's similarity threshold or fallback to the default value from spinbox."""
         if self.__similarity_threshold is not None:
             return self.__similarity_threshold
@@ -80,6 +118,14 @@ class AutoSplitImage:
             return default
         return default.settings_dict["default_similarity_threshold"]
 
+    def get_check_rate(self, default: "AutoSplit | SplitEngine | float"):
+        """Get image's check rate (comparisons per second), capped at the FPS limit, or fallback to the FPS limit."""
+        fps_limit = default if isinstance(default, (float, int)) else default.settings_dict["fps_limit"]
+        # Comparisons can't happen more often than the FPS limit anyway
+        if self.__check_rate is not None and self.__check_rate < fps_limit:
+            return self.__check_rate
+        return fps_limit
+
     def __init__(self, path: str):
         self.path = path
         self.filename = os.path.split(path)[-1].lower()
@@ -89,6 +135,7 @@ class AutoSplitImage:
         self.__comparison_method = comparison_method_from_filename(self.filename)
         self.__pause_time = pause_from_filename(self.filename)
         self.__similarity_threshold = threshold_from_filename(self.filename)
+        self.__check_rate = check_rate_from_filename(self.filename)
         self.__read_image_bytes(path)
 
         if START_KEYWORD in self.filename:
@@ -108,6 +155,17 @@ class AutoSplitImage:
         self._has_transparency = check_if_image_has_transparency(image)
         # If image has transparency, create a mask
         if self._has_transparency:
+            # Only keep the bounding box of the opaque parts, the rest would be entirely masked out anyway
+            alpha = image[:, :, ColorChannel.Alpha]
+            x, y, width, height = cv2.boundingRect(alpha)
+            self.crop_box = (
+                x / image.shape[ImageShape.X],
+                y / image.shape[ImageShape.Y],
+                width / image.shape[ImageShape.X],
+                height / image.shape[ImageShape.Y],
+            )
+            image = image[y : y + height, x : x + width]
+
             # Adaptively determine the target size according to
             # the number of nonzero elements in the alpha channel of the split image.
             # This may result in images bigger than COMPARISON_RESIZE if there's plenty of transparency.
@@ -126,10 +184,16 @@ class AutoSplitImage:
             self.mask = cv2.inRange(image, MASK_LOWER_BOUND, MASK_UPPER_BOUND)
         else:
             image = cv2.resize(image, COMPARISON_RESIZE, interpolation=cv2.INTER_NEAREST)
-            # Add Alpha channel if missing
-            if image.shape[ImageShape.Channels] == BGR_CHANNEL_COUNT:
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
 
+        # Only the mask needs the alpha channel, comparisons are done in BGR
+        if image.shape[ImageShape.Channels] == BGRA_CHANNEL_COUNT:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+
+        if self.mask is None:
+            self.incremental_histogram = IncrementalHistogram()
+        else:
+            self.compiled_mask = CompiledMask(image, self.mask)
+        self.pixel_sample = PixelSample(image, self.mask)
         self.byte_array = image
 
     def check_flag(self, flag: int):
@@ -137,25 +201,80 @@ class AutoSplitImage:
 
     def compare_with_capture(
         self,
-        default: "AutoSplit | int",
+        default: "AutoSplit | SplitEngine | int",
         capture: MatLike | None,
+        capture_crop_box: CropBox = FULL_CROP_BOX,
     ):
-        """Compare image with capture using image's comparison method. Falls back to combobox."""
-        if not is_valid_image(self.byte_array) or not is_valid_image(capture):
+        """
+        Compare image with capture using image's comparison method. Falls back to combobox.
+
+        @param capture_crop_box: Which part of the capture region `capture` is. Must contain the image's `crop_box`
+        """
+        byte_array = self.byte_array
+        if not is_valid_image(byte_array) or not is_valid_image(capture):
             return 0.0
-        resized_capture = cv2.resize(capture, self.byte_array.shape[1::-1])
-
-        return get_comparison_method_by_index(
-            self.__get_comparison_method_index(default),
-        )(
-            self.byte_array,
-            resized_capture,
-            self.mask,
+        if self.crop_box != capture_crop_box:
+            capture = crop_to_box(capture, relative_crop_box(self.crop_box, capture_crop_box))
+        # The capture is usually already resized at the capture stage
+        if capture.shape[:2] != byte_array.shape[:2]:
+            capture = cv2.resize(capture, byte_array.shape[1::-1], interpolation=cv2.INTER_AREA)
+
+        comparison_method = get_comparison_method_by_index(self.__get_comparison_method_index(default))
+        with tracing.span("compare", self.filename):
+            start_time = perf_counter()
+            if (
+                comparison_method is compare_l2_norm
+                and self.pixel_sample
+                and not isinstance(default, int)
+                and default.settings_dict["approximate_comparisons"]
+            ):
+                comparison_method = compare_l2_norm_approximate
+                similarity = compare_l2_norm_approximate(
+                    byte_array,
+                    capture,
+                    self.pixel_sample,
+                    self.get_similarity_threshold(default),
+                    self.compiled_mask,
+                )
+            elif comparison_method is compare_histograms:
+                similarity = compare_histograms(
+                    byte_array,
+                    capture,
+                    self.compiled_mask,
+                    self.incremental_histogram,
+                )
+            else:
+                similarity = comparison_method(
+                    byte_array,
+                    capture,
+                    self.compiled_mask,
+                )
+        comparison_duration.labels(comparison_method.__name__.removeprefix("compare_")).observe(
+            perf_counter() - start_time,
         )
+        return similarity
+
+
+def get_comparison_request(images: Iterable[AutoSplitImage | None]):
+    """
+    Which part of the capture region is needed to compare it with `images`,
+    and the size to resize it to so that it is large enough for any of them.
+
+    @return: The size (width, height) and crop box to request from the capture method
+    """
+    requests = [
+        CaptureRequest((image.byte_array.shape[ImageShape.X], image.byte_array.shape[ImageShape.Y]), image.crop_box)
+        for image in images
+        if image and is_valid_image(image.byte_array)
+    ]
+    if not requests:
+        return CaptureRequest(COMPARISON_RESIZE)
+    return merge_capture_requests(requests)
 
 
 if True:
     from split_parser import (
+        check_rate_from_filename,
         comparison_method_from_filename,
         delay_time_from_filename,
         flags_from_filename,
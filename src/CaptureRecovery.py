@@ -0,0 +1,91 @@
+"""
+Decides when to try recovering the captured window after capture was lost.
+
+Recovering is expensive for some capture methods (ie: Windows Graphics Capture rebuilds its frame pool).
+While the game is closed or loading, trying on every frame would burn CPU at the full FPS limit.
+Attempts are instead spaced by an exponential backoff, except when a new window with the title shows up.
+"""
+
+from random import uniform
+from time import time
+from typing import TYPE_CHECKING
+
+import win32gui
+
+import metrics
+import tracing
+from utils import is_valid_hwnd
+
+if TYPE_CHECKING:
+    from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
+
+RECOVERY_INITIAL_DELAY = 0.1
+"""Time to wait after the first failed attempt, in seconds. Doubled after every failed attempt."""
+RECOVERY_MAX_DELAY = 5
+"""Maximum time between two attempts, in seconds"""
+RECOVERY_JITTER = 0.25
+"""Randomly vary delays by up to this fraction, so retries don't keep lining up with the same frames"""
+
+recovery_attempts = metrics.Counter(
+    "autosplit_capture_recovery_attempts_total",
+    "Attempts to recover the captured window after capture was lost",
+)
+recoveries = metrics.Counter(
+    "autosplit_capture_recoveries_total",
+    "Times capture was lost then recovered",
+)
+time_to_recover = metrics.Summary(
+    "autosplit_capture_time_to_recover_seconds",
+    "Time between losing capture and getting a valid frame again",
+)
+
+
+class CaptureRecovery:
+    def __init__(self, autosplit: "AutoSplit | AutoSplitHeadless"):
+        self._autosplit_ref = autosplit
+        self.__lost_since: float | None = None
+        self.__delay = RECOVERY_INITIAL_DELAY
+        self.__next_attempt_time = 0.0
+        self.__failed_hwnd = 0
+        """Window found by the last failed attempt. Only a different window is worth retrying immediately."""
+
+    def capture_succeeded(self):
+        """Call on every valid frame."""
+        if self.__lost_since is None:
+            return
+        time_to_recover.observe(time() - self.__lost_since)
+        recoveries.inc()
+        self.__lost_since = None
+        self.__delay = RECOVERY_INITIAL_DELAY
+        self.__failed_hwnd = 0
+
+    def try_recover(self):
+        """
+        Call on every invalid frame. Only actually tries to recover the window if an attempt is due.
+
+        @return: True if the window was recovered and a new frame can be captured
+        """
+        now = time()
+        if self.__lost_since is None:
+            # Capture was just lost, try right away
+            self.__lost_since = now
+        elif now < self.__next_attempt_time and not self.__has_new_window_appeared():
+            return False
+
+        recovery_attempts.inc()
+        captured_window_title = self._autosplit_ref.settings_dict["captured_window_title"]
+        with tracing.span("recover window", captured_window_title):
+            is_recovered = self._autosplit_ref.capture_method.recover_window(captured_window_title)
+        if is_recovered:
+            return True
+
+        self.__failed_hwnd = win32gui.FindWindow(None, captured_window_title)
+        self.__next_attempt_time = now + self.__delay * uniform(1 - RECOVERY_JITTER, 1 + RECOVERY_JITTER)  # noqa: S311
+        self.__delay = min(self.__delay * 2, RECOVERY_MAX_DELAY)
+        return False
+
+    def __has_new_window_appeared(self):
+        # Looking up the window is cheap, unlike reinitializing the capture
+        hwnd = win32gui.FindWindow(None, self._autosplit_ref.settings_dict["captured_window_title"])
+        return is_valid_hwnd(hwnd) and hwnd != self.__failed_hwnd
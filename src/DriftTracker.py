@@ -0,0 +1,127 @@
+"""
+Keeps the capture region on the captured window's content while running.
+
+If the game window shifts by a few pixels (ie: a resolution change or toggling borders),
+every split would silently stop matching. Every few seconds, a small frame of the whole capture region
+is compared with the previous one using phase correlation to estimate how much its content moved.
+"""
+
+from collections.abc import Callable
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+import metrics
+from FrameBus import CaptureRequest, Frame
+from utils import FULL_CROP_BOX, ImageShape, is_valid_image
+
+if TYPE_CHECKING:
+    from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
+
+DRIFT_TRACKING_WIDTH = 320
+"""Width the capture region is downscaled to before estimating its drift. The height keeps the aspect ratio."""
+DRIFT_TRACKING_MIN_INTERVAL = 0.5
+"""Minimum time between two drift checks, in seconds, to bound the cost of drift tracking"""
+DRIFT_MIN_RESPONSE = 0.3
+"""
+How sharp the phase correlation peak must be for the estimated shift to be trusted.
+Lower responses mean the content changed too much between both frames to tell.
+"""
+
+drift_checks = metrics.Counter(
+    "autosplit_drift_checks_total",
+    "Times the capture region was checked for drift",
+)
+drift_check_duration = metrics.Summary(
+    "autosplit_drift_check_duration_seconds",
+    "Time to estimate how much the capture region's content moved",
+)
+
+
+class DriftTracker:
+    def __init__(
+        self,
+        autosplit: "AutoSplit | AutoSplitHeadless",
+        on_drift: Callable[[int, int], object],
+    ):
+        """@param on_drift: Called with the (x, y) offset, in pixels, to move the capture region by."""
+        self._autosplit_ref = autosplit
+        """Single underscore, like every other component's reference back to AutoSplit"""
+        self.__on_drift = on_drift
+        self.__reference: MatLike | None = None
+        self.__window: MatLike | None = None
+        self.__pending_offset: tuple[int, int] | None = None
+
+    def __is_enabled(self):
+        return self._autosplit_ref.is_running and self._autosplit_ref.settings_dict["drift_tracking_interval"] > 0
+
+    def get_rate(self):
+        return 1 / max(self._autosplit_ref.settings_dict["drift_tracking_interval"], DRIFT_TRACKING_MIN_INTERVAL)
+
+    def get_request(self, _timestamp: float):
+        if not self.__is_enabled():
+            return None
+        region = self._autosplit_ref.settings_dict["capture_region"]
+        height = max(1, round(DRIFT_TRACKING_WIDTH * region["height"] / max(region["width"], 1)))
+        return CaptureRequest((DRIFT_TRACKING_WIDTH, height))
+
+    def reset(self):
+        self.__reference = None
+        self.__pending_offset = None
+
+    def on_frame(self, frame: Frame):
+        if not self.__is_enabled():
+            self.reset()
+            return
+        if not is_valid_image(frame.image) or frame.crop_box != FULL_CROP_BOX:
+            return
+        check_start_time = perf_counter()
+        self.__check_drift(frame.image)
+        drift_check_duration.observe(perf_counter() - check_start_time)
+        drift_checks.inc()
+
+    def __check_drift(self, image: MatLike):
+        # The frame may be bigger if its capture was shared with another subscriber
+        if image.shape[ImageShape.X] != DRIFT_TRACKING_WIDTH:
+            height = round(DRIFT_TRACKING_WIDTH * image.shape[ImageShape.Y] / image.shape[ImageShape.X])
+            image = cv2.resize(image, (DRIFT_TRACKING_WIDTH, height), interpolation=cv2.INTER_AREA)
+        current = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+        reference = self.__reference
+        if reference is None or reference.shape != current.shape:
+            self.reset()
+            self.__reference = current
+            self.__window = cv2.createHanningWindow(current.shape[1::-1], cv2.CV_32F)
+            return
+
+        (shift_x, shift_y), response = cv2.phaseCorrelate(reference, current, self.__window)
+        region = self._autosplit_ref.settings_dict["capture_region"]
+        offset = (
+            round(shift_x * region["width"] / current.shape[ImageShape.X]),
+            round(shift_y * region["height"] / current.shape[ImageShape.Y]),
+        )
+        tolerance = self._autosplit_ref.settings_dict["drift_tolerance"]
+
+        # Not enough drift, or the content changed too much to tell. Compare with the latest content next time.
+        if response < DRIFT_MIN_RESPONSE or max(abs(offset[0]), abs(offset[1])) <= tolerance:
+            self.reset()
+            self.__reference = current
+            return
+
+        # The camera could simply be panning. Only move once the same offset is found twice in a row.
+        pending_offset = self.__pending_offset
+        if (
+            pending_offset is None
+            or abs(pending_offset[0] - offset[0]) > tolerance
+            or abs(pending_offset[1] - offset[1]) > tolerance
+        ):
+            self.__pending_offset = offset
+            return
+
+        # Frames captured after moving the region can't be compared with the old reference
+        self.reset()
+        self.__on_drift(*offset)
@@ -0,0 +1,137 @@
+"""
+Shares a single capture per tick between everything that needs frames.
+
+The live preview, Start Image, Reset Image and split images all subscribe with their own rate.
+Each tick, the requests of every subscriber that is due are merged into a single capture.
+"""
+
+from collections.abc import Callable, Iterable
+from math import inf
+from time import perf_counter
+from typing import NamedTuple
+
+from cv2.typing import MatLike
+
+import tracing
+from utils import FULL_CROP_BOX, CropBox, union_of_crop_boxes
+
+
+class CaptureRequest(NamedTuple):
+    size: tuple[int, int]
+    """Minimum size (width, height) the requested part of the capture region is needed at"""
+    crop_box: CropBox = FULL_CROP_BOX
+    """Which part of the capture region is needed"""
+
+
+class Frame(NamedTuple):
+    image: MatLike | None
+    """The capture, `None` if nothing needed capturing this tick or if capture was lost"""
+    crop_box: CropBox
+    """Which part of the capture region `image` is"""
+    timestamp: float
+
+
+class FrameSubscription:
+    def __init__(
+        self,
+        on_frame: Callable[[Frame], object],
+        get_request: Callable[[float], CaptureRequest | None],
+        get_rate: Callable[[], float] | None,
+    ):
+        self.on_frame = on_frame
+        self.get_request = get_request
+        """What the subscriber needs captured at a given time. `None` if it only needs to be notified of the tick."""
+        self.get_rate = get_rate
+        """How many frames per second the subscriber needs. `None` to get every tick."""
+        self.last_frame_time = -inf
+
+
+class FrameBus:
+    def __init__(
+        self,
+        capture: Callable[[tuple[int, int], CropBox], MatLike | None],
+        get_tick_rate: Callable[[], float],
+    ):
+        """
+        Subscribers are notified in the order they subscribed.
+
+        @param capture: Grabs the given part of the capture region, resized to the given size
+        @param get_tick_rate: How many times per second `tick` is expected to be called
+        """
+        self.__capture = capture
+        self.__get_tick_rate = get_tick_rate
+        self.__subscriptions: list[FrameSubscription] = []
+        self.tick_start_time = perf_counter()
+        """`time.perf_counter` when the last tick started"""
+        self.tick_end_time = self.tick_start_time
+        """`time.perf_counter` when the last tick ended. Before `tick_start_time` while a tick is running."""
+
+    @property
+    def tick_rate(self):
+        return self.__get_tick_rate()
+
+    def subscribe(
+        self,
+        on_frame: Callable[[Frame], object],
+        get_request: Callable[[float], CaptureRequest | None] = lambda _: None,
+        get_rate: Callable[[], float] | None = None,
+    ):
+        subscription = FrameSubscription(on_frame, get_request, get_rate)
+        self.__subscriptions.append(subscription)
+        return subscription
+
+    def __is_due(self, subscription: FrameSubscription, timestamp: float):
+        if subscription.get_rate is None:
+            return True
+        # Allow half a tick of leeway so that timer jitter doesn't skip a whole tick
+        return timestamp - subscription.last_frame_time >= 1 / subscription.get_rate() - 0.5 / self.__get_tick_rate()
+
+    def tick(self, timestamp: float):
+        """Capture once for every subscriber that is due, then send them the frame."""
+        self.tick_start_time = perf_counter()
+        try:
+            return self.__tick(timestamp)
+        finally:
+            self.tick_end_time = perf_counter()
+
+    def __tick(self, timestamp: float):
+        due_subscriptions = [
+            subscription
+            for subscription in self.__subscriptions
+            if self.__is_due(subscription, timestamp)
+        ]
+        requests = [
+            request
+            for request in (subscription.get_request(timestamp) for subscription in due_subscriptions)
+            if request
+        ]
+
+        with tracing.span("frame"):
+            if requests:
+                size, crop_box = merge_capture_requests(requests)
+                frame = Frame(self.__capture(size, crop_box), crop_box, timestamp)
+            else:
+                frame = Frame(None, FULL_CROP_BOX, timestamp)
+
+            # Mark every subscriber as served first, so they can tell who else got this frame
+            for subscription in due_subscriptions:
+                subscription.last_frame_time = timestamp
+            for subscription in due_subscriptions:
+                subscription.on_frame(frame)
+        return frame
+
+
+def merge_capture_requests(requests: Iterable[CaptureRequest]):
+    """
+    The smallest part of the capture region that contains every requested part,
+    at a size large enough for each of them.
+    """
+    requests = list(requests)
+    crop_box = union_of_crop_boxes(crop_box for _, crop_box in requests)
+    _, _, crop_width, crop_height = crop_box
+    # Each request needs enough pixels within its own crop box
+    size = (
+        round(crop_width * max(width / request_crop_box[2] for (width, _), request_crop_box in requests)),
+        round(crop_height * max(height / request_crop_box[3] for (_, height), request_crop_box in requests)),
+    )
+    return CaptureRequest(size, crop_box)
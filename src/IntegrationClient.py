@@ -0,0 +1,127 @@
+"""
+Framing of the local socket integration protocol, and a client for it.
+
+Every message is a compact JSON object, prefixed by its length as a 4 bytes big-endian unsigned integer.
+
+Run this module directly to try the protocol against a running AutoSplit:
+`python IntegrationClient.py <port>`. Lines typed in are sent as commands, ie: `split` or `settings <path>`,
+`stream <rate>` streams the similarities `rate` times per second and `metrics` asks for all metrics.
+Every message received is printed.
+"""
+
+import json
+import socket
+import struct
+import sys
+from threading import Thread
+from typing import Any
+
+HOST = "127.0.0.1"
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 64 * 1024
+"""Larger messages are considered a protocol error"""
+
+Message = dict[str, Any]
+
+
+def encode_message(message: Message):
+    payload = json.dumps(message, separators=(",", ":")).encode()
+    return HEADER.pack(len(payload)) + payload
+
+
+class MessageDecoder:
+    """Splits the received bytes back into messages, however they were chunked."""
+
+    def __init__(self):
+        self.__buffer = bytearray()
+
+    def feed(self, data: bytes):
+        """
+        Decode every message completed by `data`.
+
+        @raise ValueError: If the bytes received aren't valid messages
+        """
+        self.__buffer += data
+        messages: list[Message] = []
+        while len(self.__buffer) >= HEADER.size:
+            (size,) = HEADER.unpack_from(self.__buffer)
+            if size > MAX_MESSAGE_SIZE:
+                raise ValueError(f"Message of {size} bytes is too large")
+            if len(self.__buffer) < HEADER.size + size:
+                break
+            message = json.loads(self.__buffer[HEADER.size : HEADER.size + size])
+            del self.__buffer[: HEADER.size + size]
+            if not isinstance(message, dict):
+                raise ValueError("Messages must be JSON objects")  # noqa: TRY004 # Handled like any invalid message
+            messages.append(message)  # pyright: ignore[reportUnknownArgumentType]
+        return messages
+
+
+class IntegrationClient:
+    def __init__(self, port: int):
+        self.__socket = socket.create_connection((HOST, port))
+        self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.__decoder = MessageDecoder()
+        self.__received: list[Message] = []
+        self.__next_id = 0
+
+    def send(self, message: Message):
+        self.__socket.sendall(encode_message(message))
+
+    def send_command(self, command: str):
+        """@return: The id to match the acknowledgement with."""
+        self.__next_id += 1
+        self.send({"type": "command", "id": self.__next_id, "command": command})
+        return self.__next_id
+
+    def stream(self, rate: float):
+        """Receive the similarities `rate` times per second. 0 to stop."""
+        self.send({"type": "stream", "rate": rate})
+
+    def request_metrics(self):
+        self.__next_id += 1
+        self.send({"type": "metrics", "id": self.__next_id})
+        return self.__next_id
+
+    def receive(self):
+        """
+        Block until a message is received.
+
+        @return: The next message, None once the connection is closed
+        """
+        while not self.__received:
+            data = self.__socket.recv(4096)
+            if not data:
+                return None
+            self.__received += self.__decoder.feed(data)
+        return self.__received.pop(0)
+
+    def close(self):
+        self.__socket.close()
+
+
+def main(port: int):
+    client = IntegrationClient(port)
+
+    def print_messages():
+        while (message := client.receive()) is not None:
+            print(message, flush=True)
+
+    Thread(target=print_messages, daemon=True).start()
+    try:
+        for line in sys.stdin:
+            line = line.strip()  # noqa: PLW2901
+            if line.startswith("stream"):
+                client.stream(float(line[7:] or 0))
+            elif line == "metrics":
+                client.request_metrics()
+            elif line:
+                client.send_command(line)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[-1]))
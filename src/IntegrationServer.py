@@ -0,0 +1,263 @@
+"""
+Optional local socket endpoint for timer integrations, alongside the stdin/stdout protocol.
+
+Only listens on localhost, on the profile's `integration_port`. See `IntegrationClient` for how messages are framed.
+
+Clients can send:
+- `{"type": "command", "id": 1, "command": "split"}`: The same commands as stdin. Acknowledged with the same id.
+- `{"type": "stream", "rate": 10}`: Receive the similarities up to `rate` times per second. 0 to stop.
+- `{"type": "metrics", "id": 2}`: Receive the current value of every metric.
+
+AutoSplit sends:
+- `hello`: The version and process ID, once connected.
+- `ack`: When a command was received and when it was queued to be handled, as Unix timestamps.
+- `event`: Every command AutoSplit sends to the timer, with when it happened, was queued and sent.
+- `similarity`: The live, highest and threshold similarities of the image being compared.
+- `metrics`: The answer to a `metrics` request.
+- `error`: The message couldn't be understood. Invalid framing also closes the connection.
+"""
+
+import os
+import selectors
+import socket
+from collections.abc import Callable
+from queue import Empty, SimpleQueue
+from threading import Thread
+from time import perf_counter, time
+from typing import TYPE_CHECKING
+
+import error_messages
+import metrics
+from hotkeys import DispatchedCommand, command_listeners
+from IntegrationClient import HOST, Message, MessageDecoder, encode_message
+from utils import AUTOSPLIT_VERSION
+
+if TYPE_CHECKING:
+    from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
+
+STREAM_MAX_RATE = 60
+"""Maximum similarities sent per second to a single client"""
+SELECT_TIMEOUT = 0.1
+"""How long to wait for a client to send something, in seconds, when no similarities are streamed"""
+SEND_TIMEOUT = 1
+"""Clients that don't read what's sent to them for this many seconds are disconnected"""
+
+
+class IntegrationConnection:
+    def __init__(self, connection: socket.socket):
+        self.socket = connection
+        self.decoder = MessageDecoder()
+        self.stream_rate = 0.0
+        self.last_stream_time = 0.0
+
+    def send(self, message: Message):
+        try:
+            self.socket.sendall(encode_message(message))
+        except OSError:
+            return False
+        return True
+
+
+class IntegrationServer:
+    def __init__(self, autosplit: "AutoSplit | AutoSplitHeadless", handle_command: Callable[[str], object]):
+        """@param handle_command: Handles a stdin command line. Called from the server's thread."""
+        self._autosplit_ref = autosplit
+        """Not name-mangled, to match the capture methods and widgets that also keep a reference to AutoSplit"""
+        self.__handle_command = handle_command
+        self.port = 0
+        self.__server_socket: socket.socket | None = None
+        self.__connections: list[IntegrationConnection] = []
+        self.__events: SimpleQueue[Message] = SimpleQueue()
+        """Events to send to every client, queued from the command dispatcher thread"""
+        self.__wakeup_socket: socket.socket | None = None
+        """Interrupts the server's thread waiting for clients, so that events are sent right away"""
+        command_listeners.append(self.__queue_event)
+
+    def listen(self, port: int):
+        """Start listening on `port`, or stop listening if 0. Does nothing if already listening on that port."""
+        if port == self.port:
+            return
+        self.close()
+        if not port:
+            return
+        try:
+            server_socket = socket.create_server((HOST, port))
+        except OSError:
+            self._autosplit_ref.show_error_signal.emit(lambda: error_messages.integration_port(port))
+            return
+        self.port = port
+        self.__server_socket = server_socket
+        Thread(target=self.__serve, args=(server_socket,), name="IntegrationServer", daemon=True).start()
+
+    def close(self):
+        """The server's thread closes the sockets once it notices."""
+        self.port = 0
+        self.__server_socket = None
+
+    def __serve(self, server_socket: socket.socket):
+        selector = selectors.DefaultSelector()
+        server_socket.setblocking(False)
+        selector.register(server_socket, selectors.EVENT_READ)
+        wakeup_receiver, wakeup_sender = socket.socketpair()
+        wakeup_receiver.setblocking(False)
+        wakeup_sender.setblocking(False)
+        selector.register(wakeup_receiver, selectors.EVENT_READ)
+        self.__wakeup_socket = wakeup_sender
+        try:
+            while self.__server_socket is server_socket:
+                is_streaming = any(connection.stream_rate for connection in self.__connections)
+                for key, _ in selector.select(1 / STREAM_MAX_RATE if is_streaming else SELECT_TIMEOUT):
+                    if key.fileobj is server_socket:
+                        self.__accept(server_socket, selector)
+                    elif key.fileobj is wakeup_receiver:
+                        self.__drain(wakeup_receiver)
+                    elif not self.__receive(key.data):
+                        self.__disconnect(key.data, selector)
+                failed_connections = [*self.__send_events(), *self.__stream_similarities()]
+                for connection in dict.fromkeys(failed_connections):
+                    self.__disconnect(connection, selector)
+        finally:
+            self.__wakeup_socket = None
+            for connection in self.__connections:
+                connection.socket.close()
+            self.__connections = []
+            selector.close()
+            wakeup_receiver.close()
+            wakeup_sender.close()
+            server_socket.close()
+
+    @staticmethod
+    def __drain(wakeup_receiver: socket.socket):
+        try:
+            while wakeup_receiver.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def __accept(self, server_socket: socket.socket, selector: selectors.BaseSelector):
+        try:
+            client_socket, _ = server_socket.accept()
+        except OSError:
+            return
+        client_socket.settimeout(SEND_TIMEOUT)
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = IntegrationConnection(client_socket)
+        selector.register(client_socket, selectors.EVENT_READ, connection)
+        self.__connections.append(connection)
+        connection.send({"type": "hello", "version": AUTOSPLIT_VERSION, "pid": os.getpid()})
+
+    def __disconnect(self, connection: IntegrationConnection, selector: selectors.BaseSelector):
+        selector.unregister(connection.socket)
+        connection.socket.close()
+        self.__connections.remove(connection)
+
+    def __receive(self, connection: IntegrationConnection):
+        """@return: False if the connection should be closed."""
+        try:
+            data = connection.socket.recv(4096)
+        except OSError:
+            return False
+        if not data:
+            return False
+        received_at = time()
+        try:
+            messages = connection.decoder.feed(data)
+        except ValueError as exception:
+            connection.send({"type": "error", "message": str(exception)})
+            return False
+        return all(self.__handle_message(connection, message, received_at) for message in messages)
+
+    def __handle_message(self, connection: IntegrationConnection, message: Message, received_at: float):
+        match message.get("type"), message.get("id"):
+            case "command", message_id if isinstance(message.get("command"), str):
+                self.__handle_command(message["command"])
+                return connection.send({
+                    "type": "ack",
+                    "id": message_id,
+                    "received_at": received_at,
+                    "queued_at": time(),
+                })
+            case "stream", _ if isinstance(message.get("rate"), (int, float)):
+                connection.stream_rate = min(max(message["rate"], 0), STREAM_MAX_RATE)
+                return True
+            case "metrics", message_id:
+                return connection.send({"type": "metrics", "id": message_id, "metrics": metrics.snapshot()})
+            case _, message_id:
+                return connection.send({"type": "error", "id": message_id, "message": "Unknown or invalid message"})
+
+    def __queue_event(self, dispatched_command: DispatchedCommand):
+        """Called from the command dispatcher thread, which shouldn't wait on clients."""
+        wakeup_socket = self.__wakeup_socket
+        if wakeup_socket is None:
+            return
+        # Convert from `time.perf_counter` to Unix timestamps
+        offset = time() - perf_counter()
+        self.__events.put({
+            "type": "event",
+            "command": dispatched_command.command,
+            "timestamp": dispatched_command.timestamp,
+            "queued_at": dispatched_command.enqueue_time + offset,
+            "sent_at": dispatched_command.emit_time + offset,
+        })
+        try:
+            wakeup_socket.send(b"\0")
+        # Already woken up, or the server just stopped
+        except OSError:
+            pass
+
+    def __send_events(self):
+        """@return: The connections that failed."""
+        failed_connections: list[IntegrationConnection] = []
+        while True:
+            try:
+                message = self.__events.get_nowait()
+            except Empty:
+                return failed_connections
+            failed_connections += [
+                connection
+                for connection in self.__connections
+                if not connection.send(message)
+            ]
+
+    def __stream_similarities(self):
+        """@return: The connections that failed."""
+        now = time()
+        streaming_connections = [
+            connection
+            for connection in self.__connections
+            if connection.stream_rate and now - connection.last_stream_time >= 1 / connection.stream_rate
+        ]
+        if not streaming_connections:
+            return []
+        message = self.__get_similarity_message(now)
+        failed_connections: list[IntegrationConnection] = []
+        for connection in streaming_connections:
+            connection.last_stream_time = now
+            if not connection.send(message):
+                failed_connections.append(connection)
+        return failed_connections
+
+    def __get_similarity_message(self, timestamp: float):
+        # The SplitEngine is updated from another thread, read the split image number only once
+        split_engine = self._autosplit_ref.split_engine
+        split_image_number = split_engine.split_image_number
+        split_images = split_engine.split_images_and_loop_number
+        is_running = split_engine.is_running
+        if not is_running:
+            image = split_engine.start_image
+        elif 0 <= split_image_number < len(split_images):
+            image = split_images[split_image_number][0]
+        else:
+            image = None
+        return {
+            "type": "similarity",
+            "timestamp": timestamp,
+            "running": is_running,
+            "split_image_number": split_image_number if is_running else None,
+            "image": image.filename if image else None,
+            "similarity": split_engine.similarity,
+            "highest_similarity": split_engine.highest_similarity,
+            "threshold": image.get_similarity_threshold(split_engine) if image else None,
+            "reset_similarity": split_engine.reset_similarity,
+        }
@@ -0,0 +1,74 @@
+"""
+Optional HTTP endpoint serving AutoSplit's metrics in Prometheus' text exposition format.
+
+Only listens on localhost, on the profile's `metrics_port`, so that local monitoring can scrape `/metrics`.
+"""
+
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import TYPE_CHECKING
+
+from typing_extensions import override
+
+import error_messages
+import metrics
+from IntegrationClient import HOST
+
+if TYPE_CHECKING:
+    from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802 # Name defined by BaseHTTPRequestHandler
+        if self.path.split("?")[0] not in {"/", "/metrics"}:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = metrics.render_text().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @override
+    def log_message(self, format: str, *args: object):  # noqa: A002 # Name defined by BaseHTTPRequestHandler
+        # Don't write every scrape to stderr
+        pass
+
+
+class MetricsServer:
+    def __init__(self, autosplit: "AutoSplit | AutoSplitHeadless"):
+        self._autosplit_ref = autosplit
+        self.port = 0
+        self.__server: ThreadingHTTPServer | None = None
+
+    def listen(self, port: int):
+        """Start listening on `port`, or stop listening if 0. Does nothing if already listening on that port."""
+        if port == self.port:
+            return
+        self.close()
+        if not port:
+            return
+        try:
+            server = ThreadingHTTPServer((HOST, port), MetricsRequestHandler)
+        except OSError:
+            self._autosplit_ref.show_error_signal.emit(lambda: error_messages.metrics_port(port))
+            return
+        server.daemon_threads = True
+        self.port = port
+        self.__server = server
+        Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+
+    def close(self):
+        self.port = 0
+        if self.__server is None:
+            return
+        server = self.__server
+        self.__server = None
+        # Waits for the server's thread to notice, which takes up to its poll interval
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,413 @@
+"""
+The auto splitter's state machine, without any GUI.
+
+Time only advances with the timestamps of the frames it is fed,
+so it can be driven live by the GUI or the headless mode, or as fast as possible over recorded frames.
+"""
+
+from collections.abc import Iterable, Sequence
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Literal, NamedTuple
+
+from cv2.typing import MatLike
+
+import metrics
+import tracing
+from AutoSplitImage import AutoSplitImage
+from split_parser import BELOW_FLAG, DUMMY_FLAG, PAUSE_FLAG
+from utils import FULL_CROP_BOX, ONE_SECOND, CropBox, flatten, is_valid_image
+
+if TYPE_CHECKING:
+    from user_profile import UserProfileDict
+
+Commands = Literal["split", "start", "pause", "reset", "skip", "undo"]
+
+frames_compared = metrics.Counter(
+    "autosplit_frames_compared_total",
+    "Valid frames fed to the auto splitter, to be compared with the Start, split or Reset Image",
+)
+
+
+class SplitEvent(NamedTuple):
+    command: Commands
+    timestamp: float
+    """Timestamp of the frame that caused the command, plus the delay of delayed commands"""
+
+
+class SplitEngine:
+    settings_dict: "UserProfileDict"
+    """Read on every frame, so that settings can be changed while running"""
+    start_image: AutoSplitImage | None
+    reset_image: AutoSplitImage | None
+    split_images: list[AutoSplitImage]
+    split_images_and_loop_number: list[tuple[AutoSplitImage, int]]
+    split_groups: list[list[int]]
+    """Indexes of `split_images_and_loop_number`, a group ends on each non-dummy split image"""
+    comparison_pool: Executor | None
+    """Compares the split image while the reset image is compared on the calling thread"""
+
+    is_running = False
+    run_start_time = 0.0
+    split_image_number = 0
+    split_below_threshold = False
+    delayed_command_time: float | None = None
+    """When the pending delayed start or split command will be sent"""
+    pause_end_time = 0.0
+    pause_split_image_number = 0
+    similarity: float | None = None
+    """Last similarity of the Start Image or current split image"""
+    highest_similarity = 0.0
+    reset_similarity: float | None = None
+    reset_highest_similarity = 0.0
+    last_start_image_check_time = float("-inf")
+    last_reset_image_check_time = float("-inf")
+
+    def __init__(
+        self,
+        settings_dict: "UserProfileDict",
+        start_image: AutoSplitImage | None = None,
+        reset_image: AutoSplitImage | None = None,
+        split_images: Sequence[AutoSplitImage] = (),
+        comparison_pool: Executor | None = None,
+    ):
+        self.settings_dict = settings_dict
+        self.start_image = start_image
+        self.reset_image = reset_image
+        self.split_images = list(split_images)
+        self.comparison_pool = comparison_pool
+
+        # Construct a list of images + loop count tuples.
+        self.split_images_and_loop_number = list(
+            flatten(
+                ((split_image, i + 1) for i in range(split_image.loops))
+                for split_image
+                in self.split_images
+            ),
+        )
+
+        # Construct groups of splits
+        self.split_groups = []
+        number_of_split_images = len(self.split_images_and_loop_number)
+        current_group: list[int] = []
+        self.split_groups.append(current_group)
+        for i, image in enumerate(self.split_images_and_loop_number):
+            current_group.append(i)
+            if not image[0].check_flag(DUMMY_FLAG) and i < number_of_split_images - 1:
+                current_group = []
+                self.split_groups.append(current_group)
+
+    @property
+    def split_image(self):
+        """The current split image, None if not running or once the last one was split."""
+        if not self.is_running or self.is_current_split_out_of_range():
+            return None
+        return self.split_images_and_loop_number[self.split_image_number][0]
+
+    def is_current_split_out_of_range(self):
+        return (
+            self.split_image_number < 0
+            or self.split_image_number > len(self.split_images_and_loop_number) - 1
+        )
+
+    def is_paused(self, timestamp: float):
+        """Paused after a split, until the pause time is over or the current split changes."""
+        return timestamp < self.pause_end_time and self.split_image_number == self.pause_split_image_number
+
+    def is_reset_image_paused(self, timestamp: float):
+        if not self.reset_image:
+            return False
+        pause_times = [self.reset_image.get_pause_time(self)]
+        if self.start_image:
+            pause_times.append(self.start_image.get_pause_time(self))
+        return timestamp - self.run_start_time <= max(pause_times)
+
+    def __is_check_due(self, image: AutoSplitImage, last_check_time: float, timestamp: float):
+        """
+        Whether `image` should be compared again according to its check rate.
+        Checks happen on the frame closest to their interval, so that a check rate equal to the fps limit
+        compares every frame, regardless of the frames' timing jitter.
+        """
+        frame_interval = 1 / self.settings_dict["fps_limit"]
+        return timestamp - last_check_time >= 1 / image.get_check_rate(self) - frame_interval / 2
+
+    def __should_check_reset_image(self, timestamp: float):
+        """
+        Whether the reset image should be compared with the frame at `timestamp`.
+        It isn't while it is paused, and only as often as its check rate allows.
+        """
+        return bool(
+            self.reset_image
+            and self.settings_dict["enable_auto_reset"]
+            and not self.is_reset_image_paused(timestamp)
+            and self.__is_check_due(self.reset_image, self.last_reset_image_check_time, timestamp),
+        )
+
+    def __get_split_image_to_compare(self, timestamp: float):
+        if self.delayed_command_time is not None or self.is_paused(timestamp):
+            return None
+        return self.split_image
+
+    def get_images_to_compare(self, timestamp: float):
+        """
+        Which images the frame at `timestamp` will be compared with.
+        Live consumers can use it to only capture what is needed, or not capture at all.
+        """
+        images: list[AutoSplitImage] = []
+        if not self.is_running:
+            if (
+                self.start_image
+                and self.delayed_command_time is None
+                and self.__is_check_due(self.start_image, self.last_start_image_check_time, timestamp)
+            ):
+                images.append(self.start_image)
+            return images
+
+        split_image = self.__get_split_image_to_compare(timestamp)
+        if split_image:
+            images.append(split_image)
+        if self.reset_image and self.__should_check_reset_image(timestamp):
+            images.append(self.reset_image)
+        return images
+
+    def start(self, timestamp: float):
+        """Start the run at `timestamp`, without sending any command."""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.run_start_time = timestamp
+        self.delayed_command_time = None
+        self.split_image_number = 0
+        self.__on_split_image_changed()
+        # Start pause time
+        self.__pause(timestamp, self.start_image.get_pause_time(self) if self.start_image else 0)
+
+    def reset(self):
+        """Stop the run, without sending any command."""
+        self.is_running = False
+        self.delayed_command_time = None
+        self.split_below_threshold = False
+        self.similarity = None
+        self.highest_similarity = 0.0
+        self.reset_similarity = None
+        self.reset_highest_similarity = 0.0
+        self.last_start_image_check_time = float("-inf")
+
+    def undo_split(self, navigate_image_only: bool = False):
+        """
+        Go back to the previous split, or only the previous image.
+
+        @return: Whether it could, and the "undo" command should be sent if not `navigate_image_only`
+        """
+        # Can't undo until the run is started, while a split is delayed, or Undoing past the first image
+        if not self.is_running or self.delayed_command_time is not None or self.is_current_split_out_of_range():
+            return False
+
+        if not navigate_image_only:
+            for i, group in enumerate(self.split_groups):
+                if i > 0 and self.split_image_number in group:
+                    self.split_image_number = self.split_groups[i - 1][-1]
+                    break
+        else:
+            self.split_image_number -= 1
+        self.__on_split_image_changed()
+        # Undoing past the first image
+        if self.is_current_split_out_of_range():
+            self.reset()
+        return True
+
+    def skip_split(self, navigate_image_only: bool = False):
+        """
+        Go to the next split, or only the next image.
+
+        @return: Whether it could, and the "skip" command should be sent if not `navigate_image_only`
+        """
+        # Can't skip until the run is started, while a split is delayed, or when there are no images left
+        if not self.is_running or self.delayed_command_time is not None or self.is_current_split_out_of_range():
+            return False
+
+        if not navigate_image_only:
+            for group in self.split_groups:
+                if self.split_image_number in group:
+                    self.split_image_number = group[-1] + 1
+                    break
+        else:
+            self.split_image_number += 1
+        self.__on_split_image_changed()
+        # Splitting/skipping when there are no images left
+        if self.is_current_split_out_of_range():
+            self.reset()
+        return True
+
+    def feed(
+        self,
+        frames: Iterable[MatLike | None],
+        timestamps: Iterable[float],
+        capture_crop_box: CropBox = FULL_CROP_BOX,
+    ):
+        """
+        Advance the state machine through `frames`, in order.
+
+        @param frames: Captures of the capture region. A frame can be None if nothing needed to be compared
+        or if the capture was lost
+        @param timestamps: When each frame was captured, in seconds
+        @param capture_crop_box: Which part of the capture region the frames are, see `get_images_to_compare`
+        @return: The commands to send, in order
+        """
+        events: list[SplitEvent] = []
+        for frame, timestamp in zip(frames, timestamps, strict=True):
+            if is_valid_image(frame):
+                frames_compared.inc()
+            if self.is_running:
+                self.__feed_split_images(frame, timestamp, capture_crop_box, events)
+            else:
+                self.__feed_start_image(frame, timestamp, capture_crop_box, events)
+        return events
+
+    def __is_similarity_threshold_met(self, image: AutoSplitImage, similarity: float, frame: MatLike | None):
+        """
+        If the {b} flag is set, let similarity go above threshold first, then split on similarity below threshold.
+        Otherwise just split when similarity goes above threshold.
+        """
+        below_flag = image.check_flag(BELOW_FLAG)
+        if similarity >= image.get_similarity_threshold(self):
+            if not below_flag:
+                return True
+            self.split_below_threshold = True
+            return False
+        if below_flag and self.split_below_threshold and is_valid_image(frame):
+            self.split_below_threshold = False
+            return True
+        return False
+
+    def __feed_start_image(
+        self,
+        frame: MatLike | None,
+        timestamp: float,
+        capture_crop_box: CropBox,
+        events: list[SplitEvent],
+    ):
+        if not self.start_image:
+            return
+
+        if self.delayed_command_time is not None:
+            if timestamp >= self.delayed_command_time:
+                events.append(SplitEvent("start", self.delayed_command_time))
+                self.start(timestamp)
+            return
+
+        if not self.__is_check_due(self.start_image, self.last_start_image_check_time, timestamp):
+            return
+        self.last_start_image_check_time = timestamp
+
+        similarity = self.start_image.compare_with_capture(self, frame, capture_crop_box)
+        self.similarity = similarity
+        self.highest_similarity = max(similarity, self.highest_similarity)
+        if not self.__is_similarity_threshold_met(self.start_image, similarity, frame):
+            return
+
+        if self.start_image.check_flag(DUMMY_FLAG):
+            self.start(timestamp)
+        elif self.start_image.get_delay_time(self) > 0:
+            self.delayed_command_time = timestamp + self.start_image.get_delay_time(self) / ONE_SECOND
+        else:
+            events.append(SplitEvent("start", timestamp))
+            self.start(timestamp)
+
+    def __feed_split_images(
+        self,
+        frame: MatLike | None,
+        timestamp: float,
+        capture_crop_box: CropBox,
+        events: list[SplitEvent],
+    ):
+        split_image = self.__get_split_image_to_compare(timestamp)
+        check_reset_image = self.__should_check_reset_image(timestamp)
+
+        # OpenCV releases the GIL, so the split image can be compared at the same time as the reset image
+        split_similarity = (
+            self.comparison_pool.submit(split_image.compare_with_capture, self, frame, capture_crop_box)
+            if split_image and check_reset_image and self.comparison_pool
+            else None
+        )
+
+        if self.reset_image and check_reset_image:
+            self.last_reset_image_check_time = timestamp
+            with tracing.span("reset check"):
+                reset_similarity = self.reset_image.compare_with_capture(self, frame, capture_crop_box)
+            self.reset_similarity = reset_similarity
+            self.reset_highest_similarity = max(reset_similarity, self.reset_highest_similarity)
+            if reset_similarity >= self.reset_image.get_similarity_threshold(self):
+                if split_similarity:
+                    split_similarity.cancel()
+                events.append(SplitEvent("reset", timestamp))
+                self.reset()
+                return
+
+        if self.delayed_command_time is not None:
+            if timestamp >= self.delayed_command_time:
+                split_time = self.delayed_command_time
+                self.delayed_command_time = None
+                self.__split(timestamp, events, split_time)
+            return
+
+        if self.is_paused(timestamp):
+            return
+
+        # The last split image was split, the run is over
+        if not split_image:
+            self.is_running = False
+            return
+
+        similarity = (
+            split_similarity.result()
+            if split_similarity
+            else split_image.compare_with_capture(self, frame, capture_crop_box)
+        )
+        self.similarity = similarity
+        self.highest_similarity = max(similarity, self.highest_similarity)
+        if not self.__is_similarity_threshold_met(split_image, similarity, frame):
+            return
+
+        # If it's a delayed split, wait for the delay before sending the command
+        if not split_image.check_flag(DUMMY_FLAG) and split_image.get_delay_time(self) > 0:
+            self.delayed_command_time = timestamp + split_image.get_delay_time(self) / ONE_SECOND
+            return
+        self.__split(timestamp, events)
+
+    def __split(self, timestamp: float, events: list[SplitEvent], split_time: float | None = None):
+        """@param split_time: When the split actually happened, if it was delayed."""
+        split_image = self.split_images_and_loop_number[self.split_image_number][0]
+        # We need to make sure that this isn't a dummy split before sending the command.
+        if not split_image.check_flag(DUMMY_FLAG):
+            # if {p} flag hit pause key, otherwise hit split hotkey
+            events.append(
+                SplitEvent(
+                    "pause" if split_image.check_flag(PAUSE_FLAG) else "split",
+                    timestamp if split_time is None else split_time,
+                ),
+            )
+
+        # if loop splits is set and its the last split, go to first split.
+        # else go to the next split image.
+        if (
+            self.settings_dict["loop_splits"]
+            and self.split_image_number == len(self.split_images_and_loop_number) - 1
+        ):
+            self.split_image_number = 0
+        else:
+            self.split_image_number += 1
+        self.__on_split_image_changed()
+
+        # Pause for the amount set by the user, even after the last split image.
+        # Skipping or undoing a split ends the pause early
+        self.__pause(timestamp, split_image.get_pause_time(self))
+
+    def __pause(self, timestamp: float, pause_time: float):
+        self.pause_end_time = timestamp + pause_time
+        self.pause_split_image_number = self.split_image_number
+
+    def __on_split_image_changed(self):
+        # need to reset highest_similarity and split_below_threshold each time an image updates.
+        self.similarity = None
+        self.highest_similarity = 0.0
+        self.split_below_threshold = False
@@ -0,0 +1,113 @@
+"""
+Logs what every thread was doing when frames stop being processed, to find the cause of hitches.
+
+Every frame bus tick is a heartbeat. When none finished for the profile's `stall_watchdog_frames` frame intervals
+(ie: a blocking repaint, a slow keyboard hook or a window recovery), the stack of every thread is sampled
+once per frame interval and written to a rotating log file next to AutoSplit, with the frame timings.
+"""
+
+import logging
+import os
+import sys
+import threading
+import traceback
+from logging.handlers import RotatingFileHandler
+from time import perf_counter, sleep
+
+from FrameBus import FrameBus
+from utils import ONE_SECOND, auto_split_directory
+
+STALL_LOG_PATH = os.path.join(auto_split_directory, "stalls.log")
+STALL_LOG_MAX_BYTES = 1024 * 1024
+STALL_LOG_BACKUP_COUNT = 3
+"""Rotated log files to keep"""
+STALL_MAX_SAMPLES = 10
+"""Stack samples logged per stall. Longer stalls are only logged once they end."""
+DISABLED_CHECK_INTERVAL = 0.5
+"""How often to check if the watchdog was enabled, in seconds"""
+
+
+def __create_logger():
+    logger = logging.getLogger("AutoSplit.stalls")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = RotatingFileHandler(
+        STALL_LOG_PATH,
+        maxBytes=STALL_LOG_MAX_BYTES,
+        backupCount=STALL_LOG_BACKUP_COUNT,
+        encoding="utf-8",
+        # Only create the file once there's a stall to log
+        delay=True,
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+
+stall_logger = __create_logger()
+
+
+def format_thread_stacks():
+    """@return: The current stack of every other thread."""
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    current_thread_id = threading.get_ident()
+    # Only way to sample other threads
+    frames = sys._current_frames()  # noqa: SLF001 # pyright: ignore[reportPrivateUsage]
+    return "\n".join(
+        f"Thread {thread_names.get(thread_id, thread_id)!r}:\n" + "".join(traceback.format_stack(frame))
+        for thread_id, frame in frames.items()
+        if thread_id != current_thread_id
+    )
+
+
+class StallWatchdog:
+    def __init__(self, frame_bus: FrameBus):
+        self.__frame_bus = frame_bus
+        self.stall_frames = 0
+        """Frame intervals without a tick ending before it's a stall. 0 disables the watchdog."""
+        self.__thread: threading.Thread | None = None
+
+    def configure(self, stall_frames: int):
+        self.stall_frames = stall_frames
+        if stall_frames > 0 and self.__thread is None:
+            self.__thread = threading.Thread(target=self.__watch, name="StallWatchdog", daemon=True)
+            self.__thread.start()
+
+    def __watch(self):
+        stall_start_time: float | None = None
+        samples = 0
+        while True:
+            if self.stall_frames <= 0:
+                stall_start_time = None
+                sleep(DISABLED_CHECK_INTERVAL)
+                continue
+
+            frame_interval = 1 / self.__frame_bus.tick_rate
+            tick_start_time = self.__frame_bus.tick_start_time
+            tick_end_time = self.__frame_bus.tick_end_time
+            now = perf_counter()
+            if now - tick_end_time > self.stall_frames * frame_interval:
+                if stall_start_time != tick_end_time:
+                    stall_start_time = tick_end_time
+                    samples = 0
+                if samples < STALL_MAX_SAMPLES:
+                    samples += 1
+                    stall_logger.warning(
+                        "No frame finished for %.0f ms (%s, frame interval %.1f ms). Sample %s:\n%s",
+                        (now - tick_end_time) * ONE_SECOND,
+                        (
+                            f"stuck in a frame started {(now - tick_start_time) * ONE_SECOND:.0f} ms ago"
+                            if tick_start_time > tick_end_time
+                            else "stuck between frames"
+                        ),
+                        frame_interval * ONE_SECOND,
+                        samples,
+                        format_thread_stacks(),
+                    )
+            elif stall_start_time is not None:
+                stall_logger.warning(
+                    "Stall ended after %.0f ms",
+                    (tick_end_time - stall_start_time) * ONE_SECOND,
+                )
+                stall_start_time = None
+            sleep(frame_interval)
@@ -1,5 +1,6 @@
 import ctypes
 
+import cv2
 import numpy as np
 import pywintypes
 import win32con
@@ -9,7 +10,16 @@ from cv2.typing import MatLike
 from typing_extensions import override
 
 from capture_method.CaptureMethodBase import CaptureMethodBase
-from utils import BGRA_CHANNEL_COUNT, get_window_bounds, is_valid_hwnd, try_delete_dc
+from utils import (
+    BGRA_CHANNEL_COUNT,
+    FULL_CROP_BOX,
+    CropBox,
+    ImageShape,
+    crop_box_to_rect,
+    get_window_bounds,
+    is_valid_hwnd,
+    try_delete_dc,
+)
 
 # This is an undocumented nFlag value for PrintWindow
 PW_RENDERFULLCONTENT = 0x00000002
@@ -37,6 +47,28 @@ class BitBltCaptureMethod(CaptureMethodBase):
     @override
     def get_frame(self) -> MatLike | None:
         selection = self._autosplit_ref.settings_dict["capture_region"]
+        return self._get_image(selection["x"], selection["y"], selection["width"], selection["height"])
+
+    @override
+    def get_resized_frame(self, size: tuple[int, int], crop_box: CropBox = FULL_CROP_BOX):
+        # Only copy the part of the window that is needed
+        selection = self._autosplit_ref.settings_dict["capture_region"]
+        x, y, width, height = crop_box_to_rect(crop_box, selection["width"], selection["height"])
+        image = self._get_image(selection["x"] + x, selection["y"] + y, width, height)
+        if image is None:
+            return None
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        if image.shape[ImageShape.Channels] == BGRA_CHANNEL_COUNT:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        return image
+
+    def _get_image(self, x: int, y: int, width: int, height: int) -> MatLike | None:
+        """
+        Capture a rectangle of the selected window. Subclasses that capture differently only need to override this,
+        both full and cropped captures go through it.
+
+        @return: The image of the rectangle in BGR or BGRA format
+        """
         hwnd = self._autosplit_ref.hwnd
         image: MatLike | None = None
 
@@ -57,13 +89,13 @@ class BitBltCaptureMethod(CaptureMethodBase):
 
             compatible_dc = dc_object.CreateCompatibleDC()
             bitmap = win32ui.CreateBitmap()
-            bitmap.CreateCompatibleBitmap(dc_object, selection["width"], selection["height"])
+            bitmap.CreateCompatibleBitmap(dc_object, width, height)
             compatible_dc.SelectObject(bitmap)
             compatible_dc.BitBlt(
                 (0, 0),
-                (selection["width"], selection["height"]),
+                (width, height),
                 dc_object,
-                (selection["x"] + left_bounds, selection["y"] + top_bounds),
+                (x + left_bounds, y + top_bounds),
                 win32con.SRCCOPY,
             )
             image = np.frombuffer(bitmap.GetBitmapBits(True), dtype=np.uint8)
@@ -74,7 +106,7 @@ class BitBltCaptureMethod(CaptureMethodBase):
         if is_blank(image):
             image = None
         else:
-            image.shape = (selection["height"], selection["width"], BGRA_CHANNEL_COUNT)
+            image.shape = (height, width, BGRA_CHANNEL_COUNT)
 
         # Cleanup DC and handle
         try_delete_dc(dc_object)
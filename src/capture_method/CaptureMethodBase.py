@@ -1,21 +1,48 @@
+from time import perf_counter
 from typing import TYPE_CHECKING
 
+import cv2
 from cv2.typing import MatLike
 
-from utils import is_valid_hwnd
+import metrics
+import tracing
+from utils import BGRA_CHANNEL_COUNT, FULL_CROP_BOX, CropBox, ImageShape, crop_to_box, is_valid_hwnd, is_valid_image
 
 if TYPE_CHECKING:
     from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
+
+capture_duration = metrics.Histogram(
+    "autosplit_capture_duration_seconds",
+    "Time to capture a frame, already cropped and resized",
+    "capture_method",
+)
+frames_captured = metrics.Counter(
+    "autosplit_frames_captured_total",
+    "Valid frames captured",
+    "capture_method",
+)
+duplicate_frames = metrics.Counter(
+    "autosplit_duplicate_frames_total",
+    "Valid frames captured that were the same as the previous one, as the capture source didn't update yet",
+    "capture_method",
+)
 
 
 class CaptureMethodBase:
     name = "None"
     short_description = ""
     description = ""
+    notifies_new_frames = False
+    """Whether `wait_for_new_frame` can actually wake consumers as soon as a new frame is available."""
 
-    _autosplit_ref: "AutoSplit"
+    _autosplit_ref: "AutoSplit | AutoSplitHeadless"
+    __last_frame: MatLike | None = None
+    __last_resized_frame: MatLike | None = None
+    __last_crop_box: CropBox = FULL_CROP_BOX
+    __last_captured_frame: MatLike | None = None
 
-    def __init__(self, autosplit: "AutoSplit"):
+    def __init__(self, autosplit: "AutoSplit | AutoSplitHeadless"):
         # Some capture methods don't need an initialization process
         self._autosplit_ref = autosplit
 
@@ -32,10 +59,68 @@ class CaptureMethodBase:
         Captures an image of the region for a window matching the given
         parameters of the bounding box.
 
-        @return: The image of the region in the window in BGRA format
+        @return: The image of the region in the window in BGR or BGRA format
         """
         return None
 
+    def release_frame(self, frame: MatLike):
+        """
+        Release a frame returned by `get_frame` once done with it.
+        Capture methods that reuse their frames' buffers won't write to that frame until then.
+        """
+
+    def get_resized_frame(self, size: tuple[int, int], crop_box: CropBox = FULL_CROP_BOX) -> MatLike | None:
+        """
+        Captures an image of the region already resized to `size` (width, height).
+        Capture methods that can crop and resize directly at the capture stage should override this
+        so that full resolution frames never reach the comparison loop.
+
+        @param crop_box: Only capture that part of the region
+        @return: The resized image of the `crop_box` part of the region in the window in BGR format
+        """
+        frame = self.get_frame()
+        if not is_valid_image(frame):
+            return None
+        # Don't resize the same frame again, this also allows consumers to identify old frames
+        if (
+            frame is not self.__last_frame
+            or self.__last_resized_frame is None
+            or self.__last_resized_frame.shape[1::-1] != size
+            or self.__last_crop_box != crop_box
+        ):
+            self.__last_frame = frame
+            self.__last_crop_box = crop_box
+            with tracing.span("resize"):
+                resized_frame = cv2.resize(crop_to_box(frame, crop_box), size, interpolation=cv2.INTER_AREA)
+                # Comparisons are done in BGR, drop the alpha channel only once the frame is small
+                if resized_frame.shape[ImageShape.Channels] == BGRA_CHANNEL_COUNT:
+                    resized_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGRA2BGR)
+            self.__last_resized_frame = resized_frame
+        return self.__last_resized_frame
+
+    def capture(self, size: tuple[int, int], crop_box: CropBox = FULL_CROP_BOX):
+        """`get_resized_frame`, but also measured. Use this to capture frames that will be compared."""
+        start_time = perf_counter()
+        with tracing.span("capture", self.name):
+            frame = self.get_resized_frame(size, crop_box)
+        capture_duration.labels(self.name).observe(perf_counter() - start_time)
+        if is_valid_image(frame):
+            frames_captured.labels(self.name).inc()
+            # Capture methods return the same object again when there's no new frame
+            if frame is self.__last_captured_frame:
+                duplicate_frames.labels(self.name).inc()
+            self.__last_captured_frame = frame
+        return frame
+
+    def wait_for_new_frame(self, timeout: float) -> bool:  # noqa: PLR6301
+        """
+        Blocks until a frame that wasn't returned by `get_frame` yet is available, or until `timeout` seconds.
+        Only meaningful if `notifies_new_frames` is True.
+
+        @return: True if a new frame is available
+        """
+        return False
+
     def recover_window(self, captured_window_title: str) -> bool:  # noqa: PLR6301
         return False
 
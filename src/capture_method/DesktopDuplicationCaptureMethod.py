@@ -13,6 +13,7 @@ from utils import GITHUB_REPOSITORY, get_window_bounds
 
 if TYPE_CHECKING:
     from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
 
 
 class DesktopDuplicationCaptureMethod(BitBltCaptureMethod):
@@ -28,14 +29,13 @@ class DesktopDuplicationCaptureMethod(BitBltCaptureMethod):
         + f"\nhttps://www.github.com/{GITHUB_REPOSITORY}#capture-method "
     )
 
-    def __init__(self, autosplit: "AutoSplit"):
+    def __init__(self, autosplit: "AutoSplit | AutoSplitHeadless"):
         super().__init__(autosplit)
         # Must not set statically as some laptops will throw an error
         self.desktop_duplication = d3dshot.create(capture_output="numpy")
 
     @override
-    def get_frame(self):
-        selection = self._autosplit_ref.settings_dict["capture_region"]
+    def _get_image(self, x: int, y: int, width: int, height: int):
         hwnd = self._autosplit_ref.hwnd
         hmonitor = win32api.MonitorFromWindow(hwnd, win32con.MONITOR_DEFAULTTONEAREST)
         if not hmonitor or not self.check_selected_region_exists():
@@ -50,14 +50,14 @@ class DesktopDuplicationCaptureMethod(BitBltCaptureMethod):
         offset_x, offset_y, *_ = win32gui.GetWindowRect(hwnd)
         offset_x -= self.desktop_duplication.display.position["left"]
         offset_y -= self.desktop_duplication.display.position["top"]
-        left = selection["x"] + offset_x + left_bounds
-        top = selection["y"] + offset_y + top_bounds
-        right = selection["width"] + left
-        bottom = selection["height"] + top
+        left = x + offset_x + left_bounds
+        top = y + offset_y + top_bounds
+        right = width + left
+        bottom = height + top
         screenshot = cast(
             MatLike | None,
             self.desktop_duplication.screenshot((left, top, right, bottom)),
         )
         if screenshot is None:
             return None
-        return cv2.cvtColor(screenshot, cv2.COLOR_RGB2BGRA)
+        return cv2.cvtColor(screenshot, cv2.COLOR_RGB2BGR)
@@ -1,5 +1,6 @@
-from threading import Event, Thread
-from typing import TYPE_CHECKING
+from threading import Condition, Event, Lock, Thread
+from time import perf_counter
+from typing import TYPE_CHECKING, cast
 
 import cv2
 import cv2.Error
@@ -10,12 +11,17 @@ from typing_extensions import override
 
 from capture_method.CaptureMethodBase import CaptureMethodBase
 from error_messages import CREATE_NEW_ISSUE_MESSAGE, exception_traceback
-from utils import ImageShape, is_valid_image
+from utils import FULL_CROP_BOX, CropBox, ImageShape, crop_to_box, is_valid_image
 
 if TYPE_CHECKING:
     from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
 
 OBS_VIRTUALCAM_PLUGIN_BLANK_PIXEL = [127, 129, 128]
+FRAME_BUFFER_POOL_SIZE = 3
+"""One published frame, one still being read by a consumer and one being written to by the capture thread"""
+LOW_LATENCY_WAIT_FRAMES = 2
+"""In low latency mode, the next frame can take up to a frame interval to arrive, and then has to be decoded"""
 
 
 def is_blank(image: MatLike):
@@ -31,6 +37,117 @@ def is_blank(image: MatLike):
     )
 
 
+class FrameBufferPool:
+    """
+    Small pool of frame buffers reused by the capture thread instead of allocating a new frame on every read.
+
+    Buffers are reference-counted: the capture thread only writes into a buffer
+    that is neither the published frame nor still referenced by a consumer.
+    """
+
+    def __init__(self, size: int = FRAME_BUFFER_POOL_SIZE):
+        self.__lock = Lock()
+        self.__buffers: list[MatLike | None] = [None] * size
+        """Buffers are lazily allocated by the first read, since we can't know the device's frame format ahead"""
+        self.__reference_counts = [0] * size
+        self.__published_index: int | None = None
+
+    def acquire_free(self):
+        """
+        Reserve a buffer that isn't published nor referenced. The pool grows if all buffers are in use.
+
+        @return: The index of the reserved buffer and the buffer itself (None if not allocated yet)
+        """
+        with self.__lock:
+            for index, reference_count in enumerate(self.__reference_counts):
+                if reference_count == 0 and index != self.__published_index:
+                    self.__reference_counts[index] += 1
+                    return index, self.__buffers[index]
+            self.__buffers.append(None)
+            self.__reference_counts.append(1)
+            return len(self.__buffers) - 1, None
+
+    def acquire_published(self):
+        """
+        Reference the latest published frame. It won't be written to until `release` is called.
+
+        @return: The index of the published buffer and the buffer itself, or None if there is no published frame
+        """
+        with self.__lock:
+            index = self.__published_index
+            if index is None:
+                return None
+            self.__reference_counts[index] += 1
+            return index, self.__buffers[index]
+
+    def release(self, index: int):
+        with self.__lock:
+            self.__reference_counts[index] -= 1
+
+    def publish(self, index: int | None, buffer: MatLike | None = None):
+        """
+        Publish a reserved buffer as the latest frame and release the capture thread's reference to it.
+        The buffer is updated in case OpenCV had to (re)allocate it.
+        Publishing None means there is currently no valid frame.
+        """
+        with self.__lock:
+            if index is not None:
+                self.__buffers[index] = buffer
+                self.__reference_counts[index] -= 1
+            self.__published_index = index
+
+
+class OutputFramePool:
+    """
+    Destination buffers for the frames handed out to consumers by `get_frame`.
+
+    Like `FrameBufferPool`, buffers are reference-counted: a buffer is only written to again
+    once everything it was handed out to released it.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__buffers: list[MatLike] = []
+        self.__reference_counts: list[int] = []
+
+    def copy(self, image: MatLike):
+        """
+        Copy `image` into a buffer that isn't referenced. The pool grows if all buffers are in use.
+
+        @return: The index of the buffer, referenced once until `release` is called, and the copied frame
+        """
+        with self.__lock:
+            index = next(
+                (index for index, reference_count in enumerate(self.__reference_counts) if reference_count == 0),
+                None,
+            )
+            if index is None:
+                self.__buffers.append(np.empty_like(image))
+                self.__reference_counts.append(0)
+                index = len(self.__buffers) - 1
+            # Buffers of a different shape are unused, ie: after changing the capture region
+            elif self.__buffers[index].shape != image.shape or self.__buffers[index].dtype != image.dtype:
+                self.__buffers[index] = np.empty_like(image)
+            self.__reference_counts[index] = 1
+            buffer = self.__buffers[index]
+        # Same buffer, np.asarray only makes it an array numpy's typing accepts as a destination
+        np.copyto(np.asarray(buffer), image)
+        return index, buffer
+
+    def acquire(self, index: int):
+        with self.__lock:
+            self.__reference_counts[index] += 1
+
+    def release(self, index: int):
+        with self.__lock:
+            self.__reference_counts[index] -= 1
+
+    def index_of(self, frame: MatLike):
+        """@return: The index of the buffer `frame` was copied into, or None if it's not from this pool."""
+        with self.__lock:
+            return next((index for index, buffer in enumerate(self.__buffers) if buffer is frame), None)
+
+
 class VideoCaptureDeviceCaptureMethod(CaptureMethodBase):
     name = "Video Capture Device"
     short_description = "see below"
@@ -38,19 +155,53 @@ class VideoCaptureDeviceCaptureMethod(CaptureMethodBase):
         "\nUses a Video Capture Device, like a webcam, virtual cam, or capture card. "
         + "\nYou can select one below. "
     )
+    notifies_new_frames = True
 
     capture_device: cv2.VideoCapture
     capture_thread: Thread | None = None
     stop_thread: Event
-    last_captured_frame: MatLike | None = None
-    last_converted_frame: MatLike | None = None
+    new_frame_condition: Condition
+    """Notified by the capture thread every time a new frame is published to `frame_pool`"""
+    frame_pool: FrameBufferPool
+    copied_frames: OutputFramePool
+    last_copied_frame: tuple[int, MatLike] | None = None
+    """Index in `copied_frames` and frame last returned by `get_frame`, referenced until there's a new one"""
+    comparison_request: tuple[tuple[int, int], CropBox] | None = None
+    """
+    Size and crop box requested by the last call to `get_resized_frame`,
+    the capture thread preprocesses new frames to it
+    """
+    last_resized_frame: MatLike | None = None
+    last_resized_request: tuple[tuple[int, int], CropBox] | None = None
     is_old_image = False
+    low_latency = False
+    frame_requested: Event
+    """Set by consumers to ask the capture thread to decode the next grabbed frame (used in low latency mode)"""
+    requested_frame_count = 0
+    """How many frames consumers asked for. Each request is numbered by the count once it's made."""
+    published_request_number = 0
+    """The last request the capture thread started decoding a frame for, once that frame is published"""
+    published_time = 0.0
+    """`time.perf_counter` when the last frame was published"""
+    frame_interval = 1 / 60
+    """Seconds between two frames of the device"""
 
     def __read_loop(self):
         try:
             while not self.stop_thread.is_set():
+                buffer_index, buffer = self.frame_pool.acquire_free()
+                # Requests already made are answered even if the device fails
+                request_number = self.requested_frame_count
                 try:
-                    result, image = self.capture_device.read()
+                    result = self.capture_device.grab()
+                    # In low latency mode, keep the device drained, but only decode frames that were asked for
+                    if result and self.low_latency and not self.frame_requested.is_set():
+                        self.frame_pool.release(buffer_index)
+                        continue
+                    self.frame_requested.clear()
+                    # Requests made after clearing the event will set it again, and be served by the next frame
+                    request_number = self.requested_frame_count
+                    result, image = self.capture_device.retrieve(buffer) if result else (False, None)
                 except cv2.error as cv2_error:
                     if not (
                         cv2_error.code == cv2.Error.STS_ERROR
@@ -70,10 +221,31 @@ class VideoCaptureDeviceCaptureMethod(CaptureMethodBase):
 
                 # Blank frame. Reuse the previous one.
                 if image is not None and is_blank(image):
+                    self.frame_pool.release(buffer_index)
+                    # Whoever asked for this frame still needs one
+                    self.frame_requested.set()
                     continue
 
-                self.last_captured_frame = image
-                self.is_old_image = False
+                # Preprocess in the capture thread so consumers get a frame that is ready for comparison
+                comparison_request = self.comparison_request
+                resized_frame = (
+                    self.__resize_to_capture_region(image, *comparison_request)
+                    if image is not None and comparison_request
+                    else None
+                )
+
+                with self.new_frame_condition:
+                    if image is None:
+                        self.frame_pool.release(buffer_index)
+                        self.frame_pool.publish(None)
+                    else:
+                        self.frame_pool.publish(buffer_index, image)
+                    self.last_resized_frame = resized_frame
+                    self.last_resized_request = comparison_request
+                    self.is_old_image = False
+                    self.published_request_number = request_number
+                    self.published_time = perf_counter()
+                    self.new_frame_condition.notify_all()
         except Exception as exception:  # noqa: BLE001 # We really want to catch everything here
             error = exception
             self.capture_device.release()
@@ -86,16 +258,25 @@ class VideoCaptureDeviceCaptureMethod(CaptureMethodBase):
                 ),
             )
 
-    def __init__(self, autosplit: "AutoSplit"):
+    def __init__(self, autosplit: "AutoSplit | AutoSplitHeadless"):
         super().__init__(autosplit)
         self.capture_device = cv2.VideoCapture(autosplit.settings_dict["capture_device_id"])
         self.capture_device.setExceptionMode(True)
+        self.low_latency = autosplit.settings_dict["capture_device_low_latency"]
         self.stop_thread = Event()
+        self.frame_requested = Event()
+        self.frame_requested.set()
+        self.new_frame_condition = Condition()
+        self.frame_pool = FrameBufferPool()
+        self.copied_frames = OutputFramePool()
 
         # The video capture device isn't accessible, don't bother with it.
         if not self.capture_device.isOpened():
             return
 
+        if self.low_latency:
+            self.__configure_low_latency()
+
         filter_graph = FilterGraph()
         filter_graph.add_video_input_device(autosplit.settings_dict["capture_device_id"])
         width, height = filter_graph.get_input_device().get_current_format()
@@ -108,41 +289,170 @@ class VideoCaptureDeviceCaptureMethod(CaptureMethodBase):
         except cv2.error:
             # Some cameras don't allow changing the resolution
             pass
+        try:
+            device_fps = self.capture_device.get(cv2.CAP_PROP_FPS)
+        except cv2.error:
+            device_fps = 0
+        self.frame_interval = 1 / (device_fps if device_fps > 0 else autosplit.settings_dict["fps_limit"])
         self.capture_thread = Thread(target=self.__read_loop)
         self.capture_thread.start()
 
+    def __configure_low_latency(self):
+        """
+        Prefer a compressed format, which is cheaper to transfer, since we only decode the frames we use.
+        And only buffer a single frame so that queued frames don't add latency.
+        Not all backends and devices support these properties, in which case they are simply left as is.
+        Must be done before setting the resolution, as the format affects which resolutions are available.
+        """
+        for property_id, value in (
+            (cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc(*"MJPG")),
+            (cv2.CAP_PROP_BUFFERSIZE, 1),
+        ):
+            try:
+                self.capture_device.set(property_id, value)
+            except cv2.error:
+                pass
+
     @override
     def close(self):
         self.stop_thread.set()
+        # Wake up anything still waiting on this capture method
+        with self.new_frame_condition:
+            self.new_frame_condition.notify_all()
         if self.capture_thread:
             self.capture_thread.join()
             self.capture_thread = None
         self.capture_device.release()
 
+    def __request_frame(self, wait: bool):
+        """
+        Ask the capture thread to decode the next frame.
+        In low latency mode, frames are only decoded when asked for, so unless `wait` is False,
+        wait for the frame this call asked for rather than using the one decoded for the previous call.
+        Never waits longer than `LOW_LATENCY_WAIT_FRAMES` frame intervals,
+        the latest frame is used if the requested one isn't there yet.
+        """
+        with self.new_frame_condition:
+            if (
+                self.low_latency
+                and not self.is_old_image
+                and self.published_request_number == self.requested_frame_count
+                and perf_counter() - self.published_time < self.frame_interval
+            ):
+                # The frame asked for by `wait_for_new_frame` is ready and wasn't used yet
+                return
+            self.requested_frame_count += 1
+            request_number = self.requested_frame_count
+            self.frame_requested.set()
+            if wait and self.low_latency:
+                self.new_frame_condition.wait_for(
+                    lambda: self.published_request_number >= request_number or self.stop_thread.is_set(),
+                    self.frame_interval * LOW_LATENCY_WAIT_FRAMES,
+                )
+
     @override
     def get_frame(self):
         if not self.check_selected_region_exists():
             return None
 
-        image = self.last_captured_frame
+        self.__request_frame(wait=True)
         is_old_image = self.is_old_image
         self.is_old_image = True
-        if not is_valid_image(image):
+        published_frame = self.frame_pool.acquire_published()
+        if published_frame is None:
+            return None
+        buffer_index, image = published_frame
+        try:
+            if not is_valid_image(image):
+                return None
+
+            last_copied_frame = self.last_copied_frame
+            if not is_old_image or last_copied_frame is None:
+                # The device's frames are already BGR, but the capture thread will reuse this buffer, so copy it out.
+                # The last copied frame is returned again until there's a new one, so keep a reference to it too
+                last_copied_frame = self.copied_frames.copy(self.__crop_to_capture_region(image))
+                if self.last_copied_frame is not None:
+                    self.copied_frames.release(self.last_copied_frame[0])
+                self.last_copied_frame = last_copied_frame
+            copied_index, copied_frame = last_copied_frame
+            # The consumer's reference, see `release_frame`
+            self.copied_frames.acquire(copied_index)
+            return copied_frame
+        finally:
+            self.frame_pool.release(buffer_index)
+
+    @override
+    def release_frame(self, frame: MatLike):
+        copied_index = self.copied_frames.index_of(frame)
+        if copied_index is not None:
+            self.copied_frames.release(copied_index)
+
+    @override
+    def get_resized_frame(self, size: tuple[int, int], crop_box: CropBox = FULL_CROP_BOX):
+        if not self.check_selected_region_exists():
             return None
 
-        if is_old_image:
-            return self.last_converted_frame
+        comparison_request = (size, crop_box)
+        # Set before requesting the frame, so that the capture thread already resizes it
+        self.comparison_request = comparison_request
+        self.__request_frame(wait=True)
+        with self.new_frame_condition:
+            resized_frame = self.last_resized_frame
+            resized_request = self.last_resized_request
+            self.is_old_image = True
+        if resized_frame is not None and resized_request == comparison_request:
+            return resized_frame
+
+        # Nothing was preprocessed at that size yet, do it now from the latest frame
+        published_frame = self.frame_pool.acquire_published()
+        if published_frame is None:
+            return None
+        buffer_index, image = published_frame
+        try:
+            if not is_valid_image(image):
+                return None
+            resized_frame = self.__resize_to_capture_region(image, size, crop_box)
+        finally:
+            self.frame_pool.release(buffer_index)
+        with self.new_frame_condition:
+            self.last_resized_frame = resized_frame
+            self.last_resized_request = comparison_request
+        return resized_frame
 
+    def __crop_to_capture_region(self, image: MatLike):
         selection = self._autosplit_ref.settings_dict["capture_region"]
         # Ensure we can't go OOB of the image
         y = min(selection["y"], image.shape[ImageShape.Y] - 1)
         x = min(selection["x"], image.shape[ImageShape.X] - 1)
-        image = image[
-            y : y + selection["height"],
-            x : x + selection["width"],
-        ]
-        self.last_converted_frame = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
-        return self.last_converted_frame
+        # Slicing an image is typed as a generic array, but it's still an image
+        return cast(
+            MatLike,
+            image[
+                y : y + selection["height"],
+                x : x + selection["width"],
+            ],
+        )
+
+    def __resize_to_capture_region(self, image: MatLike, size: tuple[int, int], crop_box: CropBox):
+        """
+        Crop and resize a full frame in a single pass.
+        Cropping is only a view and the resize reads the cropped area directly.
+        The device's frames are already BGR, so no color conversion is needed.
+        """
+        return cv2.resize(
+            crop_to_box(self.__crop_to_capture_region(image), crop_box),
+            size,
+            interpolation=cv2.INTER_AREA,
+        )
+
+    @override
+    def wait_for_new_frame(self, timeout: float):
+        self.__request_frame(wait=False)
+        with self.new_frame_condition:
+            return self.new_frame_condition.wait_for(
+                lambda: not self.is_old_image or self.stop_thread.is_set(),
+                timeout,
+            ) and not self.stop_thread.is_set()
 
     @override
     def check_selected_region_exists(self):
@@ -16,6 +16,7 @@ from utils import BGRA_CHANNEL_COUNT, WGC_MIN_BUILD, WINDOWS_BUILD_NUMBER, get_d
 
 if TYPE_CHECKING:
     from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
 
 WGC_NO_BORDER_MIN_BUILD = 20348
 LEARNING_MODE_DEVICE_BUILD = 17763
@@ -40,7 +41,7 @@ class WindowsGraphicsCaptureMethod(CaptureMethodBase):
     """This is stored to prevent session from being garbage collected"""
     last_converted_frame: MatLike | None = None
 
-    def __init__(self, autosplit: "AutoSplit"):
+    def __init__(self, autosplit: "AutoSplit | AutoSplitHeadless"):
         super().__init__(autosplit)
         if not is_valid_hwnd(autosplit.hwnd):
             return
@@ -1,20 +1,194 @@
 from math import sqrt
+from typing import cast
 
 import cv2
 import imagehash
+import numpy as np
 from cv2.typing import MatLike
 from PIL import Image
 
-from utils import BGRA_CHANNEL_COUNT, MAXBYTE, ColorChannel, ImageShape, is_valid_image
+from utils import BGR_CHANNEL_COUNT, BGRA_CHANNEL_COUNT, MAXBYTE, ColorChannel, ImageShape, is_valid_image
 
 MAXRANGE = MAXBYTE + 1
 CHANNELS = [ColorChannel.Red.value, ColorChannel.Green.value, ColorChannel.Blue.value]
 HISTOGRAM_SIZE = [8, 8, 8]
 RANGES = [0, MAXRANGE, 0, MAXRANGE, 0, MAXRANGE]
 MASK_SIZE_MULTIPLIER = ColorChannel.Alpha * MAXBYTE * MAXBYTE
+L2_GATHER_MAX_OPAQUE_RATIO = 0.1
+"""Below this ratio of opaque pixels, gathering them is faster than letting `cv2.norm` go through the whole mask"""
+APPROXIMATE_SAMPLE_SIZE = 1024
+"""How many pixels are sampled by approximate L2 comparisons"""
+APPROXIMATE_CONFIDENCE_Z = 3
+"""Half-width of the approximate L2 comparisons' confidence interval, in standard errors (~99.7%)"""
+HISTOGRAM_BAND_COUNT = 8
+"""How many horizontal bands captures are split in, so that only the bands that changed are recomputed"""
+SUM_CHANNELS = np.ones((1, BGR_CHANNEL_COUNT), dtype=np.float32)
+"""Transformation matrix summing the channels of a BGR image"""
 
 
-def compare_histograms(source: MatLike, capture: MatLike, mask: MatLike | None = None):
+class CompiledMask:
+    """
+    A split image's mask, precompiled at load time so that masked comparisons only go through its opaque pixels.
+    The opaque pixels are gathered using flat indices, which is much faster than a dense mask for sparse masks.
+    """
+
+    mask: MatLike
+    """The dense mask, for comparison methods that can't make use of the gathered pixels"""
+    nonzero_count: int
+    source_pixels: MatLike
+    """The opaque pixels of the source image, see `gather`"""
+    source_histogram: MatLike | None = None
+    """Cached by `compare_histograms`, as the source image never changes"""
+    gather_for_l2: bool
+
+    def __init__(self, source: MatLike, mask: MatLike):
+        self.mask = mask
+        self.nonzero_count = cv2.countNonZero(mask)
+        self.gather_for_l2 = self.nonzero_count < mask.size * L2_GATHER_MAX_OPAQUE_RATIO
+        self.__channels = source.shape[ImageShape.Channels]
+        pixel_indices = np.flatnonzero(mask)
+        self.__gather_indices = (pixel_indices[:, np.newaxis] * self.__channels + np.arange(self.__channels)).ravel()
+        self.source_pixels = self.gather(source)
+
+    def gather(self, image: MatLike):
+        """
+        Gather only the opaque pixels of `image`, as a 1 pixel wide image.
+
+        @param image: An image matching the shape of the source image
+        """
+        # Gathering pixels is typed as a generic array, but it's still an image
+        return cast(MatLike, np.take(image.reshape(-1), self.__gather_indices).reshape(-1, 1, self.__channels))
+
+
+class PixelSample:
+    """
+    A fixed stratified sample of a split image's pixels, chosen at load time for approximate L2 comparisons.
+    The image's pixels (only the opaque ones if masked) are split in equally sized strata,
+    then one pixel is randomly sampled from each stratum.
+    """
+
+    size: int
+    population: int
+    """How many pixels the sample was taken from"""
+    source_pixels: MatLike
+    """The sampled pixels of the source image, see `gather`"""
+
+    def __init__(self, source: MatLike, mask: MatLike | None = None):
+        pixel_indices = (
+            np.flatnonzero(mask)
+            if is_valid_image(mask)
+            else np.arange(source.shape[ImageShape.Y] * source.shape[ImageShape.X])
+        )
+        self.population = len(pixel_indices)
+        self.size = min(APPROXIMATE_SAMPLE_SIZE, self.population)
+        strata_bounds = np.linspace(0, self.population, self.size + 1).astype(int)
+        # Always the same seed, so that the similarities of an image are reproducible
+        sampled_indices = pixel_indices[np.random.default_rng(0).integers(strata_bounds[:-1], strata_bounds[1:])]
+        self.__channels = source.shape[ImageShape.Channels]
+        self.__gather_indices = (sampled_indices[:, np.newaxis] * self.__channels + np.arange(self.__channels)).ravel()
+        self.source_pixels = self.gather(source)
+
+    def gather(self, image: MatLike):
+        """
+        Gather only the sampled pixels of `image`, as a 1 pixel wide image.
+
+        @param image: An image matching the shape of the source image
+        """
+        # Gathering pixels is typed as a generic array, but it's still an image
+        return cast(MatLike, np.take(image.reshape(-1), self.__gather_indices).reshape(-1, 1, self.__channels))
+
+
+class IncrementalHistogram:
+    """
+    Histogram of the consecutive captures an unmasked split image is compared with.
+    Between consecutive captures, most of the capture region often stays the same (static HUD, menus).
+    So the histogram is updated by only recomputing the horizontal bands that changed since the previous capture.
+    """
+
+    source_histogram: MatLike | None = None
+    """Cached by `compare_histograms`, as the source image never changes"""
+
+    def __init__(self):
+        self.__previous_capture: MatLike | None = None
+        self.__histogram: MatLike | None = None
+        """Sum of the (non-normalized) histograms of every band of the previous capture"""
+        self.__band_histograms: list[MatLike | None] = [None] * HISTOGRAM_BAND_COUNT
+        """Histograms of each band of the previous capture, if already calculated"""
+        self.__band_bounds: list[int] = []
+
+    def calculate(self, capture: MatLike):
+        """@return: The normalized histogram of `capture`."""
+        previous_capture = self.__previous_capture
+        running_histogram = self.__histogram
+        if previous_capture is None or previous_capture.shape != capture.shape or running_histogram is None:
+            running_histogram = self.__recalculate(capture)
+        else:
+            changed_bands = self.__get_changed_bands(previous_capture, capture)
+            # Each band costs two histograms, past half of the bands it's not worth it anymore
+            if len(changed_bands) > HISTOGRAM_BAND_COUNT // 2:
+                running_histogram = self.__recalculate(capture)
+            else:
+                for band in changed_bands:
+                    top, bottom = self.__band_bounds[band], self.__band_bounds[band + 1]
+                    previous_band_histogram = self.__band_histograms[band]
+                    if previous_band_histogram is None:
+                        previous_band_histogram = cv2.calcHist(
+                            [previous_capture[top:bottom]],
+                            CHANNELS,
+                            None,
+                            HISTOGRAM_SIZE,
+                            RANGES,
+                        )
+                    band_histogram = cv2.calcHist([capture[top:bottom]], CHANNELS, None, HISTOGRAM_SIZE, RANGES)
+                    # Histograms are pixel counts, so this stays exact
+                    running_histogram += band_histogram - previous_band_histogram
+                    self.__band_histograms[band] = band_histogram
+                # Same buffer, np.asarray only makes it an array numpy's typing accepts as a destination
+                np.copyto(np.asarray(previous_capture), capture)
+
+        histogram = running_histogram.copy()
+        cv2.normalize(histogram, histogram)
+        return histogram
+
+    def __recalculate(self, capture: MatLike):
+        """@return: The new (non-normalized) histogram of `capture`."""
+        histogram = cv2.calcHist([capture], CHANNELS, None, HISTOGRAM_SIZE, RANGES)
+        self.__histogram = histogram
+        self.__band_histograms = [None] * HISTOGRAM_BAND_COUNT
+        if self.__previous_capture is None or self.__previous_capture.shape != capture.shape:
+            self.__previous_capture = capture.copy()
+            self.__band_bounds = (
+                np.linspace(0, capture.shape[ImageShape.Y], HISTOGRAM_BAND_COUNT + 1).astype(int).tolist()
+            )
+        else:
+            # Same buffer, np.asarray only makes it an array numpy's typing accepts as a destination
+            np.copyto(np.asarray(self.__previous_capture), capture)
+        return histogram
+
+    def __get_changed_bands(self, previous_capture: MatLike, capture: MatLike):
+        differences = cv2.absdiff(previous_capture, capture)
+        # Sum each row, much faster than checking each band separately
+        row_differences = cv2.reduce(
+            differences.reshape(differences.shape[ImageShape.Y], -1),
+            1,
+            cv2.REDUCE_SUM,
+            dtype=cv2.CV_32S,
+        ).ravel()
+        return np.flatnonzero(np.add.reduceat(row_differences, self.__band_bounds[:-1]))
+
+
+def __normalized_histogram(image: MatLike, mask: MatLike | None = None):
+    histogram = cv2.calcHist([image], CHANNELS, mask, HISTOGRAM_SIZE, RANGES)
+    cv2.normalize(histogram, histogram)
+    return histogram
+
+
+def compare_histograms(
+    source: MatLike,
+    capture: MatLike,
+    mask: MatLike | CompiledMask | None = None,
+    incremental_histogram: IncrementalHistogram | None = None,
+):
     """
     Compares two images by calculating their histograms, normalizing
     them, and then comparing them using Bhattacharyya distance.
@@ -22,18 +196,30 @@ def compare_histograms(source: MatLike, capture: MatLike, mask: MatLike | None =
     @param source: RGB or BGR image of any given width and height
     @param capture: An image matching the shape, dimensions and format of the source
     @param mask: An image matching the dimensions of the source, but 1 channel grayscale
+    @param incremental_histogram: Kept between calls with the same source to only update what changed in the capture.
+    Not used with masks, since masked comparisons already only go through the opaque pixels.
     @return: The similarity between the histograms as a number 0 to 1.
     """
-    source_hist = cv2.calcHist([source], CHANNELS, mask, HISTOGRAM_SIZE, RANGES)
-    capture_hist = cv2.calcHist([capture], CHANNELS, mask, HISTOGRAM_SIZE, RANGES)
-
-    cv2.normalize(source_hist, source_hist)
-    cv2.normalize(capture_hist, capture_hist)
+    if isinstance(mask, CompiledMask):
+        if not mask.nonzero_count:
+            return 0.0
+        if mask.source_histogram is None:
+            mask.source_histogram = __normalized_histogram(mask.source_pixels)
+        source_hist = mask.source_histogram
+        capture_hist = __normalized_histogram(mask.gather(capture))
+    elif incremental_histogram and not is_valid_image(mask):
+        if incremental_histogram.source_histogram is None:
+            incremental_histogram.source_histogram = __normalized_histogram(source)
+        source_hist = incremental_histogram.source_histogram
+        capture_hist = incremental_histogram.calculate(capture)
+    else:
+        source_hist = __normalized_histogram(source, mask)
+        capture_hist = __normalized_histogram(capture, mask)
 
     return 1 - cv2.compareHist(source_hist, capture_hist, cv2.HISTCMP_BHATTACHARYYA)
 
 
-def compare_l2_norm(source: MatLike, capture: MatLike, mask: MatLike | None = None):
+def compare_l2_norm(source: MatLike, capture: MatLike, mask: MatLike | CompiledMask | None = None):
     """
     Compares two images by calculating the L2 Error (square-root of sum of squared error)
     @param source: Image of any given shape
@@ -41,21 +227,80 @@ def compare_l2_norm(source: MatLike, capture: MatLike, mask: MatLike | None = No
     @param mask: An image matching the dimensions of the source, but 1 channel grayscale
     @return: The similarity between the images as a number 0 to 1.
     """
-    error = cv2.norm(source, capture, cv2.NORM_L2, mask)
-
-    # The L2 Error is summed across all pixels, so this normalizes
-    max_error = (
-        sqrt(source.size) * MAXBYTE
-        if not is_valid_image(mask)
-        else sqrt(cv2.countNonZero(mask) * MASK_SIZE_MULTIPLIER)
-    )
-
+    max_error = __l2_max_error(source, mask)
     if not max_error:
         return 0.0
+
+    if isinstance(mask, CompiledMask):
+        error = (
+            cv2.norm(mask.source_pixels, mask.gather(capture), cv2.NORM_L2)
+            if mask.gather_for_l2
+            else cv2.norm(source, capture, cv2.NORM_L2, mask.mask)
+        )
+    else:
+        error = cv2.norm(source, capture, cv2.NORM_L2, mask)
+
     return 1 - (error / max_error)
 
 
-def compare_template(source: MatLike, capture: MatLike, mask: MatLike | None = None):
+def compare_l2_norm_approximate(
+    source: MatLike,
+    capture: MatLike,
+    sample: PixelSample,
+    threshold: float,
+    mask: MatLike | CompiledMask | None = None,
+):
+    """
+    Estimates the L2 similarity from a sample of the pixels. Falls back to the full `compare_l2_norm`
+    when the confidence interval of the estimate overlaps `threshold`. So the estimate is only used
+    when it is almost certainly on the same side of the threshold as the actual similarity.
+
+    @param sample: The pixels to sample, taken from `source` and `mask`
+    @param threshold: The similarity threshold the result will be checked against
+    @return: The estimated or actual similarity as a number 0 to 1.
+    """
+    max_error = __l2_max_error(source, mask)
+    if not max_error or sample.size == sample.population:
+        return compare_l2_norm(source, capture, mask)
+
+    differences = cv2.subtract(sample.source_pixels, sample.gather(capture), dtype=cv2.CV_32S)
+    squared_errors = cv2.transform(
+        cv2.multiply(differences, differences, dtype=cv2.CV_32F),
+        SUM_CHANNELS,
+    )
+    mean, standard_deviation = (value.item() for value in cv2.meanStdDev(squared_errors))
+
+    # Estimated sum of squared errors of the whole image, with the finite population correction
+    estimated_error = mean * sample.population
+    error_margin = (
+        APPROXIMATE_CONFIDENCE_Z
+        * standard_deviation
+        * sample.population
+        / sqrt(sample.size)
+        * sqrt(1 - sample.size / sample.population)
+    )
+    lowest_similarity = 1 - sqrt(estimated_error + error_margin) / max_error
+    highest_similarity = 1 - sqrt(max(0, estimated_error - error_margin)) / max_error
+    if lowest_similarity <= threshold <= highest_similarity:
+        return compare_l2_norm(source, capture, mask)
+    return 1 - sqrt(estimated_error) / max_error
+
+
+def __l2_max_error(source: MatLike, mask: MatLike | CompiledMask | None):
+    """
+    The L2 Error is summed across all pixels, so this is used to normalize it.
+
+    Opaque images used to be compared with a constant alpha channel, keep normalizing
+    as if it was still there so that existing similarity thresholds keep the same meaning.
+    """
+    if isinstance(mask, CompiledMask):
+        return sqrt(mask.nonzero_count * MASK_SIZE_MULTIPLIER)
+    if is_valid_image(mask):
+        return sqrt(cv2.countNonZero(mask) * MASK_SIZE_MULTIPLIER)
+    return sqrt(source.shape[ImageShape.Y] * source.shape[ImageShape.X] * BGRA_CHANNEL_COUNT) * MAXBYTE
+
+
+def compare_template(source: MatLike, capture: MatLike, mask: MatLike | CompiledMask | None = None):
     """
     Checks if the source is located within the capture by using the sum of square differences.
     The mask is used to search for non-rectangular images within the capture.
@@ -66,6 +311,8 @@ def compare_template(source: MatLike, capture: MatLike, mask: MatLike | None = N
     @return: The best similarity for a region found in the image. This is
     represented as a number from 0 to 1.
     """
+    if isinstance(mask, CompiledMask):
+        mask = mask.mask
     result = cv2.matchTemplate(capture, source, cv2.TM_SQDIFF, mask=mask)
     min_val, *_ = cv2.minMaxLoc(result)
 
@@ -80,7 +327,7 @@ def compare_template(source: MatLike, capture: MatLike, mask: MatLike | None = N
     return 1 - (min_val / max_error)
 
 
-def compare_phash(source: MatLike, capture: MatLike, mask: MatLike | None = None):
+def compare_phash(source: MatLike, capture: MatLike, mask: MatLike | CompiledMask | None = None):
     """
     Compares the Perceptual Hash of the two given images and returns the similarity between the two.
 
@@ -94,6 +341,8 @@ def compare_phash(source: MatLike, capture: MatLike, mask: MatLike | None = None
     # each of the images. As a result of this, this function is not going to be very
     # helpful for large masks as the images when shrinked down to 8x8 will mostly be
     # the same
+    if isinstance(mask, CompiledMask):
+        mask = mask.mask
     if is_valid_image(mask):
         source = cv2.bitwise_and(source, source, mask=mask)
         capture = cv2.bitwise_and(capture, capture, mask=mask)
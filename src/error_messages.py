@@ -1,6 +1,7 @@
 """Error messages."""
 
 import os
+import re
 import signal
 import sys
 import traceback
@@ -22,6 +23,15 @@ def __exit_program():
 
 
 def set_text_message(message: str, details: str = "", kill_button: str = "", accept_button: str = ""):
+    # Without a QApplication (headless mode), there's nothing to show a message box with.
+    # stdout is reserved for commands, so print to stderr instead.
+    if not QtWidgets.QApplication.instance():
+        plain_text_message = re.sub(r"<[^>]+>", "", message.replace("<br/>", "\n"))
+        print(f"Error: {plain_text_message}", file=sys.stderr, flush=True)
+        if details:
+            print(details, file=sys.stderr, flush=True)
+        return
+
     message_box = QtWidgets.QMessageBox()
     message_box.setWindowTitle("Error")
     message_box.setTextFormat(QtCore.Qt.TextFormat.RichText)
@@ -136,6 +146,33 @@ def load_start_image():
     )
 
 
+def integration_port(port: int):
+    set_text_message(
+        f"Could not listen on port {port} for the socket integration. Is it already used by another program?",
+    )
+
+
+def metrics_port(port: int):
+    set_text_message(
+        f"Could not listen on port {port} for the metrics endpoint. Is it already used by another program?",
+    )
+
+
+def tracing_disabled():
+    set_text_message(
+        "Tracing is disabled. Set trace_buffer_size in your profile's toml file to record a trace, "
+        + "then save it once the issue happened.",
+    )
+
+
+def profiler_not_running():
+    set_text_message("The profiler isn't running. Start it before stopping it to save a profile.")
+
+
+def invalid_profiler_command(arguments: str):
+    set_text_message(f'Invalid profiler command "{arguments}". Use "profile start" or "profile stop [path]".')
+
+
 def stdin_lost():
     set_text_message("stdin not supported or lost, external control like LiveSplit integration will not work.")
 
@@ -1,25 +1,87 @@
 from collections.abc import Callable
-from typing import TYPE_CHECKING, Literal, cast
+from functools import partial
+from queue import SimpleQueue
+from threading import Event, Thread
+from time import perf_counter, time
+from typing import TYPE_CHECKING, Literal, NamedTuple, cast
 
 import keyboard
 import pyautogui
 from PySide6 import QtWidgets
 
 import error_messages
+import metrics
+import tracing
+from SplitEngine import Commands
 from utils import fire_and_forget, is_digit
 
 if TYPE_CHECKING:
     from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
 
 # While not usually recommended, we don't manipulate the mouse, and we don't want the extra delay
 pyautogui.FAILSAFE = False
 
 SET_HOTKEY_TEXT = "Set Hotkey"
 PRESS_A_KEY_TEXT = "Press a key..."
-
-Commands = Literal["split", "start", "pause", "reset", "skip", "undo"]
-Hotkey = Literal["split", "reset", "skip_split", "undo_split", "pause", "screenshot", "toggle_auto_reset_image"]
-HOTKEYS: list[Hotkey] = ["split", "reset", "skip_split", "undo_split", "pause", "screenshot", "toggle_auto_reset_image"]
+COMMANDS_EXIT_TIMEOUT = 1
+"""How long to wait for the commands still queued to be sent when exiting, in seconds"""
+
+Hotkey = Literal[
+    "split",
+    "reset",
+    "skip_split",
+    "undo_split",
+    "pause",
+    "screenshot",
+    "toggle_auto_reset_image",
+    "toggle_profiler",
+]
+HOTKEYS: list[Hotkey] = [
+    "split",
+    "reset",
+    "skip_split",
+    "undo_split",
+    "pause",
+    "screenshot",
+    "toggle_auto_reset_image",
+    "toggle_profiler",
+]
+
+command_dispatch_latency = metrics.Summary(
+    "autosplit_command_dispatch_latency_seconds",
+    "Time between a command being queued and its hotkey being sent or it being printed to stdout",
+)
+command_send_latency = metrics.Histogram(
+    "autosplit_split_to_send_latency_seconds",
+    "Time between a command happening (ie: capturing the frame that caused a split, plus its delay) and it being sent",
+    "command",
+)
+
+
+class QueuedCommand(NamedTuple):
+    autosplit: "AutoSplit | AutoSplitHeadless"
+    command: Commands
+    timestamp: float
+    """Unix timestamp of when the command happened, see `send_command`"""
+    send: Callable[[], object]
+    enqueue_time: float
+    """`time.perf_counter` when the command was queued"""
+
+
+class DispatchedCommand(NamedTuple):
+    command: Commands
+    timestamp: float
+    enqueue_time: float
+    emit_time: float
+    """`time.perf_counter` once the hotkey was sent or the command printed to stdout"""
+
+
+last_dispatched_command: DispatchedCommand | None = None
+command_listeners: list[Callable[[DispatchedCommand], object]] = []
+"""Called from the command dispatcher thread with every command, once it was sent"""
+__command_queue: "SimpleQueue[QueuedCommand | Event]" = SimpleQueue()
+__command_dispatcher: Thread | None = None
 
 
 def remove_all_hotkeys():
@@ -47,30 +109,95 @@ def after_setting_hotkey(autosplit: "AutoSplit"):
             getattr(autosplit.SettingsWidget, f"set_{hotkey}_hotkey_button").setEnabled(True)
 
 
-def send_command(autosplit: "AutoSplit", command: Commands):
+def send_command(autosplit: "AutoSplit | AutoSplitHeadless", command: Commands, timestamp: float | None = None):
+    """
+    Queue the command to be sent by the command dispatcher thread, in order.
+    The caller never waits on input synthesis (pyautogui adds its own pauses) nor on stdout.
+
+    @param timestamp: When the command happened, as a Unix timestamp. For commands caused by a comparison,
+    when the frame was captured, plus the delay of delayed commands. Defaults to now.
+    With `timestamped_commands`, it is sent along the command when auto-controlled,
+    so that the timer can ignore how long it took to capture, compare and send the command.
+    """
+    if timestamp is None:
+        timestamp = time()
     # Note: Rather than having the start image able to also reset the timer,
     # having the reset image check be active at all time would be a better, more organic solution,
     # but that is dependent on migrating to an observer pattern (#219) and being able to reload all images.
+    # The hotkeys are read now, as the settings could change before the command is dispatched.
     match command:
         case _ if autosplit.is_auto_controlled:
-            if command == "start" and autosplit.settings_dict["start_also_resets"]:
-                print("reset", flush=True)
-            print(command, flush=True)
+            lines = (
+                ["reset", command]
+                if command == "start" and autosplit.settings_dict["start_also_resets"]
+                else [command]
+            )
+            if autosplit.settings_dict["timestamped_commands"]:
+                lines = [f"{line} {timestamp:.6f}" for line in lines]
+            send = partial(_print_commands, *lines)
         case "start" if autosplit.settings_dict["start_also_resets"]:
-            _send_hotkey(autosplit.settings_dict["reset_hotkey"])
+            send = partial(_send_hotkey, autosplit.settings_dict["reset_hotkey"])
         case "reset":
-            _send_hotkey(autosplit.settings_dict["reset_hotkey"])
+            send = partial(_send_hotkey, autosplit.settings_dict["reset_hotkey"])
         case "start" | "split":
-            _send_hotkey(autosplit.settings_dict["split_hotkey"])
+            send = partial(_send_hotkey, autosplit.settings_dict["split_hotkey"])
         case "pause":
-            _send_hotkey(autosplit.settings_dict["pause_hotkey"])
+            send = partial(_send_hotkey, autosplit.settings_dict["pause_hotkey"])
         case "skip":
-            _send_hotkey(autosplit.settings_dict["skip_split_hotkey"])
+            send = partial(_send_hotkey, autosplit.settings_dict["skip_split_hotkey"])
         case "undo":
-            _send_hotkey(autosplit.settings_dict["undo_split_hotkey"])
+            send = partial(_send_hotkey, autosplit.settings_dict["undo_split_hotkey"])
         case _:  # pyright: ignore[reportUnnecessaryComparison]
             raise KeyError(f"{command!r} is not a valid command")
 
+    global __command_dispatcher  # noqa: PLW0603
+    if __command_dispatcher is None:
+        __command_dispatcher = Thread(target=__dispatch_commands, name="CommandDispatcher", daemon=True)
+        __command_dispatcher.start()
+    __command_queue.put(QueuedCommand(autosplit, command, timestamp, send, perf_counter()))
+
+
+def __dispatch_commands():
+    global last_dispatched_command  # noqa: PLW0603
+    while True:
+        queued_command = __command_queue.get()
+        if isinstance(queued_command, Event):
+            queued_command.set()
+            continue
+        try:
+            with tracing.span("send command", queued_command.command):
+                queued_command.send()
+        except Exception as exception:  # noqa: BLE001 # The dispatcher must keep running
+            queued_command.autosplit.show_error_signal.emit(
+                lambda exception=exception: error_messages.exception_traceback(exception),
+            )
+            continue
+        emit_time = perf_counter()
+        command_dispatch_latency.observe(emit_time - queued_command.enqueue_time)
+        command_send_latency.labels(queued_command.command).observe(time() - queued_command.timestamp)
+        last_dispatched_command = DispatchedCommand(
+            queued_command.command,
+            queued_command.timestamp,
+            queued_command.enqueue_time,
+            emit_time,
+        )
+        for listener in command_listeners:
+            listener(last_dispatched_command)
+
+
+def wait_for_queued_commands(timeout: float = COMMANDS_EXIT_TIMEOUT):
+    """Block until every command queued so far was dispatched, or until `timeout` seconds. Use before exiting."""
+    if __command_dispatcher is None:
+        return
+    commands_dispatched = Event()
+    __command_queue.put(commands_dispatched)
+    commands_dispatched.wait(timeout)
+
+
+def _print_commands(*commands: str):
+    for command in commands:
+        print(command, flush=True)
+
 
 def _unhook(hotkey_callback: Callable[[], None] | None):
     try:
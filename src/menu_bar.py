@@ -12,6 +12,8 @@ from requests.exceptions import RequestException
 from typing_extensions import override
 
 import error_messages
+import profiler
+import tracing
 import user_profile
 from capture_method import (
     CAPTURE_METHODS,
@@ -231,7 +233,7 @@ class __SettingsWidget(QtWidgets.QWidget, settings_ui.Ui_SettingsWidget):  # noq
     def __fps_limit_changed(self, value: int):
         value = self.fps_limit_spinbox.value()
         self._autosplit_ref.settings_dict["fps_limit"] = value
-        self._autosplit_ref.timer_live_image.setInterval(int(ONE_SECOND / value))
+        self._autosplit_ref.timer_frame_bus.setInterval(int(ONE_SECOND / value))
 
     @fire_and_forget
     def __set_all_capture_devices(self):
@@ -355,6 +357,38 @@ class __SettingsWidget(QtWidgets.QWidget, settings_ui.Ui_SettingsWidget):  # noq
 # endregion
 
 
+def save_trace(autosplit: "AutoSplit"):
+    if not tracing.is_enabled():
+        error_messages.tracing_disabled()
+        return
+    trace_path = QFileDialog.getSaveFileName(
+        autosplit,
+        "Save Trace",
+        tracing.default_trace_path(),
+        "Chrome Trace (*.json)",
+    )[0]
+    if trace_path:
+        tracing.save_trace(autosplit, trace_path)
+
+
+def toggle_profiler(autosplit: "AutoSplit"):
+    if not profiler.is_running():
+        profiler.start(autosplit.settings_dict["profiler_sample_rate"])
+        return
+    # Stop sampling first, so that the dialog isn't part of the profile
+    stopped_profiler = profiler.stop()
+    if stopped_profiler is None:
+        return
+    profile_path = QFileDialog.getSaveFileName(
+        autosplit,
+        "Save Profile",
+        profiler.default_profile_path(),
+        "Collapsed Stacks (*.folded)",
+    )[0]
+    if profile_path:
+        profiler.save_profile(autosplit, stopped_profiler, profile_path)
+
+
 def open_settings(autosplit: "AutoSplit"):
     if not autosplit.SettingsWidget or cast(QtWidgets.QWidget, autosplit.SettingsWidget).isHidden():
         autosplit.SettingsWidget = __SettingsWidget(autosplit)
@@ -372,14 +406,21 @@ def get_default_settings_from_ui(autosplit: "AutoSplit"):
         "pause_hotkey": default_settings_dialog.pause_input.text(),
         "screenshot_hotkey": default_settings_dialog.screenshot_input.text(),
         "toggle_auto_reset_image_hotkey": default_settings_dialog.toggle_auto_reset_image_input.text(),
+        "toggle_profiler_hotkey": default_settings_dialog.toggle_profiler_input.text(),
         "fps_limit": default_settings_dialog.fps_limit_spinbox.value(),
+        # Not exposed in the UI, only in the profile's toml file
+        "preview_fps_limit": user_profile.DEFAULT_PROFILE["preview_fps_limit"],
         "live_capture_region": default_settings_dialog.live_capture_region_checkbox.isChecked(),
         "capture_method": CAPTURE_METHODS.get_method_by_index(
             default_settings_dialog.capture_method_combobox.currentIndex(),
         ),
         "capture_device_id": default_settings_dialog.capture_device_combobox.currentIndex(),
         "capture_device_name": "",
+        # Not exposed in the UI, only in the profile's toml file
+        "capture_device_low_latency": user_profile.DEFAULT_PROFILE["capture_device_low_latency"],
         "default_comparison_method": default_settings_dialog.default_comparison_method_combobox.currentIndex(),
+        # Not exposed in the UI, only in the profile's toml file
+        "approximate_comparisons": user_profile.DEFAULT_PROFILE["approximate_comparisons"],
         "default_similarity_threshold": default_settings_dialog.default_similarity_threshold_spinbox.value(),
         "default_delay_time": default_settings_dialog.default_delay_time_spinbox.value(),
         "default_pause_time": default_settings_dialog.default_pause_time_spinbox.value(),
@@ -396,6 +437,15 @@ def get_default_settings_from_ui(autosplit: "AutoSplit"):
             "width": autosplit.width_spinbox.value(),
             "height": autosplit.height_spinbox.value(),
         },
+        # Not exposed in the UI, only in the profile's toml file
+        "drift_tracking_interval": user_profile.DEFAULT_PROFILE["drift_tracking_interval"],
+        "drift_tolerance": user_profile.DEFAULT_PROFILE["drift_tolerance"],
+        "integration_port": user_profile.DEFAULT_PROFILE["integration_port"],
+        "timestamped_commands": user_profile.DEFAULT_PROFILE["timestamped_commands"],
+        "metrics_port": user_profile.DEFAULT_PROFILE["metrics_port"],
+        "trace_buffer_size": user_profile.DEFAULT_PROFILE["trace_buffer_size"],
+        "stall_watchdog_frames": user_profile.DEFAULT_PROFILE["stall_watchdog_frames"],
+        "profiler_sample_rate": user_profile.DEFAULT_PROFILE["profiler_sample_rate"],
     }
     del temp_dialog
     return default_settings
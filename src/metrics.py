@@ -0,0 +1,227 @@
+"""
+Measurements of AutoSplit's own behaviour, to help diagnose performance issues.
+
+Modules create the metrics they record once, at import time. All metrics are kept in `REGISTRY`.
+Recording a value is cheap and thread safe.
+Metrics with a `label_name` are recorded per label value, ie: per comparison method, with `metric.labels(value)`.
+"""
+
+from collections.abc import Iterator
+from copy import copy
+from threading import Lock
+
+from typing_extensions import Self, override
+
+REGISTRY: "dict[str, Metric]" = {}
+"""Every metric created, by name"""
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+"""Default `Histogram` buckets, in seconds. From a fraction of a frame to dozens of frames."""
+
+Sample = tuple[str, dict[str, str], float]
+"""Name, labels and value of a single exported value"""
+
+
+def snapshot():
+    """@return: The current value of every metric, keyed like in the text exposition format."""
+    return {
+        f"{name}{__format_labels(labels)}": value
+        for metric in REGISTRY.values()
+        for name, labels, value in metric.samples()
+    }
+
+
+def render_text():
+    """@return: Every metric in Prometheus' text exposition format."""
+    lines: list[str] = []
+    for metric in REGISTRY.values():
+        samples = list(metric.samples())
+        # The maximum of summaries isn't part of the format, export it as its own gauge
+        max_name = f"{metric.name}_max"
+        max_samples = [sample for sample in samples if sample[0] == max_name]
+        lines += __render_family(
+            metric.name,
+            metric.kind,
+            metric.documentation,
+            [sample for sample in samples if sample[0] != max_name],
+        )
+        if max_samples:
+            lines += __render_family(max_name, "gauge", f"Maximum of {metric.name}", max_samples)
+    return "\n".join(lines) + "\n"
+
+
+def __render_family(name: str, kind: str, documentation: str, samples: list[Sample]):
+    yield f"# HELP {name} {__escape(documentation)}"
+    yield f"# TYPE {name} {kind}"
+    for sample_name, labels, value in samples:
+        yield f"{sample_name}{__format_labels(labels)} {value!r}"
+
+
+def __format_labels(labels: dict[str, str]):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{__escape(value, quotes=True)}"' for name, value in labels.items()) + "}"
+
+
+def __escape(text: str, quotes: bool = False):
+    """Escape a `HELP` line, or a label value if `quotes`."""
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text.replace('"', '\\"') if quotes else text
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_name: str | None = None):
+        if name in REGISTRY:
+            raise ValueError(f"A metric named {name!r} already exists")
+        self.name = name
+        self.documentation = documentation
+        self.label_name = label_name
+        self.label_value: str | None = None
+        self.children: dict[str, Self] = {}
+        """Metrics recorded per label value"""
+        self._lock = Lock()
+        self._reset()
+        REGISTRY[name] = self
+
+    def _reset(self):
+        """Initialize the recorded values."""
+
+    def _samples(self) -> Iterator[Sample]:  # noqa: PLR6301
+        return iter(())
+
+    def labels(self, value: str):
+        """@return: The metric recorded for that label value, created on first use."""
+        child = self.children.get(value)
+        if child is not None:
+            return child
+        with self._lock:
+            if value not in self.children:
+                child = copy(self)
+                child.label_value = value
+                child.children = {}
+                child._lock = Lock()  # noqa: SLF001 # Same class
+                child._reset()  # noqa: SLF001 # Same class
+                # Copy on write, other threads may be iterating over the children
+                self.children = {**self.children, value: child}
+            return self.children[value]
+
+    def samples(self) -> Iterator[Sample]:
+        """The values to export, including every label value's."""
+        if self.label_name is None:
+            yield from self._samples()
+            return
+        for child in self.children.values():
+            for name, labels, value in child._samples():  # noqa: SLF001 # Same class
+                yield name, {self.label_name: child.label_value or "", **labels}, value
+
+
+class Counter(Metric):
+    """A value that only goes up, like a number of events."""
+
+    kind = "counter"
+    value = 0.0
+
+    @override
+    def _reset(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    @override
+    def _samples(self) -> Iterator[Sample]:
+        yield self.name, {}, self.value
+
+
+class Gauge(Metric):
+    """A value that can go up and down, like a duration or a size."""
+
+    kind = "gauge"
+    value = 0.0
+
+    @override
+    def _reset(self):
+        self.value = 0.0
+
+    def set_value(self, value: float):
+        with self._lock:
+            self.value = value
+
+    @override
+    def _samples(self) -> Iterator[Sample]:
+        yield self.name, {}, self.value
+
+
+class Summary(Metric):
+    """How many values were observed and their sum, like durations of a recurring event."""
+
+    kind = "summary"
+    count = 0
+    total = 0.0
+    maximum = 0.0
+
+    @override
+    def _reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self.maximum = max(self.maximum, value)
+
+    @override
+    def _samples(self) -> Iterator[Sample]:
+        yield f"{self.name}_count", {}, self.count
+        yield f"{self.name}_sum", {}, self.total
+        # Not part of the exposition format's summaries, but the worst case is what matters for stutters
+        yield f"{self.name}_max", {}, self.maximum
+
+
+class Histogram(Summary):
+    """Like a `Summary`, but also counts how many values fell in each bucket, to estimate percentiles."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_name: str | None = None,
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ):
+        self.buckets = buckets
+        """Upper bounds of the buckets, in increasing order"""
+        self.bucket_counts = [0] * len(buckets)
+        super().__init__(name, documentation, label_name)
+
+    @override
+    def _reset(self):
+        super()._reset()
+        self.bucket_counts = [0] * len(self.buckets)
+
+    @override
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self.maximum = max(self.maximum, value)
+            for i, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    self.bucket_counts[i] += 1
+                    break
+
+    @override
+    def _samples(self) -> Iterator[Sample]:
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self.buckets, self.bucket_counts, strict=True):
+            cumulative_count += bucket_count
+            yield f"{self.name}_bucket", {"le": repr(float(upper_bound))}, cumulative_count
+        yield f"{self.name}_bucket", {"le": "+Inf"}, self.count
+        yield f"{self.name}_count", {}, self.count
+        yield f"{self.name}_sum", {}, self.total
+        yield f"{self.name}_max", {}, self.maximum
@@ -0,0 +1,156 @@
+"""
+Statistical profiler that can be started and stopped during a real run, to find where AutoSplit spends its time.
+
+While running, the stack of every thread is sampled at the profile's `profiler_sample_rate`.
+Stopping it saves the samples in the collapsed stack format, one line per unique stack followed by how many times
+it was sampled. Open the file in https://www.speedscope.app or render it with `flamegraph.pl`.
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from time import perf_counter, strftime
+from types import CodeType
+from typing import TYPE_CHECKING
+
+import error_messages
+from utils import auto_split_directory
+
+if TYPE_CHECKING:
+    from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
+
+
+class SamplingProfiler:
+    def __init__(self, sample_rate: int):
+        self.sample_rate = max(sample_rate, 1)
+        """Samples per second"""
+        self.stacks = Counter[str]()
+        """How many times each collapsed stack was sampled"""
+        self.__frame_names: dict[CodeType, str] = {}
+        self.__stop_event = threading.Event()
+        self.__thread = threading.Thread(target=self.__sample_loop, name="Profiler", daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+        self.__thread.join()
+
+    def __get_frame_name(self, code: CodeType):
+        frame_name = self.__frame_names.get(code)
+        if frame_name is None:
+            # co_qualname was only added in Python 3.11
+            function_name = getattr(code, "co_qualname", code.co_name)
+            frame_name = f"{function_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self.__frame_names[code] = frame_name
+        return frame_name
+
+    def __sample(self):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        current_thread_id = threading.get_ident()
+        # Only way to sample other threads
+        frames = sys._current_frames()  # noqa: SLF001 # pyright: ignore[reportPrivateUsage]
+        for thread_id, frame in frames.items():
+            if thread_id == current_thread_id:
+                continue
+            frame_names: list[str] = []
+            current_frame = frame
+            while current_frame is not None:
+                frame_names.append(self.__get_frame_name(current_frame.f_code))
+                current_frame = current_frame.f_back
+            frame_names.append(thread_names.get(thread_id, str(thread_id)))
+            # The collapsed stack format goes from the root to the leaf, separated by semicolons
+            self.stacks[";".join(reversed(frame_names)).replace("\n", " ")] += 1
+
+    def __sample_loop(self):
+        interval = 1 / self.sample_rate
+        next_sample_time = perf_counter()
+        while not self.__stop_event.wait(max(next_sample_time - perf_counter(), 0)):
+            self.__sample()
+            # Don't try to catch up on missed samples, sampling more often wouldn't make them any more accurate
+            next_sample_time = max(next_sample_time + interval, perf_counter())
+
+    def to_collapsed_stacks(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+__profiler: SamplingProfiler | None = None
+__lock = threading.Lock()
+"""Hotkeys, the menu and stdin can all start and stop the profiler, from different threads"""
+
+
+def is_running():
+    return __profiler is not None
+
+
+def default_profile_path():
+    return os.path.join(auto_split_directory, strftime("profile_%Y-%m-%d_%H-%M-%S.folded"))
+
+
+def start(sample_rate: int):
+    """Start sampling every thread `sample_rate` times per second. Does nothing if already running."""
+    global __profiler  # noqa: PLW0603
+    with __lock:
+        if __profiler is not None:
+            return
+        __profiler = SamplingProfiler(sample_rate)
+        __profiler.start()
+
+
+def stop():
+    """@return: The stopped profiler, with its samples, or None if it wasn't running."""
+    global __profiler  # noqa: PLW0603
+    with __lock:
+        profiler = __profiler
+        __profiler = None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def save_profile(autosplit: "AutoSplit | AutoSplitHeadless", profiler: SamplingProfiler, path: str = ""):
+    """
+    Save the samples in the collapsed stack format.
+
+    @param path: Defaults to a new file next to AutoSplit
+    @return: Where the profile was saved, None if it couldn't be saved
+    """
+    path = path or default_profile_path()
+    try:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(profiler.to_collapsed_stacks())
+    except OSError as exception:
+        autosplit.show_error_signal.emit(lambda exception=exception: error_messages.exception_traceback(exception))
+        return None
+    return path
+
+
+def stop_and_save(autosplit: "AutoSplit | AutoSplitHeadless", path: str = ""):
+    profiler = stop()
+    if profiler is None:
+        autosplit.show_error_signal.emit(error_messages.profiler_not_running)
+        return None
+    return save_profile(autosplit, profiler, path)
+
+
+def toggle(autosplit: "AutoSplit | AutoSplitHeadless"):
+    """Start the profiler, or stop it and save the profile next to AutoSplit."""
+    if is_running():
+        stop_and_save(autosplit)
+    else:
+        start(autosplit.settings_dict["profiler_sample_rate"])
+
+
+def handle_command(autosplit: "AutoSplit | AutoSplitHeadless", arguments: str):
+    """Handle the arguments of a `profile start` or `profile stop [path]` command."""
+    action, _, path = arguments.partition(" ")
+    match action:
+        case "start":
+            start(autosplit.settings_dict["profiler_sample_rate"])
+        case "stop":
+            stop_and_save(autosplit, path)
+        case _:
+            autosplit.show_error_signal.emit(lambda: error_messages.invalid_profiler_command(arguments))
@@ -1,4 +1,6 @@
 import os
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from math import ceil
 from typing import TYPE_CHECKING, cast
 
@@ -19,7 +21,7 @@ from winsdk.windows.graphics.capture import GraphicsCaptureItem, GraphicsCapture
 import error_messages
 from capture_method import Region
 from utils import (
-    BGR_CHANNEL_COUNT,
+    BGRA_CHANNEL_COUNT,
     MAXBYTE,
     ImageShape,
     auto_split_directory,
@@ -30,8 +32,22 @@ from utils import (
 
 if TYPE_CHECKING:
     from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
 
 ALIGN_REGION_THRESHOLD = 0.9
+ALIGN_SCALES = np.linspace(0.2, 3, num=56)
+"""Tests 56 template sizes, scaled from 20% to 300% of the original template size"""
+ALIGN_COARSE_MAX_WIDTH = 640
+"""The capture is halved until it's at most this wide to roughly find the template's scale and location"""
+ALIGN_COARSE_MIN_TEMPLATE_SIZE = 24
+"""
+Each template size is roughly tested on the most halved capture that keeps it at least this big.
+Smaller templates match almost anything, so their similarities wouldn't be comparable with the other sizes.
+"""
+ALIGN_COARSE_ERROR_RATIO = 2
+"""Every downscaled size roughly matching with at most this many times the error of the best one is refined"""
+ALIGN_WAIT_INTERVAL = 0.01
+"""How often to process GUI events while waiting for template matches, in seconds"""
 BORDER_WIDTH = 2
 SUPPORTED_IMREAD_FORMATS = [
     ("Windows bitmaps", "*.bmp *.dib"),
@@ -183,24 +199,32 @@ def align_region(autosplit: "AutoSplit"):
         return
 
     template = cv2.imread(template_filename, cv2.IMREAD_UNCHANGED)
-    # Add alpha channel to template if it's missing.
-    if template.shape[ImageShape.Channels] == BGR_CHANNEL_COUNT:
-        template = cv2.cvtColor(template, cv2.COLOR_BGR2BGRA)
-
     # Validate template is a valid image file
     if not is_valid_image(template):
         error_messages.image_validity()
         return
+    # Alignment is done in BGR, remove alpha channel from template if present.
+    if template.shape[ImageShape.Channels] == BGRA_CHANNEL_COUNT:
+        template = cv2.cvtColor(template, cv2.COLOR_BGRA2BGR)
 
     # Obtaining the capture of a region which contains the
     # subregion being searched for to align the image.
-    capture = autosplit.capture_method.get_frame()
+    frame = autosplit.capture_method.get_frame()
 
-    if not is_valid_image(capture):
+    if not is_valid_image(frame):
         error_messages.region()
         return
-
-    best_match, best_height, best_width, best_loc = __test_alignment(capture, template)
+    capture = frame
+    if capture.shape[ImageShape.Channels] == BGRA_CHANNEL_COUNT:
+        capture = cv2.cvtColor(capture, cv2.COLOR_BGRA2BGR)
+
+    # Keep the GUI responsive and prevent starting another alignment while this one is searching
+    autosplit.align_region_button.setEnabled(False)
+    try:
+        best_match, best_height, best_width, best_loc = __test_alignment(capture, template)
+    finally:
+        autosplit.align_region_button.setEnabled(True)
+        autosplit.capture_method.release_frame(frame)
 
     # Go ahead and check if this satisfies our requirement before setting the region
     # We don't want a low similarity image to be aligned.
@@ -230,49 +254,161 @@ def __set_region_values(autosplit: "AutoSplit", x: int, y: int, width: int, heig
     autosplit.height_spinbox.setValue(height)
 
 
+__alignment_pool = ThreadPoolExecutor(thread_name_prefix="Alignment")
+"""OpenCV releases the GIL, so each template scale can be matched on its own thread"""
+
+
+def __match_template(
+    capture: MatLike,
+    template: MatLike,
+    size: tuple[int, int],
+    interpolation: int,
+    search_area: tuple[int, int, int, int] | None = None,
+):
+    """
+    Since we are using SQDIFF the best match will be the min_val which is located at min_loc.
+
+    @param search_area: Only search for the template in this (x, y, width, height) area of the capture
+    @return: The similarity from 0.0 to 1.0 and the location of the best match in the capture
+    """
+    resized = cv2.resize(template, size, interpolation=interpolation)
+    area_x, area_y = 0, 0
+    if search_area is not None:
+        area_x, area_y, area_width, area_height = search_area
+        # Slicing an image is typed as a generic array, but it's still an image
+        capture = cast(MatLike, capture[area_y : area_y + area_height, area_x : area_x + area_width])
+    result = cv2.matchTemplate(capture, resized, cv2.TM_SQDIFF)
+    min_val, _, min_loc, *_ = cv2.minMaxLoc(result)
+
+    # The maximum value for SQ_DIFF is dependent on the size of the template
+    # we need this value to normalize it from 0.0 to 1.0
+    max_error = resized.size * MAXBYTE * MAXBYTE
+    return 1 - (min_val / max_error), (area_x + min_loc[0], area_y + min_loc[1])
+
+
+def __wait_for_matches(futures: Iterable[Future[tuple[float, tuple[int, int]]]]):
+    futures = list(futures)
+    # Keep the GUI responsive while the matches run on the pool
+    while wait(futures, timeout=ALIGN_WAIT_INTERVAL).not_done:
+        QtWidgets.QApplication.processEvents()
+    return [future.result() for future in futures]
+
+
 def __test_alignment(capture: MatLike, template: MatLike):
     """
     Obtain the best matching point for the template within the
     capture. This assumes that the template is actually smaller
-    than the dimensions of the capture. Since we are using SQDIFF
-    the best match will be the min_val which is located at min_loc.
-    The best match found in the image, set everything to 0 by default
-    so that way the first match will overwrite these values.
+    than the dimensions of the capture.
+
+    Every scale is first roughly tested on a downscaled pyramid level of the capture.
+    Only the scales around the best candidates are then tested at full resolution,
+    and only around where they were found.
     """
-    best_match = 0.0
-    best_height = 0
-    best_width = 0
-    best_loc = (0, 0)
-
-    # This tests 50 images scaled from 20% to 300% of the original template size
-    for scale in np.linspace(0.2, 3, num=56):
-        width = int(template.shape[ImageShape.X] * scale)
-        height = int(template.shape[ImageShape.Y] * scale)
-
-        # The template can not be larger than the capture
-        if width > capture.shape[ImageShape.X] or height > capture.shape[ImageShape.Y]:
-            continue
-
-        resized = cv2.resize(template, (width, height), interpolation=cv2.INTER_NEAREST)
-
-        result = cv2.matchTemplate(capture, resized, cv2.TM_SQDIFF)
-        min_val, _, min_loc, *_ = cv2.minMaxLoc(result)
-
-        # The maximum value for SQ_DIFF is dependent on the size of the template
-        # we need this value to normalize it from 0.0 to 1.0
-        max_error = resized.size * MAXBYTE * MAXBYTE
-        similarity = 1 - (min_val / max_error)
-
-        # Check if the similarity was good enough to get alignment
-        if similarity > best_match:
-            best_match = similarity
-            best_width = width
-            best_height = height
-            best_loc = min_loc
+    template_width = template.shape[ImageShape.X]
+    template_height = template.shape[ImageShape.Y]
+    # The template can not be larger than the capture
+    sizes = [
+        (int(template_width * scale), int(template_height * scale))
+        for scale in ALIGN_SCALES
+        if 0 < int(template_width * scale) <= capture.shape[ImageShape.X]
+        and 0 < int(template_height * scale) <= capture.shape[ImageShape.Y]
+    ]
+    if not sizes:
+        return 0.0, 0, 0, (0, 0)
+
+    pyramid = [capture]
+    while pyramid[-1].shape[ImageShape.X] > ALIGN_COARSE_MAX_WIDTH:
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    levels = [__get_pyramid_level(size, len(pyramid) - 1) for size in sizes]
+
+    # Sizes that can't be downscaled are tested over the whole capture right away
+    coarse_matches = __wait_for_matches(
+        __alignment_pool.submit(
+            __match_template,
+            pyramid[level],
+            template,
+            (max(1, round(width / 2**level)), max(1, round(height / 2**level))),
+            cv2.INTER_AREA if level else cv2.INTER_NEAREST,
+        )
+        for (width, height), level in zip(sizes, levels, strict=True)
+    )
+    refinements = __find_refinements(capture, sizes, levels, coarse_matches)
+    fine_matches = __wait_for_matches(
+        __alignment_pool.submit(
+            __match_template,
+            capture,
+            template,
+            sizes[index],
+            cv2.INTER_NEAREST,
+            search_area,
+        )
+        for index, search_area in refinements.items()
+    )
+
+    # Sizes that weren't downscaled were already tested at full resolution
+    matches = {index: coarse_matches[index] for index in range(len(sizes)) if not levels[index]}
+    matches.update(zip(refinements, fine_matches, strict=True))
+    best_index = max(matches, key=lambda index: matches[index][0])
+    best_match, best_loc = matches[best_index]
+    best_width, best_height = sizes[best_index]
     return best_match, best_height, best_width, best_loc
 
 
-def validate_before_parsing(autosplit: "AutoSplit", show_error: bool = True, check_empty_directory: bool = True):
+def __get_pyramid_level(size: tuple[int, int], max_level: int):
+    """@return: How many times the capture can be halved for this template size."""
+    level = 0
+    while level < max_level and min(size) / 2 ** (level + 1) >= ALIGN_COARSE_MIN_TEMPLATE_SIZE:
+        level += 1
+    return level
+
+
+def __find_refinements(
+    capture: MatLike,
+    sizes: list[tuple[int, int]],
+    levels: list[int],
+    coarse_matches: list[tuple[float, tuple[int, int]]],
+):
+    """
+    Find which of the roughly tested sizes are worth testing again at full resolution.
+
+    @return: The indexes of the sizes to test at full resolution, with the area of the capture to search
+    """
+    downscaled = [index for index in range(len(sizes)) if levels[index]]
+    if not downscaled:
+        return {}
+    # Sizes tested on different pyramid levels aren't exactly comparable, so this leaves some leeway
+    max_error = (1 - max(coarse_matches[index][0] for index in downscaled)) * ALIGN_COARSE_ERROR_RATIO
+    candidates = [index for index in downscaled if 1 - coarse_matches[index][0] <= max_error]
+
+    # Refine the candidates and their neighbouring scales, around where the candidates were found
+    refinements: dict[int, tuple[int, int, int, int]] = {}
+    for candidate in candidates:
+        factor = 2 ** levels[candidate]
+        coarse_x, coarse_y = coarse_matches[candidate][1]
+        for index in range(max(0, candidate - 1), min(len(sizes), candidate + 2)):
+            # Sizes that weren't downscaled were already tested over the whole capture
+            if index in refinements or not levels[index]:
+                continue
+            width, height = sizes[index]
+            # Account for the rounding of pyramid levels and the size difference with the candidate scale
+            margin = factor * 2 + max(abs(width - sizes[candidate][0]), abs(height - sizes[candidate][1]))
+            x = min(max(0, coarse_x * factor - margin), capture.shape[ImageShape.X] - width)
+            y = min(max(0, coarse_y * factor - margin), capture.shape[ImageShape.Y] - height)
+            refinements[index] = (
+                x,
+                y,
+                min(capture.shape[ImageShape.X] - x, width + margin * 2),
+                min(capture.shape[ImageShape.Y] - y, height + margin * 2),
+            )
+
+    return refinements
+
+
+def validate_before_parsing(
+    autosplit: "AutoSplit | AutoSplitHeadless",
+    show_error: bool = True,
+    check_empty_directory: bool = True,
+):
     error = None
     if not autosplit.settings_dict["split_image_directory"]:
         error = error_messages.split_image_directory
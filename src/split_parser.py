@@ -8,6 +8,7 @@ from utils import is_valid_image
 
 if TYPE_CHECKING:
     from AutoSplit import AutoSplit
+    from user_profile import UserProfileDict
 
 [
     DUMMY_FLAG,
@@ -118,6 +119,22 @@ def comparison_method_from_filename(filename: str):
     return value if value >= 0 else None
 
 
+def check_rate_from_filename(filename: str):
+    """
+    Retrieve the check rate (comparisons per second) from filename, if there is no check rate or the check rate
+    isn't a valid positive number, then None is returned.
+
+    @param filename: String containing the file's name
+    @return: A valid check rate, if not then None
+    """
+    # Check to make sure there is a valid check rate between percent signs
+    # of the filename
+    value = __value_from_filename(filename, "%%", -1.0)
+
+    # Check rates should always be strictly positive
+    return value if value > 0 else None
+
+
 def flags_from_filename(filename: str):
     """
     Retrieve the flags from the filename, if there are no flags then 0 is returned.
@@ -172,12 +189,18 @@ def __pop_image_type(split_image: list[AutoSplitImage], image_type: ImageType):
     return None
 
 
-def parse_and_validate_images(autosplit: "AutoSplit"):
+def load_images(settings_dict: "UserProfileDict", is_auto_controlled: bool):
+    """
+    Load and validate the images from the split image directory, without touching the GUI.
+
+    @return: The Start Image, the Reset Image, the split images,
+    and the error message to show if they aren't valid (None if they are)
+    """
     # Get split images
     all_images = [
-        AutoSplitImage(os.path.join(autosplit.settings_dict["split_image_directory"], image_name))
+        AutoSplitImage(os.path.join(settings_dict["split_image_directory"], image_name))
         for image_name
-        in os.listdir(autosplit.settings_dict["split_image_directory"])
+        in os.listdir(settings_dict["split_image_directory"])
     ]
 
     # Find non-split images and then remove them from the list
@@ -190,16 +213,16 @@ def parse_and_validate_images(autosplit: "AutoSplit"):
     # If there is no start hotkey set but a Start Image is present, and is not auto controlled, throw an error.
     if (
         start_image
-        and not autosplit.settings_dict["split_hotkey"]
-        and not autosplit.is_auto_controlled
+        and not settings_dict["split_hotkey"]
+        and not is_auto_controlled
     ):
         error_message = error_messages.load_start_image
 
     # If there is no reset hotkey set but a Reset Image is present, and is not auto controlled, throw an error.
     elif (
         reset_image
-        and not autosplit.settings_dict["reset_hotkey"]
-        and not autosplit.is_auto_controlled
+        and not settings_dict["reset_hotkey"]
+        and not is_auto_controlled
     ):
         error_message = error_messages.reset_hotkey
 
@@ -218,9 +241,9 @@ def parse_and_validate_images(autosplit: "AutoSplit"):
 
             # error out if there is a {p} flag but no pause hotkey set and is not auto controlled.
             if (
-                not autosplit.settings_dict["pause_hotkey"]
+                not settings_dict["pause_hotkey"]
                 and image.check_flag(PAUSE_FLAG)
-                and not autosplit.is_auto_controlled
+                and not is_auto_controlled
             ):
                 error_message = error_messages.pause_hotkey
                 break
@@ -235,6 +258,15 @@ def parse_and_validate_images(autosplit: "AutoSplit"):
                 error_message = lambda: error_messages.multiple_keyword_images(START_KEYWORD)  # noqa: E731
                 break
 
+    return start_image, reset_image, split_images, error_message
+
+
+def parse_and_validate_images(autosplit: "AutoSplit"):
+    start_image, reset_image, split_images, error_message = load_images(
+        autosplit.settings_dict,
+        autosplit.is_auto_controlled,
+    )
+
     if error_message:
         autosplit.start_image = None
         autosplit.reset_image = None
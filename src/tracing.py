@@ -0,0 +1,145 @@
+"""
+Timeline of what AutoSplit spent its time on, to find out which stage stalled on a slow frame.
+
+Disabled unless the profile's `trace_buffer_size` is set. Spans are then recorded in a preallocated ring buffer,
+keeping only the most recent ones, and can be saved at any time in the Chrome trace format.
+Open the file in https://ui.perfetto.dev or `chrome://tracing`.
+"""
+
+import json
+import os
+import threading
+from array import array
+from contextlib import nullcontext
+from itertools import count
+from time import perf_counter, strftime
+from typing import TYPE_CHECKING
+
+import error_messages
+from utils import auto_split_directory
+
+if TYPE_CHECKING:
+    from AutoSplit import AutoSplit
+    from AutoSplitHeadless import AutoSplitHeadless
+
+MICROSECONDS = 1_000_000
+
+
+class TraceBuffer:
+    """Fixed size ring buffer of spans. Recording never allocates a new buffer, nor waits on a lock."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.names = [""] * size
+        self.details = [""] * size
+        self.thread_ids = array("Q", bytes(8 * size))
+        self.start_times = array("d", bytes(8 * size))
+        self.end_times = array("d", bytes(8 * size))
+        self.__indexes = count()
+        """`next` on a `count` is atomic, so each thread gets its own slot"""
+
+    def record(self, name: str, detail: str, start_time: float, end_time: float):
+        index = next(self.__indexes) % self.size
+        self.names[index] = name
+        self.details[index] = detail
+        self.thread_ids[index] = threading.get_ident()
+        self.start_times[index] = start_time
+        self.end_times[index] = end_time
+
+    def to_chrome_trace(self) -> dict[str, object]:
+        pid = os.getpid()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        # Spans still being written to while saving may be torn, that's fine for a diagnostic
+        spans = sorted(
+            zip(self.names, self.details, self.thread_ids, self.start_times, self.end_times, strict=True),
+            key=lambda span: span[3],
+        )
+        events: list[dict[str, object]] = [
+            {
+                "name": name,
+                "cat": "autosplit",
+                "ph": "X",
+                "ts": start_time * MICROSECONDS,
+                "dur": (end_time - start_time) * MICROSECONDS,
+                "pid": pid,
+                "tid": thread_id,
+                **({"args": {"detail": detail}} if detail else {}),
+            }
+            for name, detail, thread_id, start_time, end_time in spans
+            if name
+        ]
+        events.extend(
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+            for thread_id, thread_name in thread_names.items()
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class Span:
+    __slots__ = ("buffer", "detail", "name", "start_time")
+
+    def __init__(self, buffer: TraceBuffer, name: str, detail: str):
+        self.buffer = buffer
+        self.name = name
+        self.detail = detail
+        self.start_time = 0.0
+
+    def __enter__(self):
+        self.start_time = perf_counter()
+
+    def __exit__(self, *_: object):
+        self.buffer.record(self.name, self.detail, self.start_time, perf_counter())
+
+
+__buffer: TraceBuffer | None = None
+__no_span = nullcontext()
+
+
+def configure(buffer_size: int):
+    """Keep the last `buffer_size` spans, or disable tracing if 0. Keeps the recorded spans if the size is the same."""
+    global __buffer  # noqa: PLW0603
+    if buffer_size <= 0:
+        __buffer = None
+    elif __buffer is None or __buffer.size != buffer_size:
+        __buffer = TraceBuffer(buffer_size)
+
+
+def is_enabled():
+    return __buffer is not None
+
+
+def default_trace_path():
+    return os.path.join(auto_split_directory, strftime("trace_%Y-%m-%d_%H-%M-%S.json"))
+
+
+def span(name: str, detail: str = ""):
+    """
+    Record how long the `with` block took. Cheap enough to leave everywhere when tracing is disabled.
+
+    @param detail: Shown in the span's arguments, ie: the image being compared
+    """
+    buffer = __buffer
+    if buffer is None:
+        return __no_span
+    return Span(buffer, name, detail)
+
+
+def save_trace(autosplit: "AutoSplit | AutoSplitHeadless", path: str = ""):
+    """
+    Save the recorded spans in the Chrome trace format.
+
+    @param path: Defaults to a new file next to AutoSplit
+    @return: Where the trace was saved, None if tracing is disabled or it couldn't be saved
+    """
+    buffer = __buffer
+    if buffer is None:
+        autosplit.show_error_signal.emit(error_messages.tracing_disabled)
+        return None
+    path = path or default_trace_path()
+    try:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(buffer.to_chrome_trace(), file)
+    except OSError as exception:
+        autosplit.show_error_signal.emit(lambda exception=exception: error_messages.exception_traceback(exception))
+        return None
+    return path
@@ -1,5 +1,6 @@
 import os
 from copy import deepcopy
+from math import inf
 from typing import TYPE_CHECKING, TypedDict, cast
 
 import toml
@@ -7,6 +8,7 @@ from PySide6 import QtCore, QtWidgets
 from typing_extensions import deprecated, override
 
 import error_messages
+import tracing
 from capture_method import CAPTURE_METHODS, CaptureMethodEnum, Region, change_capture_method
 from gen import design
 from hotkeys import HOTKEYS, remove_all_hotkeys, set_hotkey
@@ -24,12 +26,16 @@ class UserProfileDict(TypedDict):
     pause_hotkey: str
     screenshot_hotkey: str
     toggle_auto_reset_image_hotkey: str
+    toggle_profiler_hotkey: str
     fps_limit: int
+    preview_fps_limit: int
     live_capture_region: bool
     capture_method: str | CaptureMethodEnum
     capture_device_id: int
     capture_device_name: str
+    capture_device_low_latency: bool
     default_comparison_method: int
+    approximate_comparisons: bool
     default_similarity_threshold: float
     default_delay_time: int
     default_pause_time: float
@@ -41,6 +47,14 @@ class UserProfileDict(TypedDict):
     open_screenshot: bool
     captured_window_title: str
     capture_region: Region
+    drift_tracking_interval: float
+    drift_tolerance: int
+    integration_port: int
+    timestamped_commands: bool
+    metrics_port: int
+    trace_buffer_size: int
+    stall_watchdog_frames: int
+    profiler_sample_rate: int
 
     @override  # pyright: ignore
     @deprecated("Use `copy.deepcopy` instead")
@@ -55,12 +69,16 @@ DEFAULT_PROFILE = UserProfileDict(
     pause_hotkey="",
     screenshot_hotkey="",
     toggle_auto_reset_image_hotkey="",
+    toggle_profiler_hotkey="",
     fps_limit=60,
+    preview_fps_limit=30,
     live_capture_region=True,
     capture_method=CAPTURE_METHODS.get_method_by_index(0),
     capture_device_id=0,
     capture_device_name="",
+    capture_device_low_latency=False,
     default_comparison_method=0,
+    approximate_comparisons=False,
     default_similarity_threshold=0.95,
     default_delay_time=0,
     default_pause_time=10,
@@ -72,9 +90,35 @@ DEFAULT_PROFILE = UserProfileDict(
     open_screenshot=True,
     captured_window_title="",
     capture_region=Region(x=0, y=0, width=1, height=1),
+    drift_tracking_interval=0,
+    drift_tolerance=2,
+    integration_port=0,
+    timestamped_commands=False,
+    metrics_port=0,
+    trace_buffer_size=0,
+    stall_watchdog_frames=0,
+    profiler_sample_rate=100,
 )
 
 
+MAX_PORT = 65535
+MAX_PROFILER_SAMPLE_RATE = 1000
+PROFILE_ONLY_NUMBER_RANGES: dict[str, tuple[float, float]] = {
+    "preview_fps_limit": (1, inf),
+    "drift_tracking_interval": (0, inf),
+    "drift_tolerance": (0, inf),
+    "integration_port": (0, MAX_PORT),
+    "metrics_port": (0, MAX_PORT),
+    "trace_buffer_size": (0, inf),
+    "stall_watchdog_frames": (0, inf),
+    "profiler_sample_rate": (1, MAX_PROFILER_SAMPLE_RATE),
+}
+"""
+Minimum and maximum of the numeric settings that no spinbox limits, as they're only set in the profile.
+0 disables the settings that can be disabled.
+"""
+
+
 def have_settings_changed(autosplit: "AutoSplit"):
     return autosplit.settings_dict != autosplit.last_saved_settings
 
@@ -115,18 +159,30 @@ def __save_settings_to_file(autosplit: "AutoSplit", save_settings_file_path: str
     return save_settings_file_path
 
 
+def read_settings_file(load_settings_file_path: str):
+    """
+    Read a profile without applying it to anything.
+
+    @raise FileNotFoundError | MemoryError | TypeError | toml.TomlDecodeError: If the profile can't be read
+    """
+    with open(load_settings_file_path, encoding="utf-8") as file:
+        # Casting here just so we can build an actual UserProfileDict once we're done validating
+        # Fallback to default settings if some are missing from the file. This happens when new settings are added.
+        loaded_settings = DEFAULT_PROFILE | cast(UserProfileDict, toml.load(file))
+
+    # Out of range values would otherwise only fail once used, ie: dividing by a rate of 0 on every frame
+    numbers = cast(dict[str, float], loaded_settings)
+    for key, (minimum, maximum) in PROFILE_ONLY_NUMBER_RANGES.items():
+        numbers[key] = min(max(numbers[key], minimum), maximum)
+    return UserProfileDict(**loaded_settings)
+
+
 def __load_settings_from_file(autosplit: "AutoSplit", load_settings_file_path: str):
     if load_settings_file_path.endswith(".pkl"):
         autosplit.show_error_signal.emit(error_messages.old_version_settings_file)
         return False
     try:
-        with open(load_settings_file_path, encoding="utf-8") as file:
-            # Casting here just so we can build an actual UserProfileDict once we're done validating
-            # Fallback to default settings if some are missing from the file. This happens when new settings are added.
-            loaded_settings = DEFAULT_PROFILE | cast(UserProfileDict, toml.load(file))
-
-        # TODO: Data Validation / fallbacks ?
-        autosplit.settings_dict = UserProfileDict(**loaded_settings)
+        autosplit.settings_dict = read_settings_file(load_settings_file_path)
         autosplit.last_saved_settings = deepcopy(autosplit.settings_dict)
 
         autosplit.x_spinbox.setValue(autosplit.settings_dict["capture_region"]["x"])
@@ -154,6 +210,10 @@ def __load_settings_from_file(autosplit: "AutoSplit", load_settings_file_path: s
             + f"\n{autosplit.settings_dict['captured_window_title']!r}"
             + "\nto automatically load Capture Region",
         )
+    autosplit.integration_server.listen(autosplit.settings_dict["integration_port"])
+    autosplit.metrics_server.listen(autosplit.settings_dict["metrics_port"])
+    tracing.configure(autosplit.settings_dict["trace_buffer_size"])
+    autosplit.stall_watchdog.configure(autosplit.settings_dict["stall_watchdog_frames"])
 
     return True
 
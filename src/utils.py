@@ -8,7 +8,7 @@ from enum import IntEnum
 from itertools import chain
 from platform import version
 from threading import Thread
-from typing import TYPE_CHECKING, Any, TypeGuard, TypeVar
+from typing import TYPE_CHECKING, Any, TypeGuard, TypeVar, cast
 
 import win32gui
 import win32ui
@@ -32,6 +32,9 @@ BGR_CHANNEL_COUNT = 3
 """How many channels in a BGR image"""
 BGRA_CHANNEL_COUNT = 4
 """How many channels in a BGRA image"""
+CropBox = tuple[float, float, float, float]
+"""A sub-rectangle of the capture region as (x, y, width, height), in fractions of the capture region's size"""
+FULL_CROP_BOX: CropBox = (0.0, 0.0, 1.0, 1.0)
 
 
 class ImageShape(IntEnum):
@@ -66,6 +69,54 @@ def is_valid_image(image: MatLike | None) -> TypeGuard[MatLike]:
     return image is not None and bool(image.size)
 
 
+def crop_box_to_rect(crop_box: CropBox, width: int, height: int):
+    """
+    Converts a fractional crop box to pixels for an image of the given `width` and `height`.
+    The resulting rectangle is always at least 1 pixel and never out of bounds.
+
+    @return: The (x, y, width, height) of the crop box in pixels
+    """
+    box_x, box_y, box_width, box_height = crop_box
+    left = min(max(round(box_x * width), 0), width - 1)
+    top = min(max(round(box_y * height), 0), height - 1)
+    right = min(max(round((box_x + box_width) * width), left + 1), width)
+    bottom = min(max(round((box_y + box_height) * height), top + 1), height)
+    return left, top, right - left, bottom - top
+
+
+def crop_to_box(image: MatLike, crop_box: CropBox):
+    """@return: A view of the `crop_box` part of `image`, no copy is made."""
+    if crop_box == FULL_CROP_BOX:
+        return image
+    x, y, width, height = crop_box_to_rect(crop_box, image.shape[ImageShape.X], image.shape[ImageShape.Y])
+    # Slicing an image is typed as a generic array, but it's still an image
+    return cast(MatLike, image[y : y + height, x : x + width])
+
+
+def union_of_crop_boxes(crop_boxes: Iterable[CropBox]) -> CropBox:
+    """@return: The smallest crop box containing all of `crop_boxes`, or the full box if there are none."""
+    crop_boxes = list(crop_boxes)
+    if not crop_boxes:
+        return FULL_CROP_BOX
+    left = min(x for x, _, _, _ in crop_boxes)
+    top = min(y for _, y, _, _ in crop_boxes)
+    right = max(x + width for x, _, width, _ in crop_boxes)
+    bottom = max(y + height for _, y, _, height in crop_boxes)
+    return left, top, right - left, bottom - top
+
+
+def relative_crop_box(crop_box: CropBox, within: CropBox) -> CropBox:
+    """@return: `crop_box` expressed as fractions of the `within` crop box instead of the whole capture region."""
+    x, y, width, height = crop_box
+    within_x, within_y, within_width, within_height = within
+    return (
+        (x - within_x) / within_width,
+        (y - within_y) / within_height,
+        width / within_width,
+        height / within_height,
+    )
+
+
 def is_valid_hwnd(hwnd: int):
     """Validate the hwnd points to a valid window and not the desktop or whatever window obtained with `""`."""
     if not hwnd:
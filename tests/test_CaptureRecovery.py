@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+
+from CaptureRecovery import RECOVERY_INITIAL_DELAY, RECOVERY_MAX_DELAY, CaptureRecovery
+
+FRAME_INTERVAL = 1 / 60
+
+
+class FakeSystem:
+    """The time and windows `CaptureRecovery` sees."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.hwnd = 0
+        """The window with the captured window's title, 0 if there is none"""
+
+
+class FakeCaptureMethod:
+    def __init__(self, system: FakeSystem):
+        self.__system = system
+        self.attempt_times: list[float] = []
+        self.can_recover = False
+
+    def recover_window(self, captured_window_title: str):
+        self.attempt_times.append(self.__system.now)
+        return self.can_recover
+
+
+@pytest.fixture()
+def system(monkeypatch: pytest.MonkeyPatch):
+    system = FakeSystem()
+    monkeypatch.setattr("CaptureRecovery.time", lambda: system.now)
+    # No jitter
+    monkeypatch.setattr("CaptureRecovery.uniform", lambda low, high: (low + high) / 2)
+    monkeypatch.setattr("CaptureRecovery.win32gui.FindWindow", lambda *_: system.hwnd)
+    monkeypatch.setattr("CaptureRecovery.is_valid_hwnd", bool)
+    return system
+
+
+def create_recovery(system: FakeSystem):
+    capture_method = FakeCaptureMethod(system)
+    autosplit = SimpleNamespace(settings_dict={"captured_window_title": "Game"}, capture_method=capture_method)
+    return CaptureRecovery(autosplit), capture_method  # pyright: ignore[reportArgumentType]
+
+
+def lose_capture_for(recovery: CaptureRecovery, system: FakeSystem, duration: float):
+    """Try recovering on every frame for `duration` seconds."""
+    end_time = system.now + duration
+    while system.now < end_time:
+        recovery.try_recover()
+        system.now += FRAME_INTERVAL
+
+
+def test_recovery_is_tried_right_away(system: FakeSystem):
+    recovery, capture_method = create_recovery(system)
+    system.now = 10
+    assert not recovery.try_recover()
+    assert capture_method.attempt_times == [10]
+
+
+def test_recovery_backs_off_exponentially(system: FakeSystem):
+    recovery, capture_method = create_recovery(system)
+    lose_capture_for(recovery, system, 30)
+
+    delays = [
+        later - earlier
+        for earlier, later in zip(capture_method.attempt_times, capture_method.attempt_times[1:], strict=False)
+    ]
+    expected_delays = [min(RECOVERY_INITIAL_DELAY * 2**attempt, RECOVERY_MAX_DELAY) for attempt in range(len(delays))]
+    # Attempts only happen on frames
+    assert delays == pytest.approx(expected_delays, abs=FRAME_INTERVAL)
+    assert delays[-1] == pytest.approx(RECOVERY_MAX_DELAY, abs=FRAME_INTERVAL)
+
+
+def test_recovery_is_tried_right_away_when_a_new_window_appears(system: FakeSystem):
+    recovery, capture_method = create_recovery(system)
+    lose_capture_for(recovery, system, 10)
+    attempts = len(capture_method.attempt_times)
+
+    system.hwnd = 1
+    recovery.try_recover()
+    assert len(capture_method.attempt_times) == attempts + 1
+    # That window was already tried
+    recovery.try_recover()
+    assert len(capture_method.attempt_times) == attempts + 1
+
+
+def test_recovery_starts_over_once_capture_succeeds(system: FakeSystem):
+    recovery, capture_method = create_recovery(system)
+    lose_capture_for(recovery, system, 10)
+    capture_method.can_recover = True
+    system.now += RECOVERY_MAX_DELAY
+    assert recovery.try_recover()
+    recovery.capture_succeeded()
+
+    capture_method.can_recover = False
+    capture_method.attempt_times.clear()
+    lost_time = system.now
+    lose_capture_for(recovery, system, RECOVERY_INITIAL_DELAY * 2)
+    assert capture_method.attempt_times == pytest.approx(
+        [lost_time, lost_time + RECOVERY_INITIAL_DELAY],
+        abs=FRAME_INTERVAL,
+    )
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+from cv2.typing import MatLike
+
+from DriftTracker import DRIFT_TRACKING_WIDTH, DriftTracker, drift_checks
+from FrameBus import Frame
+from utils import FULL_CROP_BOX
+
+FRAME_SIZE = (DRIFT_TRACKING_WIDTH, 180)
+MARGIN = 40
+CAPTURE_REGION_SCALE = 2
+"""The capture region is twice the size of the frames, so offsets are twice the shift in the frames"""
+
+
+@pytest.fixture()
+def scene():
+    """Smooth random content, larger than a frame so it can be shifted around."""
+    width, height = FRAME_SIZE
+    noise = np.random.default_rng(0).integers(0, 256, (height + MARGIN * 2, width + MARGIN * 2, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), 3)
+
+
+def frame_of(scene: MatLike, shift_x: int, shift_y: int):
+    """The frame captured once the window's content moved by (`shift_x`, `shift_y`) pixels."""
+    width, height = FRAME_SIZE
+    left, top = MARGIN - shift_x, MARGIN - shift_y
+    return Frame(np.ascontiguousarray(scene[top : top + height, left : left + width]), FULL_CROP_BOX, 0)
+
+
+def create_tracker():
+    width, height = FRAME_SIZE
+    autosplit = SimpleNamespace(
+        is_running=True,
+        settings_dict={
+            "capture_region": {
+                "x": 0,
+                "y": 0,
+                "width": width * CAPTURE_REGION_SCALE,
+                "height": height * CAPTURE_REGION_SCALE,
+            },
+            "drift_tracking_interval": 1,
+            "drift_tolerance": 2,
+        },
+    )
+    offsets: list[tuple[int, int]] = []
+    tracker = DriftTracker(autosplit, lambda x, y: offsets.append((x, y)))  # pyright: ignore[reportArgumentType]
+    return tracker, offsets
+
+
+def test_drift_found_twice_in_a_row_moves_the_capture_region(scene: MatLike):
+    tracker, offsets = create_tracker()
+    check_count = drift_checks.value
+    tracker.on_frame(frame_of(scene, 0, 0))
+    tracker.on_frame(frame_of(scene, 5, -3))
+    assert offsets == []
+    tracker.on_frame(frame_of(scene, 5, -3))
+    assert offsets == [(5 * CAPTURE_REGION_SCALE, -3 * CAPTURE_REGION_SCALE)]
+    assert drift_checks.value == check_count + 3
+
+
+def test_panning_doesnt_move_the_capture_region(scene: MatLike):
+    tracker, offsets = create_tracker()
+    for shift in range(0, 30, 6):
+        tracker.on_frame(frame_of(scene, shift, 0))
+    assert offsets == []
+
+
+def test_drift_within_tolerance_is_ignored(scene: MatLike):
+    tracker, offsets = create_tracker()
+    for _ in range(3):
+        tracker.on_frame(frame_of(scene, 1, 1))
+    tracker.on_frame(frame_of(scene, 0, 0))
+    assert offsets == []
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from FrameBus import CaptureRequest, Frame, FrameBus, merge_capture_requests
+from utils import FULL_CROP_BOX, CropBox
+
+TICK_RATE = 60
+
+
+def test_merging_a_single_request_keeps_it():
+    request = CaptureRequest((320, 240), (0.25, 0.5, 0.5, 0.25))
+    assert merge_capture_requests([request]) == request
+
+
+def test_merged_request_contains_every_crop_box_at_a_large_enough_size():
+    merged_request = merge_capture_requests([
+        CaptureRequest((320, 240), (0, 0, 0.5, 0.5)),
+        CaptureRequest((100, 300), (0.5, 0.75, 0.25, 0.25)),
+    ])
+    assert merged_request.crop_box == (0, 0, 0.75, 1)
+    # Each request gets at least its size within its own crop box
+    assert merged_request.size == (480, 1200)
+
+
+def test_merged_request_size_is_the_largest_needed():
+    merged_request = merge_capture_requests([
+        CaptureRequest((320, 240)),
+        CaptureRequest((640, 120)),
+    ])
+    assert merged_request == CaptureRequest((640, 240), FULL_CROP_BOX)
+
+
+class FakeCapture:
+    def __init__(self):
+        self.requests: list[tuple[tuple[int, int], CropBox]] = []
+
+    def __call__(self, size: tuple[int, int], crop_box: CropBox):
+        self.requests.append((size, crop_box))
+        return np.zeros((size[1], size[0], 3), dtype=np.uint8)
+
+
+def run_ticks(frame_bus: FrameBus, tick_count: int):
+    for index in range(tick_count):
+        frame_bus.tick(index / TICK_RATE)
+
+
+@pytest.mark.parametrize(("rate", "frame_count"), [(None, 60), (60, 60), (30, 30), (20, 20), (1, 1), (120, 60)])
+def test_subscribers_get_frames_at_their_rate(rate: float | None, frame_count: int):
+    frame_bus = FrameBus(FakeCapture(), lambda: TICK_RATE)
+    frames: list[Frame] = []
+    frame_bus.subscribe(frames.append, get_rate=None if rate is None else lambda: rate)
+    run_ticks(frame_bus, TICK_RATE)
+    assert len(frames) == frame_count
+
+
+def test_a_single_capture_is_shared_by_every_due_subscriber():
+    capture = FakeCapture()
+    frame_bus = FrameBus(capture, lambda: TICK_RATE)
+    preview_frames: list[Frame] = []
+    comparison_frames: list[Frame] = []
+    frame_bus.subscribe(preview_frames.append, lambda _: CaptureRequest((640, 480)), lambda: TICK_RATE / 2)
+    frame_bus.subscribe(comparison_frames.append, lambda _: CaptureRequest((320, 240), (0.5, 0.5, 0.5, 0.5)))
+    run_ticks(frame_bus, 4)
+
+    assert capture.requests == [
+        ((640, 480), FULL_CROP_BOX),
+        ((320, 240), (0.5, 0.5, 0.5, 0.5)),
+        ((640, 480), FULL_CROP_BOX),
+        ((320, 240), (0.5, 0.5, 0.5, 0.5)),
+    ]
+    # Same frame, not just the same capture request
+    assert all(
+        preview_frame is comparison_frame
+        for preview_frame, comparison_frame in zip(preview_frames, comparison_frames[::2], strict=True)
+    )
+    # The comparison gets its own crop box when the preview isn't due
+    assert comparison_frames[1].crop_box == (0.5, 0.5, 0.5, 0.5)
+
+
+def test_nothing_is_captured_without_requests():
+    capture = FakeCapture()
+    frame_bus = FrameBus(capture, lambda: TICK_RATE)
+    frames: list[Frame] = []
+    frame_bus.subscribe(frames.append)
+    frame_bus.subscribe(frames.append, lambda _: None)
+    run_ticks(frame_bus, 2)
+
+    assert capture.requests == []
+    assert len(frames) == 4
+    assert all(frame.image is None for frame in frames)
+
+
+def test_subscribers_are_marked_as_served_before_getting_the_frame():
+    frame_bus = FrameBus(FakeCapture(), lambda: TICK_RATE)
+    served_times: list[tuple[float, float]] = []
+    first = frame_bus.subscribe(lambda _: None)
+    frame_bus.subscribe(lambda frame: served_times.append((frame.timestamp, first.last_frame_time)))
+    frame_bus.tick(1)
+    assert served_times == [(1, 1)]
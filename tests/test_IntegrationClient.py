@@ -0,0 +1,42 @@
+import pytest
+
+from IntegrationClient import HEADER, MAX_MESSAGE_SIZE, MessageDecoder, encode_message
+
+MESSAGES = [
+    {"type": "command", "id": 1, "command": "split"},
+    {"type": "similarities", "similarity": 0.5, "threshold": 0.95, "names": ["é", "🎮"]},
+    {},
+]
+
+
+def test_messages_are_decoded_however_they_are_chunked():
+    data = b"".join(encode_message(message) for message in MESSAGES)
+
+    assert MessageDecoder().feed(data) == MESSAGES
+
+    decoder = MessageDecoder()
+    assert [message for index in range(len(data)) for message in decoder.feed(data[index : index + 1])] == MESSAGES
+
+    decoder = MessageDecoder()
+    split = len(encode_message(MESSAGES[0])) + 3
+    assert decoder.feed(data[:split]) == MESSAGES[:1]
+    assert decoder.feed(data[split:]) == MESSAGES[1:]
+
+
+def test_incomplete_messages_wait_for_more_data():
+    data = encode_message(MESSAGES[0])
+    decoder = MessageDecoder()
+    assert decoder.feed(data[: HEADER.size - 1]) == []
+    assert decoder.feed(data[HEADER.size - 1 : -1]) == []
+    assert decoder.feed(data[-1:]) == MESSAGES[:1]
+
+
+def test_messages_that_are_too_large_are_rejected():
+    with pytest.raises(ValueError, match="too large"):
+        MessageDecoder().feed(HEADER.pack(MAX_MESSAGE_SIZE + 1))
+
+
+@pytest.mark.parametrize("payload", [b"[1, 2]", b'"split"', b"{not json}"])
+def test_invalid_messages_are_rejected(payload: bytes):
+    with pytest.raises(ValueError):  # noqa: PT011 # Invalid JSON and non-objects are both just invalid messages
+        MessageDecoder().feed(HEADER.pack(len(payload)) + payload)
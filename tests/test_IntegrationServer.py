@@ -0,0 +1,89 @@
+import socket
+from collections.abc import Iterator
+from types import SimpleNamespace
+
+import pytest
+
+from IntegrationClient import HEADER, HOST, MAX_MESSAGE_SIZE, IntegrationClient, Message, MessageDecoder
+from IntegrationServer import IntegrationServer
+from utils import AUTOSPLIT_VERSION
+
+TIMEOUT = 5
+"""Fail rather than hang if the server doesn't answer, in seconds"""
+
+
+def get_free_port():
+    with socket.socket() as probe:
+        probe.bind((HOST, 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture()
+def commands():
+    """Commands received by `server`."""
+    commands: list[str] = []
+    return commands
+
+
+@pytest.fixture()
+def server(monkeypatch: pytest.MonkeyPatch, commands: list[str]) -> Iterator[IntegrationServer]:
+    monkeypatch.setattr("IntegrationServer.command_listeners", [])
+    default_timeout = socket.getdefaulttimeout()
+    socket.setdefaulttimeout(TIMEOUT)
+    server = IntegrationServer(SimpleNamespace(), commands.append)  # pyright: ignore[reportArgumentType]
+    server.listen(get_free_port())
+    yield server
+    server.close()
+    socket.setdefaulttimeout(default_timeout)
+
+
+@pytest.fixture()
+def client(server: IntegrationServer) -> Iterator[IntegrationClient]:
+    client = IntegrationClient(server.port)
+    yield client
+    client.close()
+
+
+def test_clients_are_greeted(client: IntegrationClient):
+    message = client.receive()
+    assert message is not None
+    assert message["type"] == "hello"
+    assert message["version"] == AUTOSPLIT_VERSION
+
+
+def test_commands_are_handled_and_acknowledged(client: IntegrationClient, commands: list[str]):
+    client.receive()
+    first_id = client.send_command("split")
+    second_id = client.send_command("reset")
+
+    acks = [client.receive(), client.receive()]
+    assert [(ack["type"], ack["id"]) for ack in acks if ack] == [("ack", first_id), ("ack", second_id)]
+    assert all(ack and ack["received_at"] <= ack["queued_at"] for ack in acks)
+    assert commands == ["split", "reset"]
+
+
+@pytest.mark.parametrize(
+    "message",
+    [{"type": "unknown", "id": 1}, {"type": "command", "id": 1}, {"type": "command", "id": 1, "command": 2}],
+)
+def test_unknown_or_invalid_messages_get_an_error(client: IntegrationClient, commands: list[str], message: Message):
+    client.receive()
+    client.send(message)
+    error = client.receive()
+    assert error is not None
+    assert error["type"] == "error"
+    assert error["id"] == 1
+    # The connection stays usable
+    client.send_command("split")
+    assert (client.receive() or {}).get("type") == "ack"
+    assert commands == ["split"]
+
+
+def test_invalid_framing_closes_the_connection(server: IntegrationServer):
+    with socket.create_connection((HOST, server.port)) as connection:
+        connection.sendall(HEADER.pack(MAX_MESSAGE_SIZE + 1))
+        decoder = MessageDecoder()
+        messages: list[Message] = []
+        while data := connection.recv(4096):
+            messages += decoder.feed(data)
+    assert [message["type"] for message in messages] == ["hello", "error"]
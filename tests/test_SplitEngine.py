@@ -0,0 +1,313 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from pathlib import Path
+from typing import cast
+
+import cv2
+import numpy as np
+import pytest
+from cv2.typing import MatLike
+
+from AutoSplitImage import COMPARISON_RESIZE, AutoSplitImage
+from SplitEngine import SplitEngine, SplitEvent
+from user_profile import DEFAULT_PROFILE, UserProfileDict
+
+FRAME_INTERVAL = 1 / 60
+START_IMAGE_SEED = 100
+RESET_IMAGE_SEED = 101
+NO_MATCH_SEED = 102
+
+
+def random_image(seed: int):
+    """
+    Random blocks of color, so that the histograms of different images are different too.
+    The colors are close to the middle of the histograms' bins, so that `noisy` doesn't change them.
+    """
+    blocks = (np.random.default_rng(seed).integers(0, 8, (6, 8, 3)) * 32 + 12).astype(np.uint8)
+    return cv2.resize(blocks, COMPARISON_RESIZE, interpolation=cv2.INTER_NEAREST)
+
+
+def noisy(image: MatLike, seed: int):
+    """A capture of `image`, with a bit of noise."""
+    return cv2.add(image, np.random.default_rng(seed).integers(0, 8, image.shape, dtype=np.uint8))
+
+
+def load_image(directory: Path, filename: str, image: MatLike):
+    path = os.path.join(directory, filename)
+    cv2.imwrite(path, image)
+    return AutoSplitImage(path)
+
+
+def create_settings(**settings: object):
+    return cast(UserProfileDict, {**deepcopy(DEFAULT_PROFILE), "default_pause_time": 0, **settings})
+
+
+def feed_one_by_one(engine: SplitEngine, frames: list[MatLike | None]):
+    """@return: The commands sent, and the similarities after each frame."""
+    events: list[SplitEvent] = []
+    similarities: list[tuple[float | None, float | None]] = []
+    for index, frame in enumerate(frames):
+        events += engine.feed([frame], [index * FRAME_INTERVAL])
+        similarities.append((engine.similarity, engine.reset_similarity))
+    return events, similarities
+
+
+@pytest.mark.parametrize("comparison_method", [0, 1])
+def test_concurrent_comparisons_match_serial_comparisons(tmp_path: Path, comparison_method: int):
+    start, reset, *splits = (random_image(seed) for seed in range(5))
+    images = {
+        "start_image": load_image(tmp_path, "start_auto_splitter.png", start),
+        "reset_image": load_image(tmp_path, "reset.png", reset),
+        "split_images": [load_image(tmp_path, f"{index}_split.png", split) for index, split in enumerate(splits)],
+    }
+    frames = [
+        None if image is None else noisy(image, seed)
+        for seed, image in enumerate((start, None, splits[0], reset, start, splits[0], splits[1], splits[2], None))
+    ]
+    settings = create_settings(default_comparison_method=comparison_method)
+
+    serial_results = feed_one_by_one(SplitEngine(settings, **images), frames)
+    with ThreadPoolExecutor() as comparison_pool:
+        concurrent_results = feed_one_by_one(
+            SplitEngine(settings, **images, comparison_pool=comparison_pool),
+            frames,
+        )
+
+    assert concurrent_results == serial_results
+    commands = [event.command for event in serial_results[0]]
+    assert commands == ["start", "split", "reset", "start", "split", "split", "split"]
+
+
+@pytest.mark.parametrize(("filename", "check_rate"), [("reset_%2%.png", 2), ("reset_%120%.png", 60), ("reset.png", 60)])
+def test_check_rate_is_capped_at_the_fps_limit(tmp_path: Path, filename: str, check_rate: float):
+    engine = SplitEngine(create_settings(fps_limit=60))
+    assert load_image(tmp_path, filename, random_image(0)).get_check_rate(engine) == check_rate
+
+
+@pytest.mark.parametrize(("check_rate", "comparisons"), [(2, 2), (15, 15), (60, 60)])
+def test_reset_image_is_compared_at_its_check_rate(tmp_path: Path, check_rate: float, comparisons: int):
+    engine = SplitEngine(
+        create_settings(fps_limit=60),
+        reset_image=load_image(tmp_path, f"reset_%{check_rate}%.png", random_image(0)),
+        split_images=[load_image(tmp_path, "split.png", random_image(1))],
+    )
+    engine.start(0)
+    check_times: list[float] = []
+    # One second of frames, that match neither image
+    for index in range(1, 61):
+        timestamp = index * FRAME_INTERVAL
+        is_reset_image_due = engine.reset_image in engine.get_images_to_compare(timestamp)
+        engine.feed([random_image(2)], [timestamp])
+        if engine.last_reset_image_check_time == timestamp:
+            check_times.append(timestamp)
+        assert is_reset_image_due == (engine.last_reset_image_check_time == timestamp)
+    assert len(check_times) == comparisons
+
+
+
+def create_engine(directory: Path, split_filenames: list[str], reset: bool = False, **settings: object):
+    """Split images are matched by `random_image` of their index."""
+    return SplitEngine(
+        create_settings(**settings),
+        start_image=load_image(directory, "start_auto_splitter.png", random_image(START_IMAGE_SEED)),
+        reset_image=load_image(directory, "reset.png", random_image(RESET_IMAGE_SEED)) if reset else None,
+        split_images=[
+            load_image(directory, filename, random_image(index)) for index, filename in enumerate(split_filenames)
+        ],
+    )
+
+
+def feed_seeds(engine: SplitEngine, seeds: list[int], start_time: float = 0):
+    """
+    Feed `random_image` of each seed, one frame interval apart.
+
+    @return: The commands sent
+    """
+    return [
+        event.command
+        for index, seed in enumerate(seeds)
+        for event in engine.feed([noisy(random_image(seed), index)], [start_time + index * FRAME_INTERVAL])
+    ]
+
+
+def test_start_image_starts_the_run(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split.png"])
+    assert feed_seeds(engine, [NO_MATCH_SEED, 0]) == []
+    assert not engine.is_running
+
+    events = engine.feed([random_image(START_IMAGE_SEED)], [1])
+    assert events == [SplitEvent("start", 1)]
+    assert engine.is_running
+    assert engine.run_start_time == 1
+    assert engine.split_image is engine.split_images[0]
+
+
+def test_split_images_split_in_order_then_end_the_run(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split.png", "1_split.png", "2_split.png"])
+    engine.start(0)
+    # Out of order images don't split
+    assert feed_seeds(engine, [1, 0, 2, 1, NO_MATCH_SEED, 2], 1) == ["split", "split", "split"]
+    assert engine.is_running
+    assert engine.split_image is None
+
+    assert feed_seeds(engine, [NO_MATCH_SEED], 2) == []
+    assert not engine.is_running
+
+
+def test_split_image_loops(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split_@2@.png", "1_split.png"])
+    engine.start(0)
+    assert [image.filename for image, _ in engine.split_images_and_loop_number] == [
+        "0_split_@2@.png",
+        "0_split_@2@.png",
+        "1_split.png",
+    ]
+    assert feed_seeds(engine, [0, 1, 0, 1], 1) == ["split", "split", "split"]
+
+
+def test_loop_splits_goes_back_to_the_first_split_image(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split.png", "1_split.png"], loop_splits=True)
+    engine.start(0)
+    assert feed_seeds(engine, [0, 1, 0], 1) == ["split", "split", "split"]
+    assert engine.split_image_number == 1
+
+
+def test_dummy_split_image_doesnt_send_a_command(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split_{d}.png", "1_split.png"])
+    engine.start(0)
+    assert feed_seeds(engine, [0], 1) == []
+    assert engine.split_image_number == 1
+    assert feed_seeds(engine, [1], 2) == ["split"]
+
+
+def test_pause_flag_sends_pause(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split_{p}.png"])
+    engine.start(0)
+    assert feed_seeds(engine, [0], 1) == ["pause"]
+
+
+def test_below_flag_splits_once_similarity_goes_below_threshold(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split_{b}.png", "1_split.png"])
+    engine.start(0)
+    assert feed_seeds(engine, [NO_MATCH_SEED, 0, 0], 1) == []
+    assert engine.split_below_threshold
+    assert feed_seeds(engine, [NO_MATCH_SEED], 2) == ["split"]
+    assert engine.split_image_number == 1
+
+
+def test_below_flag_doesnt_split_when_capture_is_lost(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split_{b}.png"])
+    engine.start(0)
+    feed_seeds(engine, [0], 1)
+    assert engine.feed([None], [2]) == []
+
+
+def test_delayed_split_is_sent_with_the_time_it_was_found(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split_#500#.png", "1_split.png"])
+    engine.start(0)
+    assert engine.feed([random_image(0)], [1]) == []
+    assert engine.delayed_command_time == 1.5
+    # Can't skip or undo while a split is delayed, nor compare the next image
+    assert not engine.skip_split()
+    assert not engine.undo_split()
+    assert engine.get_images_to_compare(1.2) == []
+    assert engine.feed([random_image(1)], [1.2]) == []
+
+    assert engine.feed([random_image(NO_MATCH_SEED)], [1.6]) == [SplitEvent("split", 1.5)]
+    assert engine.split_image_number == 1
+
+
+def test_delayed_start_is_sent_with_the_time_it_was_found(tmp_path: Path):
+    engine = SplitEngine(
+        create_settings(),
+        start_image=load_image(tmp_path, "start_auto_splitter_#500#.png", random_image(START_IMAGE_SEED)),
+        split_images=[load_image(tmp_path, "0_split.png", random_image(0))],
+    )
+    assert engine.feed([random_image(START_IMAGE_SEED)], [1]) == []
+    assert not engine.is_running
+    assert engine.feed([random_image(NO_MATCH_SEED)], [1.6]) == [SplitEvent("start", 1.5)]
+    assert engine.is_running
+
+
+def test_pause_time_skips_comparisons_after_a_split(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split_[1].png", "1_split.png"])
+    engine.start(0)
+    assert feed_seeds(engine, [0], 1) == ["split"]
+    assert engine.is_paused(1.5)
+    assert engine.get_images_to_compare(1.5) == []
+    assert engine.feed([random_image(1)], [1.5]) == []
+    assert engine.feed([random_image(1)], [2.1]) == [SplitEvent("split", 2.1)]
+
+
+def test_reset_image_resets_the_run(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split.png", "1_split.png"], reset=True)
+    engine.start(0)
+    assert feed_seeds(engine, [0, RESET_IMAGE_SEED], 1) == ["split", "reset"]
+    assert not engine.is_running
+    assert engine.similarity is None
+    # The run can be started again
+    assert feed_seeds(engine, [START_IMAGE_SEED, 0], 2) == ["start", "split"]
+
+
+def test_reset_image_is_paused_at_the_start_of_the_run(tmp_path: Path):
+    engine = SplitEngine(
+        create_settings(),
+        start_image=load_image(tmp_path, "start_auto_splitter_[1].png", random_image(START_IMAGE_SEED)),
+        reset_image=load_image(tmp_path, "reset.png", random_image(RESET_IMAGE_SEED)),
+        split_images=[load_image(tmp_path, "0_split.png", random_image(0))],
+    )
+    engine.start(0)
+    assert engine.feed([random_image(RESET_IMAGE_SEED)], [0.5]) == []
+    assert engine.feed([random_image(RESET_IMAGE_SEED)], [1.5]) == [SplitEvent("reset", 1.5)]
+
+
+def test_auto_reset_can_be_disabled(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split.png"], reset=True, enable_auto_reset=False)
+    engine.start(0)
+    assert feed_seeds(engine, [RESET_IMAGE_SEED], 1) == []
+    assert engine.is_running
+
+
+def test_skip_and_undo_navigate_split_groups(tmp_path: Path):
+    # Dummy split images are grouped with the next split image
+    engine = create_engine(tmp_path, ["0_split_{d}.png", "1_split.png", "2_split.png"])
+    assert engine.split_groups == [[0, 1], [2]]
+    assert not engine.skip_split()
+    engine.start(0)
+
+    assert engine.skip_split()
+    assert engine.split_image_number == 2
+    assert engine.undo_split()
+    assert engine.split_image_number == 1
+    assert engine.undo_split(navigate_image_only=True)
+    assert engine.split_image_number == 0
+    assert engine.skip_split(navigate_image_only=True)
+    assert engine.split_image_number == 1
+
+
+def test_skipping_or_undoing_out_of_range_resets(tmp_path: Path):
+    engine = create_engine(tmp_path, ["0_split.png"])
+    engine.start(0)
+    assert engine.undo_split(navigate_image_only=True)
+    assert not engine.is_running
+
+    engine.start(1)
+    assert engine.skip_split()
+    assert not engine.is_running
+
+
+def test_feeding_frames_in_batches_matches_feeding_them_one_by_one(tmp_path: Path):
+    seeds = [NO_MATCH_SEED, START_IMAGE_SEED, 0, 0, NO_MATCH_SEED, 1, RESET_IMAGE_SEED, START_IMAGE_SEED, 0]
+    frames = [noisy(random_image(seed), index) for index, seed in enumerate(seeds)]
+    timestamps = [index * FRAME_INTERVAL for index in range(len(frames))]
+    split_filenames = ["0_split_{b}.png", "1_split.png"]
+
+    one_by_one = create_engine(tmp_path, split_filenames, reset=True)
+    events = [
+        event
+        for frame, timestamp in zip(frames, timestamps, strict=True)
+        for event in one_by_one.feed([frame], [timestamp])
+    ]
+    assert [event.command for event in events] == ["start", "split", "split", "reset", "start"]
+    assert create_engine(tmp_path, split_filenames, reset=True).feed(frames, timestamps) == events
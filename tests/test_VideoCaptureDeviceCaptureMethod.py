@@ -0,0 +1,83 @@
+import numpy as np
+
+from capture_method.VideoCaptureDeviceCaptureMethod import FrameBufferPool, OutputFramePool
+
+
+def test_frame_buffer_pool_never_writes_published_or_referenced_buffers():
+    pool = FrameBufferPool(size=2)
+    index, buffer = pool.acquire_free()
+    assert buffer is None
+    frame = np.zeros((2, 2, 3), dtype=np.uint8)
+    pool.publish(index, frame)
+
+    # Still published
+    assert pool.acquire_free()[0] != index
+    published = pool.acquire_published()
+    assert published is not None
+    assert published[1] is frame
+    # A newer frame is published, but the consumer still references the previous one
+    next_index, _ = pool.acquire_free()
+    pool.publish(next_index, np.ones((2, 2, 3), dtype=np.uint8))
+    assert pool.acquire_free()[0] not in {index, next_index}
+
+    pool.release(index)
+    assert pool.acquire_free()[0] == index
+
+
+def test_frame_buffer_pool_grows_when_every_buffer_is_in_use():
+    pool = FrameBufferPool(size=1)
+    first_index, _ = pool.acquire_free()
+    second_index, buffer = pool.acquire_free()
+    assert second_index != first_index
+    assert buffer is None
+
+
+def test_frame_buffer_pool_publishing_none_unpublishes():
+    pool = FrameBufferPool()
+    index, _ = pool.acquire_free()
+    pool.publish(index, np.zeros((2, 2, 3), dtype=np.uint8))
+    pool.publish(None)
+    assert pool.acquire_published() is None
+
+
+def test_output_frame_pool_reuses_released_frames():
+    pool = OutputFramePool()
+    first_index, first = pool.copy(np.full((2, 2, 3), 1, dtype=np.uint8))
+    pool.release(first_index)
+    second_index, second = pool.copy(np.full((2, 2, 3), 2, dtype=np.uint8))
+    assert second_index == first_index
+    assert second is first
+    assert (second == 2).all()
+
+
+def test_output_frame_pool_never_overwrites_referenced_frames():
+    pool = OutputFramePool()
+    first_index, first = pool.copy(np.full((2, 2, 3), 1, dtype=np.uint8))
+    # Referenced twice, ie: by the capture method and a consumer
+    pool.acquire(first_index)
+    pool.release(first_index)
+    second_index, second = pool.copy(np.full((2, 2, 3), 2, dtype=np.uint8))
+    assert second_index != first_index
+    assert (first == 1).all()
+
+    pool.release(first_index)
+    pool.release(second_index)
+    assert pool.copy(np.full((2, 2, 3), 3, dtype=np.uint8))[1] is first
+    assert (second == 2).all()
+
+
+def test_output_frame_pool_replaces_frames_of_a_different_shape():
+    pool = OutputFramePool()
+    index, frame = pool.copy(np.zeros((2, 2, 3), dtype=np.uint8))
+    pool.release(index)
+    _, frame = pool.copy(np.ones((4, 3, 3), dtype=np.uint8))
+    assert frame.shape == (4, 3, 3)
+    assert (frame == 1).all()
+
+
+def test_output_frame_pool_finds_the_index_of_its_frames():
+    pool = OutputFramePool()
+    pool.copy(np.zeros((2, 2, 3), dtype=np.uint8))
+    index, frame = pool.copy(np.zeros((2, 2, 3), dtype=np.uint8))
+    assert pool.index_of(frame) == index
+    assert pool.index_of(frame.copy()) is None
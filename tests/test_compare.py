@@ -0,0 +1,171 @@
+from collections.abc import Callable
+
+import cv2
+import numpy as np
+import pytest
+from cv2.typing import MatLike
+
+from compare import (
+    APPROXIMATE_SAMPLE_SIZE,
+    CHANNELS,
+    HISTOGRAM_BAND_COUNT,
+    HISTOGRAM_SIZE,
+    L2_GATHER_MAX_OPAQUE_RATIO,
+    RANGES,
+    CompiledMask,
+    IncrementalHistogram,
+    PixelSample,
+    compare_histograms,
+    compare_l2_norm,
+    compare_l2_norm_approximate,
+)
+
+SIZE = (240, 320)
+
+
+def random_image(seed: int, size: tuple[int, int] = SIZE):
+    return np.random.default_rng(seed).integers(0, 256, (*size, 3), dtype=np.uint8)
+
+
+def random_mask(seed: int, opaque_ratio: float, size: tuple[int, int] = SIZE):
+    return np.where(np.random.default_rng(seed).random(size) < opaque_ratio, 255, 0).astype(np.uint8)
+
+
+def similar_capture(source: MatLike, seed: int, noise: int):
+    """A capture that differs from `source` by up to `noise` on each channel."""
+    noise_image = np.random.default_rng(seed).integers(-noise, noise + 1, source.shape)
+    return np.clip(source.astype(int) + noise_image, 0, 255).astype(np.uint8)
+
+
+def test_compiled_mask_gathers_opaque_pixels_in_order():
+    source = random_image(0)
+    mask = random_mask(1, 0.3)
+    compiled_mask = CompiledMask(source, mask)
+
+    assert compiled_mask.nonzero_count == np.count_nonzero(mask)
+    np.testing.assert_array_equal(compiled_mask.source_pixels[:, 0], source[mask > 0])
+    capture = random_image(2)
+    np.testing.assert_array_equal(compiled_mask.gather(capture)[:, 0], capture[mask > 0])
+
+
+# Both sides of the ratio where L2 Norm comparisons switch between gathering and the dense mask
+@pytest.mark.parametrize("opaque_ratio", [L2_GATHER_MAX_OPAQUE_RATIO / 2, 0.5])
+@pytest.mark.parametrize("comparison_method", [compare_l2_norm, compare_histograms])
+def test_compiled_mask_matches_dense_mask(comparison_method: Callable[..., float], opaque_ratio: float):
+    source = random_image(0)
+    mask = random_mask(1, opaque_ratio)
+    compiled_mask = CompiledMask(source, mask)
+    for seed, noise in enumerate((0, 8, 64, 255)):
+        capture = similar_capture(source, seed, noise)
+        assert comparison_method(source, capture, compiled_mask) == pytest.approx(
+            comparison_method(source, capture, mask),
+        )
+
+
+def test_compiled_mask_caches_the_source_histogram():
+    source = random_image(0)
+    mask = random_mask(1, 0.3)
+    compiled_mask = CompiledMask(source, mask)
+    compare_histograms(source, random_image(2), compiled_mask)
+    assert compiled_mask.source_histogram is not None
+    # The cached histogram is the same one the dense mask would use
+    for seed in range(3, 6):
+        capture = random_image(seed)
+        assert compare_histograms(source, capture, compiled_mask) == pytest.approx(
+            compare_histograms(source, capture, mask),
+        )
+
+
+def test_compiled_mask_without_opaque_pixels_never_matches():
+    source = random_image(0)
+    compiled_mask = CompiledMask(source, np.zeros(SIZE, dtype=np.uint8))
+    assert compare_l2_norm(source, source, compiled_mask) == 0
+    assert compare_histograms(source, source, compiled_mask) == 0
+
+
+
+def test_pixel_sample_only_samples_opaque_pixels():
+    mask = random_mask(1, 0.3)
+    source = np.zeros((*SIZE, 3), dtype=np.uint8)
+    source[mask > 0] = 255
+    sample = PixelSample(source, mask)
+
+    assert sample.population == np.count_nonzero(mask)
+    assert sample.size == APPROXIMATE_SAMPLE_SIZE
+    assert (sample.source_pixels == 255).all()
+
+
+def test_pixel_sample_is_reproducible():
+    source = random_image(0)
+    capture = random_image(1)
+    np.testing.assert_array_equal(PixelSample(source).gather(capture), PixelSample(source).gather(capture))
+
+
+def test_approximate_l2_norm_is_exact_when_sampling_every_pixel():
+    source = random_image(0, (16, 16))
+    capture = similar_capture(source, 1, 32)
+    sample = PixelSample(source)
+    assert sample.size == sample.population
+    assert compare_l2_norm_approximate(source, capture, sample, 0.9) == compare_l2_norm(source, capture)
+
+
+@pytest.mark.parametrize("opaque_ratio", [None, 0.3])
+def test_approximate_l2_norm_is_exact_near_the_threshold(opaque_ratio: float | None):
+    source = random_image(0)
+    mask = None if opaque_ratio is None else CompiledMask(source, random_mask(1, opaque_ratio))
+    sample = PixelSample(source, None if mask is None else mask.mask)
+    capture = similar_capture(source, 2, 64)
+    similarity = compare_l2_norm(source, capture, mask)
+    assert compare_l2_norm_approximate(source, capture, sample, similarity, mask) == similarity
+
+
+# The estimate is only used when it's on the same side of the threshold with ~99.7% confidence,
+# fixed seeds keep this deterministic
+@pytest.mark.parametrize("opaque_ratio", [None, 0.3])
+def test_approximate_l2_norm_agrees_with_the_threshold(opaque_ratio: float | None):
+    source = random_image(0)
+    mask = None if opaque_ratio is None else CompiledMask(source, random_mask(1, opaque_ratio))
+    sample = PixelSample(source, None if mask is None else mask.mask)
+    for seed, noise in enumerate((0, 4, 16, 32, 64, 128, 255)):
+        capture = similar_capture(source, seed, noise)
+        similarity = compare_l2_norm(source, capture, mask)
+        for threshold in np.linspace(0.5, 1, num=21):
+            approximate_similarity = compare_l2_norm_approximate(source, capture, sample, threshold, mask)
+            assert (approximate_similarity >= threshold) == (similarity >= threshold)
+
+
+def changing_captures(seed: int):
+    """Consecutive captures where only some rows change, from none to every row."""
+    rng = np.random.default_rng(seed)
+    capture = random_image(seed)
+    yield capture.copy()
+    for changed_rows in (0, 1, SIZE[0] // HISTOGRAM_BAND_COUNT, SIZE[0] // 2, SIZE[0], 3, 0):
+        rows = rng.choice(SIZE[0], changed_rows, replace=False)
+        capture[rows] = rng.integers(0, 256, (changed_rows, SIZE[1], 3), dtype=np.uint8)
+        yield capture.copy()
+
+
+def test_incremental_histogram_matches_full_histogram():
+    incremental_histogram = IncrementalHistogram()
+    for capture in changing_captures(0):
+        full_histogram = cv2.calcHist([capture], CHANNELS, None, HISTOGRAM_SIZE, RANGES)
+        cv2.normalize(full_histogram, full_histogram)
+        np.testing.assert_allclose(incremental_histogram.calculate(capture), full_histogram, rtol=1e-6)
+
+
+def test_incremental_histogram_recalculates_on_new_size():
+    incremental_histogram = IncrementalHistogram()
+    incremental_histogram.calculate(random_image(0))
+    capture = random_image(1, (120, 160))
+    full_histogram = cv2.calcHist([capture], CHANNELS, None, HISTOGRAM_SIZE, RANGES)
+    cv2.normalize(full_histogram, full_histogram)
+    np.testing.assert_allclose(incremental_histogram.calculate(capture), full_histogram, rtol=1e-6)
+
+
+def test_compare_histograms_incrementally_matches_full_comparison():
+    source = random_image(1)
+    incremental_histogram = IncrementalHistogram()
+    for capture in changing_captures(0):
+        assert compare_histograms(source, capture, None, incremental_histogram) == pytest.approx(
+            compare_histograms(source, capture),
+        )
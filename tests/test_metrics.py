@@ -0,0 +1,88 @@
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch: pytest.MonkeyPatch):
+    """Only render the metrics created by the test."""
+    registry: dict[str, metrics.Metric] = {}
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    return registry
+
+
+def test_counters_and_gauges_are_rendered():
+    metrics.Counter("test_events_total", "Events").inc(2)
+    metrics.Gauge("test_size", "Size").set_value(1.5)
+    assert metrics.render_text() == (
+        "# HELP test_events_total Events\n"
+        + "# TYPE test_events_total counter\n"
+        + "test_events_total 2.0\n"
+        + "# HELP test_size Size\n"
+        + "# TYPE test_size gauge\n"
+        + "test_size 1.5\n"
+    )
+
+
+def test_labels_and_help_are_escaped():
+    counter = metrics.Counter("test_events_total", 'Events\nwith a "\\"', "name")
+    counter.labels('a "quoted"\\name\n').inc()
+    assert metrics.render_text() == (
+        '# HELP test_events_total Events\\nwith a "\\\\"\n'
+        + "# TYPE test_events_total counter\n"
+        + 'test_events_total{name="a \\"quoted\\"\\\\name\\n"} 1.0\n'
+    )
+
+
+def test_labelled_metrics_are_rendered_per_label_value():
+    counter = metrics.Counter("test_events_total", "Events", "method")
+    counter.labels("l2").inc()
+    counter.labels("histograms").inc(3)
+    counter.labels("l2").inc()
+    assert metrics.render_text().splitlines()[2:] == [
+        'test_events_total{method="l2"} 2.0',
+        'test_events_total{method="histograms"} 3.0',
+    ]
+
+
+def test_summary_maximum_is_rendered_as_its_own_gauge():
+    summary = metrics.Summary("test_duration_seconds", "Duration")
+    summary.observe(0.5)
+    summary.observe(2.0)
+    assert metrics.render_text() == (
+        "# HELP test_duration_seconds Duration\n"
+        + "# TYPE test_duration_seconds summary\n"
+        + "test_duration_seconds_count 2\n"
+        + "test_duration_seconds_sum 2.5\n"
+        + "# HELP test_duration_seconds_max Maximum of test_duration_seconds\n"
+        + "# TYPE test_duration_seconds_max gauge\n"
+        + "test_duration_seconds_max 2.0\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_duration_seconds", "Duration", "method", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.labels("l2").observe(value)
+    assert metrics.render_text().splitlines()[2:] == [
+        'test_duration_seconds_bucket{method="l2",le="0.1"} 2',
+        'test_duration_seconds_bucket{method="l2",le="1.0"} 3',
+        'test_duration_seconds_bucket{method="l2",le="+Inf"} 4',
+        'test_duration_seconds_count{method="l2"} 4',
+        'test_duration_seconds_sum{method="l2"} 5.65',
+        "# HELP test_duration_seconds_max Maximum of test_duration_seconds",
+        "# TYPE test_duration_seconds_max gauge",
+        'test_duration_seconds_max{method="l2"} 5.0',
+    ]
+
+
+def test_snapshot_is_keyed_like_the_text_format():
+    metrics.Counter("test_events_total", "Events", "method").labels("l2").inc()
+    metrics.Gauge("test_size", "Size").set_value(3)
+    assert metrics.snapshot() == {'test_events_total{method="l2"}': 1, "test_size": 3}
+
+
+def test_metric_names_are_unique():
+    metrics.Counter("test_events_total", "Events")
+    with pytest.raises(ValueError, match="already exists"):
+        metrics.Gauge("test_events_total", "Events")
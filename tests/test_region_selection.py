@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+import pytest
+from cv2.typing import MatLike
+
+import region_selection
+
+TEMPLATE_SIZE = (384, 216)
+BACKGROUND_COLOR = (90, 100, 110)
+
+
+def smooth_scene(seed: int, size: tuple[int, int]):
+    """Gradients with random rectangles on top."""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    scene = np.dstack((x * 200 / width + 20, y * 200 / height + 20, (x + y) * 100 / (width + height) + 60))
+    scene = scene.astype(np.uint8)
+    for _ in range(40):
+        left, top = int(rng.integers(0, width)), int(rng.integers(0, height))
+        right, bottom = left + int(rng.integers(10, width // 10)), top + int(rng.integers(10, height // 10))
+        color = tuple(int(value) for value in rng.integers(0, 256, 3))
+        cv2.rectangle(scene, (left, top), (right, bottom), color, -1)
+    return scene
+
+
+def text_scene(seed: int, size: tuple[int, int], region: tuple[int, int, int, int]):
+    """
+    Thin text on a flat background, only within `region`. Once downscaled, this region looks a lot like
+    the background, which tiny templates match almost perfectly.
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    scene = np.full((height, width, 3), BACKGROUND_COLOR, dtype=np.uint8)
+    x, y, region_width, region_height = region
+    textured_region = scene[y : y + region_height, x : x + region_width]
+    for _ in range(region_width * region_height // 400):
+        cv2.putText(
+            textured_region,
+            f"SPLIT {rng.integers(100)}",
+            (int(rng.integers(0, region_width)), int(rng.integers(0, region_height))),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            float(rng.uniform(0.4, 0.8)),
+            tuple(int(value) for value in np.add(BACKGROUND_COLOR, rng.integers(-90, 90, 3))),
+            1,
+        )
+    return scene
+
+
+def template_of(scene: MatLike, region: tuple[int, int, int, int]):
+    x, y, width, height = region
+    return cv2.resize(scene[y : y + height, x : x + width], TEMPLATE_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def scaled_size(scale_index: int):
+    scale = region_selection.ALIGN_SCALES[scale_index]
+    return int(TEMPLATE_SIZE[0] * scale), int(TEMPLATE_SIZE[1] * scale)
+
+
+# Regions are one of the tested scales of the template, so that there's a single best match
+@pytest.mark.parametrize(
+    ("scene_size", "position", "scale_index", "textured"),
+    [
+        ((1920, 1080), (641, 361), 20, True),
+        ((1920, 1080), (900, 100), 10, True),
+        ((1920, 1080), (519, 880), 1, False),
+        ((3840, 2160), (1283, 722), 35, True),
+        ((3840, 2160), (2361, 1445), 35, False),
+    ],
+)
+def test_alignment_finds_the_template(
+    scene_size: tuple[int, int],
+    position: tuple[int, int],
+    scale_index: int,
+    textured: bool,
+):
+    region = (*position, *scaled_size(scale_index))
+    scene = text_scene(0, scene_size, region) if textured else smooth_scene(0, scene_size)
+    template = template_of(scene, region)
+
+    similarity, height, width, (x, y) = region_selection.__test_alignment(scene, template)  # noqa: SLF001
+
+    assert similarity >= region_selection.ALIGN_REGION_THRESHOLD
+    assert (width, height) == region[2:]
+    # The template was downscaled, so the best match can be off by a pixel
+    assert abs(x - region[0]) <= 1
+    assert abs(y - region[1]) <= 1
@@ -0,0 +1,22 @@
+import pytest
+
+# AutoSplitImage has to be imported before split_parser, which it imports back at the end
+import AutoSplitImage  # noqa: F401 # pyright: ignore[reportUnusedImport]
+from split_parser import check_rate_from_filename
+
+
+@pytest.mark.parametrize(
+    ("filename", "check_rate"),
+    [
+        ("001_split_%5%.png", 5),
+        ("001_split_%0.5%.png", 0.5),
+        ("001_split_(0.9)_[2]_#500#_@3@_^1^_{b}_%30%.png", 30),
+        ("001_split.png", None),
+        ("001_split_%0%.png", None),
+        ("001_split_%-1%.png", None),
+        ("001_split_%fast%.png", None),
+        ("001_split_%5.png", None),
+    ],
+)
+def test_check_rate_from_filename(filename: str, check_rate: float | None):
+    assert check_rate_from_filename(filename) == check_rate
@@ -2179,6 +2179,10 @@ RMAT_ACCESS_W: int
 RMat_Access = int
 """One of [RMat_Access_R, RMAT_ACCESS_R, RMat_Access_W, RMAT_ACCESS_W]"""
 
+# Constants
+CV_32S: int
+CV_32F: int
+
 # Classes
 class Algorithm:
     # Functions